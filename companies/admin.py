@@ -3,7 +3,7 @@ from django.contrib import admin
 # Register your models here.
 # companies/admin.py
 from django.contrib import admin
-from .models import Company, EmployeeProfile
+from .models import Company, EmployeeImport, EmployeeProfile
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
@@ -14,3 +14,10 @@ class CompanyAdmin(admin.ModelAdmin):
 class EmployeeProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'company', 'phone_number')
     search_fields = ('user__username', 'company__name')
+
+@admin.register(EmployeeImport)
+class EmployeeImportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'company', 'status', 'total_rows', 'created', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('company__name', 'company__company_code')
+    readonly_fields = ('errors',)
@@ -40,3 +40,35 @@ class EmployeeProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} @ {self.company.company_code}"
 
+
+class EmployeeImport(models.Model):
+    """
+    A bulk employee onboarding run started through the API (see
+    companies/onboarding.py). Passwords are never stored here; the counters
+    and the per-row error report show its progress.
+    """
+    class Status(models.TextChoices):
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employee_imports')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='employee_imports'
+    )
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    total_rows = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)     # [{"row", "username", "error"}], row is 1-based
+    last_error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(auto_now_add=True)   # last progress update
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Employee import {self.id} → {self.company.company_code} ({self.status})"
@@ -0,0 +1,286 @@
+# companies/onboarding.py
+"""
+Bulk employee onboarding shared by POST /api/companies/employees/bulk/ and
+the onboard_employees management command.
+
+Rows are validated as a set: usernames and emails that are already taken are
+found with one query for the whole import, and duplicates within the import
+are reported. Hashing the passwords is what makes onboarding slow (PBKDF2
+with Django's default work factor costs about 0.3 s of CPU per password), so
+it runs on a pool of processes started with "spawn", at a lower priority
+than the web workers, while the users and their EmployeeProfiles are written
+with bulk_create in chunks as their hashes come in.
+
+The API checks the rows while the request waits, then hashes and inserts on
+a background thread and returns an EmployeeImport to follow; passwords are
+only ever held in memory. A run whose process died is marked failed by
+``expire_stale``, and can be submitted again: the users it created show up
+as conflicts.
+"""
+import csv
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import CoreUser
+
+from .models import EmployeeImport, EmployeeProfile
+
+DEFAULT_CHUNK_SIZE = 50
+# A running import without progress for this long lost its process
+STALE_SECONDS = 300
+REQUIRED_FIELDS = ('username', 'email', 'first_name', 'last_name', 'phone_number', 'password')
+MAX_LENGTHS = {
+    'username': CoreUser._meta.get_field('username').max_length,
+    'email': CoreUser._meta.get_field('email').max_length,
+    'first_name': CoreUser._meta.get_field('first_name').max_length,
+    'last_name': CoreUser._meta.get_field('last_name').max_length,
+    'phone_number': EmployeeProfile._meta.get_field('phone_number').max_length,
+}
+
+
+def read_csv(text):
+    """Rows from CSV text with a header line containing username, email, first_name, last_name, phone_number and password."""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _clean_row(row):
+    if not isinstance(row, dict):
+        raise ValueError('row must be an object with ' + ', '.join(REQUIRED_FIELDS))
+    fields = {}
+    for field in REQUIRED_FIELDS:
+        value = row.get(field)
+        value = '' if value is None else str(value)
+        if field != 'password':
+            value = value.strip()
+        if not value:
+            raise ValueError(f'{field} is required')
+        if field in MAX_LENGTHS and len(value) > MAX_LENGTHS[field]:
+            raise ValueError(f'{field} is longer than {MAX_LENGTHS[field]} characters')
+        fields[field] = value
+    try:
+        validate_email(fields['email'])
+    except ValidationError:
+        raise ValueError(f'"{fields["email"]}" is not a valid email address')
+    fields['email'] = CoreUser.objects.normalize_email(fields['email'])
+    return fields
+
+
+def check(rows):
+    """
+    Validate ``rows`` and drop those whose username or email is taken, by an
+    existing user or by an earlier row. Returns (candidates, errors) where
+    candidates are [(row, fields)] and errors [{"row", "username", "error"}],
+    "row" being 1-based.
+    """
+    errors = []
+    candidates = []
+    usernames = set()
+    emails = set()
+    for index, row in enumerate(rows, start=1):
+        try:
+            fields = _clean_row(row)
+        except ValueError as e:
+            errors.append({'row': index, 'username': row.get('username') if isinstance(row, dict) else None,
+                           'error': str(e)})
+            continue
+        if fields['username'] in usernames:
+            errors.append({'row': index, 'username': fields['username'], 'error': 'duplicate username in import'})
+            continue
+        if fields['email'] in emails:
+            errors.append({'row': index, 'username': fields['username'], 'error': 'duplicate email in import'})
+            continue
+        usernames.add(fields['username'])
+        emails.add(fields['email'])
+        candidates.append((index, fields))
+
+    taken_usernames = set()
+    taken_emails = set()
+    if candidates:
+        for username, email in CoreUser.objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails)
+        ).values_list('username', 'email'):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+    available = []
+    for index, fields in candidates:
+        if fields['username'] in taken_usernames:
+            errors.append({'row': index, 'username': fields['username'], 'error': 'username already exists'})
+        elif fields['email'] in taken_emails:
+            errors.append({'row': index, 'username': fields['username'], 'error': 'email already exists'})
+        else:
+            available.append((index, fields))
+    errors.sort(key=lambda error: error['row'])
+    return available, errors
+
+
+def make_executor(processes=None):
+    """A process pool for ``hash_passwords``; EMPLOYEE_IMPORT_* settings are the defaults."""
+    # "spawn" rather than fork: the web workers run threads, and the hashers
+    # need nothing from Django's state
+    return ProcessPoolExecutor(
+        max_workers=processes or settings.EMPLOYEE_IMPORT_PROCESSES,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=os.nice,
+        initargs=(settings.EMPLOYEE_IMPORT_NICENESS,),
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process-wide pool used by API imports, started on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor()
+        return _executor
+
+
+def hash_passwords(passwords, executor):
+    """Password hashes for ``passwords``, in order, computed on ``executor``; an iterator."""
+    hasher = get_hasher()
+    salts = [hasher.salt() for _ in passwords]
+    return executor.map(hasher.encode, passwords, salts)
+
+
+def _insert(company, chunk, hashes):
+    users = [
+        CoreUser(
+            username=fields['username'],
+            email=fields['email'],
+            first_name=fields['first_name'],
+            last_name=fields['last_name'],
+            role=CoreUser.Role.EMPLOYEE,
+            password=password_hash,
+        )
+        for (_, fields), password_hash in zip(chunk, hashes)
+    ]
+    with db_transaction.atomic():
+        # Primary keys come back from the INSERT, so the profiles can point at them
+        CoreUser.objects.bulk_create(users)
+        EmployeeProfile.objects.bulk_create([
+            EmployeeProfile(user=user, company=company, phone_number=fields['phone_number'])
+            for user, (_, fields) in zip(users, chunk)
+        ])
+
+
+def create(company, candidates, executor, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Create the users and EmployeeProfiles of ``candidates`` (from ``check``)
+    for ``company``. Returns (created, errors); ``progress(created, errors)``
+    is called after each chunk.
+    """
+    created = 0
+    errors = []
+    # Every password is queued on the pool at once, so hashing goes on while a chunk is inserted
+    hashes = hash_passwords([fields['password'] for _, fields in candidates], executor)
+    for offset in range(0, len(candidates), chunk_size):
+        chunk = candidates[offset:offset + chunk_size]
+        chunk_hashes = list(islice(hashes, len(chunk)))
+        try:
+            _insert(company, chunk, chunk_hashes)
+        except IntegrityError as e:
+            # A username or email was registered after our check
+            errors.extend({'row': index, 'username': fields['username'], 'error': f'not created: {e}'}
+                          for index, fields in chunk)
+        else:
+            created += len(chunk)
+        if progress is not None:
+            progress(created, errors)
+    return created, errors
+
+
+def onboard(company, rows, executor, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Check ``rows`` and create the employees of the valid ones for
+    ``company``, hashing passwords on ``executor``.
+
+    Returns {"total_rows", "created", "errors": [{"row", "username", "error"}],
+    "elapsed_seconds", "rows_per_second"} where "row" is 1-based.
+    """
+    started = time.monotonic()
+    candidates, errors = check(rows)
+    created, insert_errors = create(company, candidates, executor, chunk_size, progress)
+    errors = sorted(errors + insert_errors, key=lambda error: error['row'])
+    elapsed = time.monotonic() - started
+    return {
+        'total_rows': len(rows),
+        'created': created,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(len(rows) / elapsed, 1) if elapsed else None,
+    }
+
+
+def start(company, rows, created_by=None):
+    """
+    Check ``rows`` now and create the valid ones on a background thread.
+    Returns (EmployeeImport, errors), the import being None when no row can
+    be created.
+    """
+    candidates, errors = check(rows)
+    if not candidates:
+        return None, errors
+    employee_import = EmployeeImport.objects.create(
+        company=company,
+        created_by=created_by,
+        total_rows=len(rows),
+        errors=errors,
+    )
+    threading.Thread(
+        target=run,
+        args=(employee_import, candidates),
+        name=f'employee-import-{employee_import.id}',
+        daemon=True,
+    ).start()
+    return employee_import, errors
+
+
+def run(employee_import, candidates):
+    """Create ``candidates`` for a started import and mark it done, or failed if creating broke off."""
+    checked = list(employee_import.errors)
+
+    def progress(created, errors):
+        EmployeeImport.objects.filter(id=employee_import.id).update(
+            created=created,
+            errors=sorted(checked + errors, key=lambda error: error['row']),
+            heartbeat_at=timezone.now()
+        )
+
+    try:
+        create(employee_import.company, candidates, get_executor(), progress=progress)
+        changes = {'status': EmployeeImport.Status.DONE}
+    except Exception as e:
+        print(f"[Error in employee import {employee_import.id}] {e}")
+        changes = {'status': EmployeeImport.Status.FAILED, 'last_error': str(e)[:1000]}
+    try:
+        EmployeeImport.objects.filter(id=employee_import.id).update(finished_at=timezone.now(), **changes)
+    finally:
+        # This thread's own database connection
+        connection.close()
+
+
+def expire_stale():
+    """Mark running imports whose process stopped as failed."""
+    now = timezone.now()
+    EmployeeImport.objects.filter(
+        status=EmployeeImport.Status.RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=STALE_SECONDS)
+    ).update(status=EmployeeImport.Status.FAILED, last_error='Process stopped while importing', finished_at=now)
@@ -1,7 +1,7 @@
 # companies/serializers.py
 import uuid
 from rest_framework import serializers
-from .models import Company, EmployeeProfile
+from .models import Company, EmployeeImport, EmployeeProfile
 from core.models import CoreUser
 
 class CoreUserSerializer(serializers.ModelSerializer):
@@ -35,3 +35,10 @@ class EmployeeProfileSerializer(serializers.ModelSerializer):
         user = CoreUser.objects.create_user(**user_data, role=CoreUser.Role.EMPLOYEE)
         employee = EmployeeProfile.objects.create(user=user, **validated_data)
         return employee
+
+class EmployeeImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EmployeeImport
+        fields = ('id', 'company', 'status', 'total_rows', 'created', 'errors', 'last_error',
+                  'started_at', 'heartbeat_at', 'finished_at')
+        read_only_fields = fields
@@ -4,6 +4,8 @@ from . import views
 
 urlpatterns = [
     path('', views.CompanyListCreateAPIView.as_view(), name='company-list-create'),
+    path('employees/bulk/', views.bulk_onboard_employees, name='employee-bulk-onboard'),
+    path('employees/bulk/<int:pk>/', views.EmployeeImportRetrieveAPIView.as_view(), name='employee-import-detail'),
     path('<int:pk>/', views.CompanyRetrieveUpdateDestroyAPIView.as_view(), name='company-detail'),
     path('<int:company_id>/employees/', views.EmployeeListCreateAPIView.as_view(), name='employee-list-create'),
     path('<int:company_id>/employees/<int:pk>/', views.EmployeeRetrieveUpdateDestroyAPIView.as_view(), name='employee-detail'),
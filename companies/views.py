@@ -1,7 +1,11 @@
 # companies/views.py
-from rest_framework import generics, permissions
-from .models import Company, EmployeeProfile
-from .serializers import CompanySerializer, EmployeeProfileSerializer
+import csv
+from rest_framework import generics, permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from . import onboarding
+from .models import Company, EmployeeImport, EmployeeProfile
+from .serializers import CompanySerializer, EmployeeImportSerializer, EmployeeProfileSerializer
 from core.permissions import IsCompanyAdmin, get_user_company
 
 class CompanyListCreateAPIView(generics.ListCreateAPIView):
@@ -65,3 +69,60 @@ class EmployeeRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView
         if user_company:
             return EmployeeProfile.objects.filter(company=user_company)
         return EmployeeProfile.objects.none()
+
+
+# Largest number of rows accepted by one bulk employee import
+BULK_EMPLOYEE_IMPORT_LIMIT = 2000
+
+
+@api_view(['POST'])
+@permission_classes([IsCompanyAdmin])
+def bulk_onboard_employees(request):
+    """
+    POST /api/companies/employees/bulk/ → onboard many employees into the admin's company
+    Body: {"employees": [{"username": "valet01", "email": "...", "first_name": "...",
+           "last_name": "...", "phone_number": "...", "password": "..."}, ...]}
+      or: multipart upload "file" with a CSV header line of those fields
+    Rows are checked before responding; the accounts are created in the
+    background (202, follow GET /api/companies/employees/bulk/<id>/).
+    """
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    upload = request.FILES.get('file')
+    if upload is not None:
+        try:
+            rows = onboarding.read_csv(upload.read().decode('utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Invalid CSV file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        rows = request.data.get('employees') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'employees must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(rows) > BULK_EMPLOYEE_IMPORT_LIMIT:
+        return Response({'error': f'At most {BULK_EMPLOYEE_IMPORT_LIMIT} employees per import'},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    employee_import, errors = onboarding.start(user_company, rows, created_by=request.user)
+    if employee_import is None:
+        return Response({'total_rows': len(rows), 'created': 0, 'errors': errors},
+                       status=status.HTTP_400_BAD_REQUEST)
+    return Response(EmployeeImportSerializer(employee_import).data, status=status.HTTP_202_ACCEPTED)
+
+class EmployeeImportRetrieveAPIView(generics.RetrieveAPIView):
+    """
+    GET: Progress and error report of a bulk employee import (admin only)
+    """
+    serializer_class = EmployeeImportSerializer
+    permission_classes = [IsCompanyAdmin]
+
+    def get_queryset(self):
+        """Return imports for the user's company only"""
+        onboarding.expire_stale()
+        user_company = get_user_company(self.request.user)
+        if user_company:
+            return EmployeeImport.objects.filter(company=user_company)
+        return EmployeeImport.objects.none()
@@ -0,0 +1,230 @@
+# core/auth_cache.py
+"""
+Caches behind core.authentication, so an authenticated API call resolves its
+user without the session-table read and user fetch (or the token join) that
+DRF's stock classes make on every request.
+
+Three maps are kept: session key → (user id, session auth hash), token key →
+(user id, token created), and user id → (user, session auth hash). Each
+lives in a bounded per-process LRU whose entries expire after
+AUTH_CACHE_TIMEOUT seconds and, with AUTH_CACHE_SHARED, in the shared cache
+as well, so one worker's lookup serves the others. Session and token keys
+are stored as SHA-256 digests, never in the clear, and cached users carry no
+password hash: the field is left deferred (read from the database if
+something asks for it, and never written back by ``save()``), and sessions
+are checked against the session auth hash cached next to the user.
+
+Invalidation (core/signals.py): logout drops the session, deleting a token
+drops the token, and saving or deleting a user drops the user. Session and
+token entries only point at the user, so a password, ``is_active`` or role
+change takes effect through the reloaded user: a session whose auth hash no
+longer matches, or an inactive user, is handed back to Django's own checks.
+Invalidation reaches this process's LRU and the shared cache at once, but
+other processes keep their local copies until they expire: a logout, a
+revoked token, a password change or a deactivation made elsewhere can take
+up to AUTH_CACHE_TIMEOUT seconds to apply in every worker.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU of at most ``size`` entries, each expiring ``timeout`` seconds after it was set."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredCache:
+    """A TTLCache in front of the shared cache framework, which is used only when ``shared`` is set."""
+
+    def __init__(self, prefix, size, timeout, shared, shared_timeout):
+        self.prefix = prefix
+        self.local = TTLCache(size, timeout)
+        self.shared = shared
+        self.shared_timeout = shared_timeout
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.shared:
+            value = cache.get(self._key(key), _MISSING)
+            if value is not _MISSING:
+                self.local.set(key, value)
+                return value
+        return None
+
+    def set(self, key, value, timeout=None):
+        self.local.set(key, value, timeout)
+        if self.shared:
+            cache.set(self._key(key), value,
+                      self.shared_timeout if timeout is None else min(timeout, self.shared_timeout))
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared:
+            cache.delete(self._key(key))
+
+
+def _tier(name):
+    return TieredCache(
+        f'core:auth:{name}',
+        settings.AUTH_CACHE_SIZE,
+        settings.AUTH_CACHE_TIMEOUT,
+        settings.AUTH_CACHE_SHARED,
+        settings.AUTH_CACHE_SHARED_TIMEOUT,
+    )
+
+
+sessions = _tier('session')
+tokens = _tier('token')
+# Entries are (user, session auth hash); the old tier held users with their password
+users = _tier('user-entry')
+
+
+def digest(secret):
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _entry(user):
+    """(copy of ``user`` without its password hash, session auth hash) for the users tier."""
+    cached = copy.copy(user)
+    # A missing attribute is a deferred field to Django
+    cached.__dict__.pop('password', None)
+    cached.__dict__.pop('_password', None)
+    return cached, user.get_session_auth_hash()
+
+
+def _get_entry(user_id):
+    entry = users.get(user_id)
+    if entry is None:
+        from .models import CoreUser
+
+        user = CoreUser._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        entry = _entry(user)
+        users.set(user_id, entry)
+    return entry
+
+
+def get_user(user_id):
+    """A private copy of user ``user_id``, or None if there is no such user."""
+    entry = _get_entry(user_id)
+    if entry is None:
+        return None
+    # Per-request state (e.g. the memoized company) must not reach the cached instance
+    return copy.copy(entry[0])
+
+
+def remember_user(user):
+    users.set(user.pk, _entry(user))
+
+
+def session_user(session_key):
+    """
+    The active user of a cached session whose auth hash still matches, or
+    None if the session has to be checked by Django.
+    """
+    key = digest(session_key)
+    entry = sessions.get(key)
+    if entry is None:
+        return None
+    user_id, session_hash = entry
+    user_entry = _get_entry(user_id)
+    if user_entry is None or not user_entry[0].is_active or not constant_time_compare(session_hash, user_entry[1]):
+        sessions.delete(key)
+        return None
+    return copy.copy(user_entry[0])
+
+
+def remember_session(session, user):
+    session_hash = session.get(HASH_SESSION_KEY)
+    if session.session_key and session_hash:
+        sessions.set(digest(session.session_key), (user.pk, session_hash), timeout=session.get_expiry_age())
+        remember_user(user)
+
+
+def forget_session(session_key):
+    if session_key:
+        sessions.delete(digest(session_key))
+
+
+def token_user(key):
+    """(user, created) for a cached token of an active user, or None."""
+    entry = tokens.get(digest(key))
+    if entry is None:
+        return None
+    user_id, created = entry
+    user = get_user(user_id)
+    if user is None or not user.is_active:
+        tokens.delete(digest(key))
+        return None
+    return user, created
+
+
+def remember_token(token):
+    tokens.set(digest(token.key), (token.user_id, token.created))
+    remember_user(token.user)
+
+
+def forget_token(key):
+    tokens.delete(digest(key))
+
+
+def forget_user(user_id):
+    users.delete(user_id)
+
+
+def clear_local():
+    """Empty this process's tiers (the shared cache is left alone)."""
+    for tier in (sessions, tokens, users):
+        tier.local.clear()
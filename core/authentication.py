@@ -0,0 +1,47 @@
+# core/authentication.py
+"""
+DRF authentication classes that resolve the user through core.auth_cache.
+They accept exactly what SessionAuthentication and TokenAuthentication
+accept; a cache miss, or a cached entry that no longer checks out, goes
+through the stock class and caches its result.
+"""
+from django.conf import settings
+from drf_spectacular.authentication import SessionScheme
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+
+from . import auth_cache
+
+
+class CachedSessionAuthentication(SessionAuthentication):
+    """Session authentication without the session read and user fetch on a cache hit."""
+
+    def authenticate(self, request):
+        session_key = request._request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        user = auth_cache.session_user(session_key) if session_key else None
+        if user is None:
+            result = super().authenticate(request)
+            if result is not None:
+                auth_cache.remember_session(request._request.session, result[0])
+            return result
+
+        self.enforce_csrf(request)
+        return (user, None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication without the token/user join on a cache hit."""
+
+    def authenticate_credentials(self, key):
+        cached = auth_cache.token_user(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            auth_cache.remember_token(token)
+            return (user, token)
+
+        user, created = cached
+        return (user, self.get_model()(key=key, user=user, created=created))
+
+
+class CachedSessionScheme(SessionScheme):
+    """Documents CachedSessionAuthentication as session auth in the OpenAPI schema."""
+    target_class = CachedSessionAuthentication
@@ -0,0 +1,155 @@
+# core/cache.py
+"""
+Cache backend that fails over from Redis to a local tier.
+
+``FailoverCache`` sends every operation to its primary backend (Redis) while
+it answers. A connection error or timeout marks the primary down for
+RETRY_AFTER seconds, during which the fallback backend (per-process memory,
+or a file cache shared by the processes of the host) serves instead; the
+first call after that tries the primary again. Requests therefore keep
+working, sessions included, while Redis restarts, at the price of a cold
+local tier.
+
+Keys written or deleted in the fallback while the primary was down are
+deleted from the primary once it is back, so it does not serve values that
+were changed or invalidated in the meantime (cached companies, slots and
+users rely on deletes for invalidation). The set is per process and bounded
+by MAX_DIRTY_KEYS.
+
+    CACHES = {'default': {
+        'BACKEND': 'core.cache.FailoverCache',
+        'OPTIONS': {
+            'PRIMARY': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL},
+            'FALLBACK': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'RETRY_AFTER': 30,
+        },
+    }}
+"""
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+MAX_DIRTY_KEYS = 10000
+
+
+def build_backend(config):
+    """A cache backend from a CACHES-style dict."""
+    params = dict(config)
+    backend = params.pop('BACKEND')
+    location = params.pop('LOCATION', '')
+    return import_string(backend)(location, params)
+
+
+def connection_errors():
+    """Errors that mean the primary cannot be reached, as opposed to a bad call."""
+    errors = (OSError,)
+    try:
+        import redis
+    except ImportError:
+        return errors
+    return errors + (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+
+class FailoverCache(BaseCache):
+    """The PRIMARY backend while it is reachable, the FALLBACK backend while it is not."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.primary = build_backend(options['PRIMARY'])
+        self.fallback = build_backend(options['FALLBACK'])
+        self.retry_after = float(options.get('RETRY_AFTER', 30))
+        self.errors = connection_errors()
+        self.failovers = 0
+        self._down_until = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    @property
+    def primary_up(self):
+        return self._down_until is None
+
+    def _call(self, method, *args, dirty_keys=(), version=None, **kwargs):
+        if version is not None:
+            kwargs['version'] = version
+        if self._down_until is not None and time.monotonic() >= self._down_until:
+            self._recover()
+        if self._down_until is None:
+            try:
+                return getattr(self.primary, method)(*args, **kwargs)
+            except self.errors as e:
+                self._mark_down(e)
+        if dirty_keys:
+            with self._lock:
+                if len(self._dirty) < MAX_DIRTY_KEYS:
+                    self._dirty.update((key, version) for key in dirty_keys)
+        return getattr(self.fallback, method)(*args, **kwargs)
+
+    def _mark_down(self, error):
+        with self._lock:
+            if self._down_until is None:
+                self.failovers += 1
+                print(f"[Error in cache] primary unavailable, using the fallback for {self.retry_after:g}s: {error}")
+            self._down_until = time.monotonic() + self.retry_after
+
+    def _recover(self):
+        """Retry the primary, first deleting what changed while it was away so it cannot serve it."""
+        with self._lock:
+            dirty = list(self._dirty)
+        by_version = {}
+        for key, version in dirty:
+            by_version.setdefault(version, []).append(key)
+        try:
+            for version, keys in by_version.items():
+                self.primary.delete_many(keys, version=version)
+        except self.errors as e:
+            self._mark_down(e)
+            return
+        with self._lock:
+            self._dirty.difference_update(dirty)
+            self._down_until = None
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('add', key, value, timeout, dirty_keys=[key], version=version)
+
+    def get(self, key, default=None, version=None):
+        return self._call('get', key, default, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set', key, value, timeout, dirty_keys=[key], version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', key, timeout, dirty_keys=[key], version=version)
+
+    def delete(self, key, version=None):
+        return self._call('delete', key, dirty_keys=[key], version=version)
+
+    def get_many(self, keys, version=None):
+        return self._call('get_many', keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self._call('has_key', key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._call('incr', key, delta, dirty_keys=[key], version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self._call('decr', key, delta, dirty_keys=[key], version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set_many', data, timeout, dirty_keys=list(data), version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        return self._call('delete_many', keys, dirty_keys=keys, version=version)
+
+    def clear(self):
+        self.fallback.clear()
+        return self._call('clear')
+
+    def close(self, **kwargs):
+        self.primary.close(**kwargs)
+        self.fallback.close(**kwargs)
+
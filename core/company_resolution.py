@@ -0,0 +1,81 @@
+# core/company_resolution.py
+"""
+Resolves the company a user belongs to.
+
+Every permission check and company-scoped queryset needs the user's company,
+so the result is memoized on the user object (DRF hands the same user to the
+permission classes and the view for the whole request) and kept in the shared
+cache keyed by user id. Entries are invalidated from core/signals.py whenever
+a Company, an EmployeeProfile or a user's role changes.
+"""
+from django.core.cache import cache
+
+from companies.models import Company, EmployeeProfile
+
+CACHE_KEY_PREFIX = 'core:user-company'
+CACHE_TIMEOUT = 60 * 10
+
+# Attribute used to memoize the resolved company on the user instance
+USER_ATTR = '_resolved_company'
+
+_MISSING = object()
+
+
+def cache_key(user_id):
+    return f'{CACHE_KEY_PREFIX}:{user_id}'
+
+
+def resolve_user_company(user):
+    """Return the Company for ``user`` or None, hitting the database at most once."""
+    if not user.is_authenticated:
+        return None
+
+    company = getattr(user, USER_ATTR, _MISSING)
+    if company is not _MISSING:
+        return company
+
+    company = cache.get(cache_key(user.pk))
+    if company is None:
+        company = _load_company(user)
+        if company is not None:
+            cache.set(cache_key(user.pk), company, CACHE_TIMEOUT)
+
+    setattr(user, USER_ATTR, company)
+    return company
+
+
+def _load_company(user):
+    """Fetch the company with a single query for both admins and employees."""
+    if user.role == user.Role.COMPANY_ADMIN:
+        return Company.objects.filter(admin_user=user).first()
+
+    if user.role == user.Role.EMPLOYEE:
+        company = Company.objects.filter(employees__user=user).first()
+        if company is not None:
+            return company
+
+        # Employees without a profile are attached to the first company,
+        # matching the behaviour the frontend has always relied on.
+        first_company = Company.objects.order_by('id').first()
+        if first_company is not None:
+            EmployeeProfile.objects.create(
+                user=user,
+                company=first_company,
+                phone_number='+0000000000'
+            )
+        return first_company
+
+    return None
+
+
+def invalidate_user_company(*user_ids):
+    """Drop cached companies for the given user ids."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if user_ids:
+        cache.delete_many([cache_key(user_id) for user_id in user_ids])
+
+
+def forget_user_company(user):
+    """Drop the memoized company from a user instance and the shared cache."""
+    user.__dict__.pop(USER_ATTR, None)
+    invalidate_user_company(user.pk)
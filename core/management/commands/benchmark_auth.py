@@ -0,0 +1,143 @@
+"""
+Django command to compare queries and time per authenticated API call with and without the auth cache
+"""
+import time
+from importlib import import_module
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core import auth_cache
+from core.authentication import CachedSessionAuthentication, CachedTokenAuthentication
+from core.models import CoreUser
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data"""
+
+
+def probe_view(authentication_classes):
+    """An authenticated GET endpoint that does nothing else, behind the session and auth middleware."""
+    view = type('ProbeView', (APIView,), {
+        'authentication_classes': authentication_classes,
+        'permission_classes': [IsAuthenticated],
+        'get': lambda self, request: Response({'user': request.user.pk, 'role': request.user.role}),
+    }).as_view()
+    return SessionMiddleware(AuthenticationMiddleware(view))
+
+
+class Command(BaseCommand):
+    """Django command to benchmark API authentication"""
+    help = (
+        'Authenticate GET requests by session and by token with the stock DRF classes and with '
+        'core.authentication, and report queries and time per request (test data is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests timed per case (default: 500)')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        self.factory = RequestFactory()
+        user = session_key = token_key = None
+        try:
+            with db_transaction.atomic():
+                user, session_key, token = self.seed()
+                token_key = token.key
+                self.run_cases(options['requests'], session_key, token)
+                self.check_invalidation(user, session_key, token)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if user is not None:
+                # Sessions may live outside the database (SESSION_ENGINE)
+                import_module(settings.SESSION_ENGINE).SessionStore(session_key).delete()
+                auth_cache.forget_user(user.pk)
+                auth_cache.forget_session(session_key)
+                auth_cache.forget_token(token_key)
+
+    def seed(self):
+        user = CoreUser.objects.create_user(username='benchmark-auth', password='benchmark-auth-password')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return user, session.session_key, Token.objects.create(user=user)
+
+    def session_request(self, session_key):
+        request = self.factory.get('/probe/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+        return request
+
+    def token_request(self, token):
+        return self.factory.get('/probe/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def call(self, view, request):
+        """(status code, queries) of one request."""
+        with CaptureQueriesContext(connection) as context:
+            response = view(request)
+        return response.status_code, len(context.captured_queries)
+
+    def run_cases(self, requests, session_key, token):
+        cases = [
+            ('session', 'stock ', [SessionAuthentication], lambda: self.session_request(session_key)),
+            ('session', 'cached', [CachedSessionAuthentication], lambda: self.session_request(session_key)),
+            ('token  ', 'stock ', [TokenAuthentication], lambda: self.token_request(token)),
+            ('token  ', 'cached', [CachedTokenAuthentication], lambda: self.token_request(token)),
+        ]
+        for kind, label, classes, make_request in cases:
+            auth_cache.clear_local()
+            view = probe_view(classes)
+            first_status, first_queries = self.call(view, make_request())
+            steady_status, steady_queries = self.call(view, make_request())
+            built = [make_request() for _ in range(requests)]
+            started = time.perf_counter()
+            for request in built:
+                view(request)
+            per_request = (time.perf_counter() - started) / requests
+            self.stdout.write(
+                f'{kind} {label}  first request {first_queries} queries, then {steady_queries} queries, '
+                f'{per_request * 1e6:7.0f} µs/request  (HTTP {first_status}/{steady_status})'
+            )
+
+    def expect(self, label, view, request, status_code, role=None):
+        response = view(request)
+        passed = response.status_code == status_code and (role is None or response.data['role'] == role)
+        style = self.style.SUCCESS if passed else self.style.ERROR
+        self.stdout.write(style(f'{"ok  " if passed else "FAIL"} {label} (HTTP {response.status_code})'))
+
+    def check_invalidation(self, user, session_key, token):
+        """Changes made in this process reach the cached classes at once."""
+        session_view = probe_view([CachedSessionAuthentication])
+        token_view = probe_view([CachedTokenAuthentication])
+        session_view(self.session_request(session_key))
+        token_view(self.token_request(token))
+
+        user.role = CoreUser.Role.COMPANY_ADMIN
+        user.save()
+        self.expect('role change is seen', token_view, self.token_request(token), 200, CoreUser.Role.COMPANY_ADMIN)
+
+        user.is_active = False
+        user.save()
+        self.expect('deactivated user is refused', token_view, self.token_request(token), 401)
+        user.is_active = True
+        user.save()
+
+        token.delete()
+        self.expect('deleted token is refused', token_view, self.token_request(token), 401)
+
+        self.expect('session still valid', session_view, self.session_request(session_key), 200)
+        user.set_password('changed-password')
+        user.save()
+        self.expect('password change ends the session', session_view, self.session_request(session_key), 403)
@@ -1,45 +1,11 @@
 # core/permissions.py
 from rest_framework import permissions
-from companies.models import Company, EmployeeProfile
+from .company_resolution import resolve_user_company
 
 
 def get_user_company(user):
-    """Get the company associated with a user"""
-    if not user.is_authenticated:
-        print(f"DEBUG: User {user} not authenticated")
-        return None
-
-    print(f"DEBUG: Getting company for user {user.username} (role: {user.role})")
-
-    if user.role == user.Role.COMPANY_ADMIN:
-        try:
-            company = Company.objects.get(admin_user=user)
-            print(f"DEBUG: Found admin company: {company.name}")
-            return company
-        except Company.DoesNotExist:
-            print(f"DEBUG: No admin company found for {user.username}")
-            return None
-    elif user.role == user.Role.EMPLOYEE:
-        try:
-            employee_profile = EmployeeProfile.objects.get(user=user)
-            print(f"DEBUG: Found employee profile: {employee_profile.company.name}")
-            return employee_profile.company
-        except EmployeeProfile.DoesNotExist:
-            print(f"DEBUG: No employee profile found for {user.username}")
-            # Try to create one if there's a company available
-            companies = Company.objects.all()
-            if companies.exists():
-                first_company = companies.first()
-                print(f"DEBUG: Creating employee profile for {user.username} in {first_company.name}")
-                EmployeeProfile.objects.create(
-                    user=user,
-                    company=first_company,
-                    phone_number='+0000000000'
-                )
-                return first_company
-            return None
-
-    return None
+    """Get the company associated with a user (memoized, see core.company_resolution)"""
+    return resolve_user_company(user)
 
 
 class IsCompanyMember(permissions.BasePermission):
@@ -0,0 +1,62 @@
+# core/signals.py
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from companies.models import Company, EmployeeProfile
+from . import auth_cache
+from .company_resolution import forget_user_company, invalidate_user_company
+from .models import CoreUser
+
+
+@receiver(pre_save, sender=Company)
+def company_saving(sender, instance, **kwargs):
+    """Remember the current admin, who loses the company if admin_user is reassigned"""
+    instance._previous_admin_user_id = (
+        Company.objects.filter(pk=instance.pk).values_list('admin_user_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def company_changed(sender, instance, **kwargs):
+    """Every member of the company may hold a stale cached copy of it"""
+    employee_ids = EmployeeProfile.objects.filter(company_id=instance.pk).values_list('user_id', flat=True)
+    previous_admin_id = getattr(instance, '_previous_admin_user_id', None)
+    invalidate_user_company(instance.admin_user_id, previous_admin_id, *employee_ids)
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+def employee_profile_changed(sender, instance, **kwargs):
+    invalidate_user_company(instance.user_id)
+
+
+@receiver(post_save, sender=CoreUser)
+def core_user_saved(sender, instance, update_fields=None, **kwargs):
+    """Only a role change can move a user to a different company lookup"""
+    if update_fields is None or 'role' in update_fields:
+        forget_user_company(instance)
+    # Password, is_active and role changes reach cached sessions and tokens
+    # through the reloaded user; a login's last_login update can be skipped
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        auth_cache.forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=CoreUser)
+def core_user_deleted(sender, instance, **kwargs):
+    forget_user_company(instance)
+    auth_cache.forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def core_user_logged_out(sender, request, **kwargs):
+    auth_cache.forget_session(request.session.session_key)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    auth_cache.forget_token(instance.key)
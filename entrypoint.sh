@@ -13,6 +13,22 @@ python manage.py wait_for_db
 echo "Running database migrations..."
 python manage.py migrate --noinput
 
+# Create upcoming monthly history partitions and apply retention
+echo "Maintaining history partitions..."
+python manage.py manage_partitions
+
+# Delete processed webhook deliveries past the retention period
+echo "Pruning inbound WhatsApp messages..."
+python manage.py prune_inbound_messages
+
+# Rebuild dashboard counters from the source tables
+echo "Reconciling parking stats..."
+python manage.py reconcile_parking_stats
+
+# Catch up the daily operations rollups
+echo "Updating daily rollups..."
+python manage.py update_rollups
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
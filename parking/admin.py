@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ParkingSlot, Customer, ParkingTransaction, NotificationLog
+from .models import ParkingSlot, Customer, ParkingTransaction, NotificationLog, ParkingStats
 
 # Register your models here.
 # parking/admin.py
@@ -20,9 +20,19 @@ class ParkingTransactionAdmin(admin.ModelAdmin):
     list_display = ('id', 'slot', 'customer', 'employee_assigned', 'status', 'requested_at')
     list_filter = ('status', 'slot__company')
     search_fields = ('id', 'customer__phone_number', 'slot__name')
+    exclude = ('raw_payload',)
+    readonly_fields = ('raw_whatsapp_payload',)
 
 @admin.register(NotificationLog)
 class NotificationLogAdmin(admin.ModelAdmin):
     list_display = ('id', 'transaction', 'direction', 'timestamp')
     list_filter = ('direction',)
     search_fields = ('transaction__id', 'whatsapp_message_id')
+    exclude = ('raw_payload',)
+    readonly_fields = ('payload',)
+
+@admin.register(ParkingStats)
+class ParkingStatsAdmin(admin.ModelAdmin):
+    list_display = ('company', 'division', 'total_slots', 'occupied_slots', 'pending_park', 'parked', 'pending_retrieve', 'cancelled', 'updated_at')
+    list_filter = ('company',)
+    search_fields = ('company__name', 'division')
@@ -0,0 +1,169 @@
+# parking/allocation.py
+"""
+Free-slot allocation per (company, division).
+
+Each process keeps a free list per division: a FIFO of slot ids ordered by
+slot name plus a set for membership, so taking the next free slot and putting
+a released one back are both O(1). The database stays the source of truth: a
+slot is claimed with a conditional ``UPDATE ... WHERE is_occupied = false``,
+so two processes (or threads) handing out the same id cannot both win; the
+loser drops the stale id and moves on to the next one.
+
+Free lists are loaded from the database on first use and reloaded whenever
+one runs dry, which picks up slots released by other processes. Slot saves
+and deletes drop the company's lists (see parking/signals.py).
+
+An allocated slot that no transaction ends up using (the client never
+followed up) is handed back with ``release``.
+"""
+import threading
+from collections import deque
+
+from django.db import transaction as db_transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import events, slot_cache, stats
+from .models import ParkingSlot, ParkingTransaction
+
+# Transactions that keep their slot occupied
+HOLDING_STATUSES = (
+    ParkingTransaction.Status.PENDING_PARK,
+    ParkingTransaction.Status.PARKED,
+    ParkingTransaction.Status.PENDING_RETRIEVE,
+)
+
+
+class FreeSlotIndex:
+    """In-process free lists of slot ids keyed by (company_id, division)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free = {}
+
+    def _load(self, company_id, division):
+        ids = ParkingSlot.objects.filter(
+            company_id=company_id,
+            division=division,
+            is_active=True,
+            is_occupied=False,
+        ).order_by('name').values_list('id', flat=True)
+        ids = list(ids)
+        return deque(ids), set(ids)
+
+    def take(self, company_id, division):
+        """Pop the next candidate id, loading the free list on first use; None if it is empty."""
+        key = (company_id, division)
+        with self._lock:
+            entry = self._free.get(key)
+        if entry is None:
+            # Load outside the lock so a slow query does not block other divisions
+            loaded = self._load(company_id, division)
+            with self._lock:
+                entry = self._free.setdefault(key, loaded)
+        with self._lock:
+            queue, members = entry
+            if not queue:
+                return None
+            slot_id = queue.popleft()
+            members.discard(slot_id)
+            return slot_id
+
+    def release(self, company_id, division, slot_ids):
+        """Put freed slots back on a loaded free list; unloaded lists pick them up when loaded."""
+        with self._lock:
+            entry = self._free.get((company_id, division))
+            if entry is None:
+                return
+            queue, members = entry
+            for slot_id in slot_ids:
+                if slot_id not in members:
+                    members.add(slot_id)
+                    queue.append(slot_id)
+
+    def drop(self, company_id, division):
+        """Forget one division's list so the next ``take`` reloads it."""
+        with self._lock:
+            self._free.pop((company_id, division), None)
+
+    def invalidate(self, company_id):
+        """Forget every list of a company, e.g. after its slots changed."""
+        with self._lock:
+            for key in [key for key in self._free if key[0] == company_id]:
+                del self._free[key]
+
+    def free_count(self, company_id, division):
+        """Size of the loaded free list, or None if it is not loaded in this process."""
+        with self._lock:
+            entry = self._free.get((company_id, division))
+            return len(entry[0]) if entry is not None else None
+
+
+index = FreeSlotIndex()
+
+
+def claim(slot):
+    """
+    Mark ``slot`` occupied if it is active and free. Returns True if this call
+    claimed it. Call inside the database transaction that uses the slot.
+    """
+    now = timezone.now()
+    claimed = ParkingSlot.objects.filter(id=slot.id, is_active=True, is_occupied=False).update(
+        is_occupied=True,
+        updated_at=now
+    )
+    if not claimed:
+        return False
+    slot.is_occupied = True
+    slot.updated_at = now
+    stats.record_changes(slot.company_id, slot.division, {'occupied_slots': 1})
+    events.publish_on_commit(slot.company_id, events.SLOT_OCCUPANCY_CHANGED, events.slot_data(slot))
+    return True
+
+
+def allocate(company_id, division):
+    """
+    Claim the next free slot of a division and return it, or None if the
+    division is full. Call inside the database transaction that uses the slot.
+    """
+    reloaded = False
+    while True:
+        slot_id = index.take(company_id, division)
+        if slot_id is None:
+            if reloaded:
+                return None
+            # This process's list ran dry: reload once to pick up slots freed elsewhere
+            index.drop(company_id, division)
+            reloaded = True
+            continue
+        slot = slot_cache.get(slot_id)
+        if slot is not None and slot.company_id == company_id and slot.division == division and claim(slot):
+            return slot
+
+
+def release_on_commit(company_id, division, slot_ids):
+    """Return slots freed by the current database transaction to the free list once it commits."""
+    slot_ids = list(slot_ids)
+    db_transaction.on_commit(lambda: index.release(company_id, division, slot_ids))
+
+
+def release(slot):
+    """
+    Free an occupied ``slot`` that no active transaction holds, e.g. one
+    allocated for a car that never arrived. Returns True if this call freed
+    it. Call inside a database transaction.
+    """
+    now = timezone.now()
+    holding = ParkingTransaction.objects.filter(slot_id=OuterRef('id'), status__in=HOLDING_STATUSES)
+    released = ParkingSlot.objects.filter(id=slot.id, is_occupied=True).exclude(Exists(holding)).update(
+        is_occupied=False,
+        updated_at=now
+    )
+    if not released:
+        return False
+    slot.is_occupied = False
+    slot.updated_at = now
+    stats.record_changes(slot.company_id, slot.division, {'occupied_slots': -1})
+    events.publish_on_commit(slot.company_id, events.SLOT_OCCUPANCY_CHANGED, events.slot_data(slot))
+    release_on_commit(slot.company_id, slot.division, [slot.id])
+    return True
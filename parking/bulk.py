@@ -0,0 +1,124 @@
+# parking/bulk.py
+"""
+Bulk slot provisioning shared by POST /api/parking/slots/bulk/ and the
+import_slots management command.
+
+Rows are validated as a set: names already used by the company are found
+with one query per chunk instead of one per row, and valid rows are written
+with bulk_create in chunks.
+"""
+import csv
+import io
+import time
+
+from django.db import IntegrityError, transaction as db_transaction
+
+from . import allocation, stats
+from .models import ParkingSlot
+
+DEFAULT_CHUNK_SIZE = 500
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'f', 'no', 'n'}
+NAME_MAX_LENGTH = ParkingSlot._meta.get_field('name').max_length
+DIVISION_MAX_LENGTH = ParkingSlot._meta.get_field('division').max_length
+
+
+def read_csv(text):
+    """Rows from CSV text with a header line containing name, division and optionally is_active."""
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _parse_bool(value):
+    if value is None or value == '':
+        return True
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'is_active must be true or false, got "{value}"')
+
+
+def _clean_row(row):
+    if not isinstance(row, dict):
+        raise ValueError('row must be an object with name and division')
+    name = str(row.get('name') or '').strip()
+    division = str(row.get('division') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    if not division:
+        raise ValueError('division is required')
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValueError(f'name is longer than {NAME_MAX_LENGTH} characters')
+    if len(division) > DIVISION_MAX_LENGTH:
+        raise ValueError(f'division is longer than {DIVISION_MAX_LENGTH} characters')
+    return name, division, _parse_bool(row.get('is_active'))
+
+
+def import_slots(company, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Create ParkingSlots for ``company`` from ``rows`` (dicts with name,
+    division and optional is_active). Invalid rows and names that already
+    exist are reported and skipped; the rest are inserted.
+
+    Returns {"total_rows", "created", "errors": [{"row", "name", "error"}],
+    "elapsed_seconds", "rows_per_second"} where "row" is 1-based.
+    """
+    started = time.monotonic()
+    errors = []
+    created = 0
+    seen = set()
+
+    for offset in range(0, len(rows), chunk_size):
+        candidates = []
+        for index, row in enumerate(rows[offset:offset + chunk_size], start=offset + 1):
+            try:
+                name, division, is_active = _clean_row(row)
+            except ValueError as e:
+                errors.append({'row': index, 'name': row.get('name') if isinstance(row, dict) else None, 'error': str(e)})
+                continue
+            if name in seen:
+                errors.append({'row': index, 'name': name, 'error': 'duplicate name in import'})
+                continue
+            seen.add(name)
+            candidates.append((index, ParkingSlot(company=company, name=name, division=division, is_active=is_active)))
+
+        existing = set(
+            ParkingSlot.objects.filter(
+                company=company,
+                name__in=[slot.name for _, slot in candidates]
+            ).values_list('name', flat=True)
+        )
+        new_rows = []
+        for index, slot in candidates:
+            if slot.name in existing:
+                errors.append({'row': index, 'name': slot.name, 'error': 'slot with this name already exists'})
+            else:
+                new_rows.append((index, slot))
+
+        try:
+            with db_transaction.atomic():
+                ParkingSlot.objects.bulk_create([slot for _, slot in new_rows])
+        except IntegrityError as e:
+            # A concurrent request created one of these names after our check
+            errors.extend({'row': index, 'name': slot.name, 'error': f'not created: {e}'} for index, slot in new_rows)
+            continue
+        created += len(new_rows)
+
+    if created:
+        # bulk_create does not send post_save, so do what slot_changed does once:
+        # refresh the counters and let allocation offer the new slots
+        stats.refresh_slot_counts(company.id)
+        allocation.index.invalidate(company.id)
+
+    elapsed = time.monotonic() - started
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'total_rows': len(rows),
+        'created': created,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(len(rows) / elapsed, 1) if elapsed else None,
+    }
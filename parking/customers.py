@@ -0,0 +1,35 @@
+# parking/customers.py
+"""
+Customer resolution for incoming messages.
+
+``upsert`` resolves a phone number to its Customer in one round trip with
+INSERT ... ON CONFLICT (phone_number) DO UPDATE ... RETURNING, instead of
+get_or_create's SELECT, INSERT and savepoint. Two messages from a new
+customer arriving at once both get the same row rather than one of them
+failing with an IntegrityError. updated_at records when the customer last
+wrote to us.
+"""
+from django.db import connection
+from django.utils import timezone
+
+from .models import Customer
+
+_FIELDS = ('id', 'phone_number', 'name', 'created_at', 'updated_at')
+
+
+def upsert(phone_number):
+    """The Customer for ``phone_number``, created if needed."""
+    now = timezone.now()
+    table = connection.ops.quote_name(Customer._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (phone_number, name, created_at, updated_at)
+            VALUES (%s, NULL, %s, %s)
+            ON CONFLICT (phone_number) DO UPDATE SET updated_at = EXCLUDED.updated_at
+            RETURNING {', '.join(_FIELDS)}
+            """,
+            [phone_number, now, now]
+        )
+        row = cursor.fetchone()
+    return Customer.from_db(connection.alias, _FIELDS, row)
@@ -0,0 +1,247 @@
+# parking/events.py
+"""
+Company-scoped event fan-out for the /api/parking/events/ stream.
+
+``broker`` keeps a short replay history per company and pushes events to the
+asyncio queues of connected SSE clients. Event ids have the form
+``<epoch>-<seq>``, where epoch identifies this process, so a client resuming
+with a Last-Event-ID from another process (or from before a restart) gets a
+``reset`` event and reloads instead of silently missing events.
+
+By default events only reach clients connected to the same process. When
+PARKING_EVENTS_REDIS_URL is set, publishers write to a Redis channel and every
+process relays that channel into its local broker, so the web workers and the
+ASGI stream server can run as separate processes. If the relay loses Redis
+it reconnects with backoff and then sends connected clients a ``reset``,
+since events published in the meantime did not reach them.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+TRANSACTION_CREATED = 'transaction.created'
+TRANSACTION_STATUS_CHANGED = 'transaction.status_changed'
+SLOT_OCCUPANCY_CHANGED = 'slot.occupancy_changed'
+RESET = 'reset'
+
+REDIS_CHANNEL = 'parking:events'
+# Seconds before the relay reconnects to Redis, doubled up to the maximum
+RELAY_RETRY_SECONDS = 1
+RELAY_RETRY_MAX_SECONDS = 30
+
+
+@dataclass
+class Event:
+    id: str
+    company_id: int
+    type: str
+    data: dict
+
+    def to_sse(self):
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+@dataclass(eq=False)
+class Subscription:
+    company_id: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    backlog: list = field(default_factory=list)
+
+    async def get(self):
+        if self.backlog:
+            return self.backlog.pop(0)
+        return await self.queue.get()
+
+
+class EventBroker:
+    """In-process fan-out with a bounded per-company replay history."""
+
+    def __init__(self, history_size=500, queue_size=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._history = {}
+        self._subscribers = {}
+
+    def deliver(self, company_id, event_type, data):
+        """Record an event and push it to every subscriber of the company."""
+        with self._lock:
+            event = Event(f'{self.epoch}-{next(self._seq)}', company_id, event_type, data)
+            history = self._history.setdefault(company_id, deque(maxlen=self.history_size))
+            history.append(event)
+            subscribers = list(self._subscribers.get(company_id, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(self._enqueue, subscription, event)
+        return event
+
+    def _enqueue(self, subscription, event):
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop what it has not read and make it reload
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait(self._reset_event(subscription.company_id))
+
+    def reset_all(self):
+        """Send every subscriber a reset, e.g. after events may have been missed."""
+        with self._lock:
+            subscribers = [subscription for group in self._subscribers.values() for subscription in group]
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(
+                self._enqueue, subscription, self._reset_event(subscription.company_id)
+            )
+
+    def _reset_event(self, company_id):
+        # Carries the latest id so a reconnect resumes from here instead of replaying
+        history = self._history.get(company_id)
+        last_id = history[-1].id if history else f'{self.epoch}-0'
+        return Event(last_id, company_id, RESET, {})
+
+    def subscribe(self, company_id, last_event_id=None):
+        """Register the running event loop's task as a subscriber of a company."""
+        subscription = Subscription(
+            company_id=company_id,
+            loop=asyncio.get_running_loop(),
+            queue=asyncio.Queue(maxsize=self.queue_size),
+        )
+        with self._lock:
+            self._subscribers.setdefault(company_id, set()).add(subscription)
+            if last_event_id:
+                subscription.backlog = self._replay(company_id, last_event_id)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.get(subscription.company_id, set()).discard(subscription)
+
+    def _replay(self, company_id, last_event_id):
+        """Events after ``last_event_id``, or a reset if they are no longer available."""
+        epoch, _, seq = last_event_id.partition('-')
+        history = self._history.get(company_id, ())
+        if epoch != self.epoch or not seq.isdigit():
+            return [self._reset_event(company_id)]
+        seq = int(seq)
+        if history and seq < int(history[0].id.split('-')[1]) - 1:
+            return [self._reset_event(company_id)]
+        return [event for event in history if int(event.id.split('-')[1]) > seq]
+
+    def subscriber_count(self, company_id=None):
+        with self._lock:
+            if company_id is not None:
+                return len(self._subscribers.get(company_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class RedisEventRelay:
+    """Publishes events to Redis and feeds the channel into the local broker."""
+
+    def __init__(self, url, broker):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.broker = broker
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, company_id, event_type, data):
+        message = json.dumps({'company_id': company_id, 'type': event_type, 'data': data}, default=str)
+        self.client.publish(REDIS_CHANNEL, message)
+
+    def ensure_listening(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='parking-events-relay', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        # Runs for the life of the process: a lost connection must not leave
+        # the streams that are already open without events
+        delay = RELAY_RETRY_SECONDS
+        reconnecting = False
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(REDIS_CHANNEL)
+                if reconnecting:
+                    self.broker.reset_all()
+                delay = RELAY_RETRY_SECONDS
+                for message in pubsub.listen():
+                    try:
+                        payload = json.loads(message['data'])
+                        self.broker.deliver(payload['company_id'], payload['type'], payload['data'])
+                    except (ValueError, KeyError) as e:
+                        print(f"[Error relaying parking event] {e}")
+            except Exception as e:
+                print(f"[Error in parking event relay] {e}; reconnecting in {delay}s")
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            reconnecting = True
+            time.sleep(delay)
+            delay = min(delay * 2, RELAY_RETRY_MAX_SECONDS)
+
+
+broker = EventBroker()
+_relay = None
+
+
+def get_relay():
+    global _relay
+    url = getattr(settings, 'PARKING_EVENTS_REDIS_URL', None)
+    if url and _relay is None:
+        _relay = RedisEventRelay(url, broker)
+    return _relay
+
+
+def publish(company_id, event_type, data):
+    try:
+        relay = get_relay()
+        if relay is not None:
+            relay.publish(company_id, event_type, data)
+        else:
+            broker.deliver(company_id, event_type, data)
+    except Exception as e:
+        # Live updates are best effort; clients re-sync on their next reload
+        print(f"[Error publishing parking event] {e}")
+
+
+def publish_on_commit(company_id, event_type, data):
+    """Publish once the surrounding database transaction commits."""
+    db_transaction.on_commit(lambda: publish(company_id, event_type, data))
+
+
+def transaction_data(transaction, **extra):
+    data = {
+        'id': str(transaction.id),
+        'status': transaction.status,
+        'slot_id': str(transaction.slot_id),
+        'slot_name': transaction.slot.name,
+        'division': transaction.slot.division,
+        'plate_number': transaction.plate_number,
+        'requested_at': transaction.requested_at.isoformat(),
+    }
+    data.update(extra)
+    return data
+
+
+def slot_data(slot):
+    return {
+        'id': str(slot.id),
+        'name': slot.name,
+        'division': slot.division,
+        'is_occupied': slot.is_occupied,
+    }
@@ -0,0 +1,130 @@
+# parking/export.py
+"""
+Streaming export of transactions as CSV or NDJSON, shared by
+GET /api/parking/transactions/export.<csv|ndjson> and the
+export_transactions management command.
+
+Rows are read with a server-side cursor (``iterator(chunk_size=...)``) inside
+a read-only transaction, so PostgreSQL streams the result instead of
+materializing it, and are emitted in text chunks of ``CHUNK_ROWS`` rows.
+Memory stays constant whatever the size of the range.
+"""
+import csv
+import datetime
+import io
+import json
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ParkingTransaction
+
+CURSOR_CHUNK_SIZE = 2000
+CHUNK_ROWS = 1000
+
+# Output column → ORM lookup
+FIELDS = {
+    'id': 'id',
+    'status': 'status',
+    'plate_number': 'plate_number',
+    'slot': 'slot__name',
+    'division': 'slot__division',
+    'customer_phone': 'customer__phone_number',
+    'customer_name': 'customer__name',
+    'employee': 'employee_assigned__user__username',
+    'ticket_code': 'ticket_code',
+    'requested_at': 'requested_at',
+    'parked_at': 'parked_at',
+    'retrieve_requested_at': 'retrieve_requested_at',
+    'delivered_at': 'delivered_at',
+    'cancelled_at': 'cancelled_at',
+}
+
+# Computed column → (start, end) timestamps, in seconds
+DURATIONS = {
+    'wait_to_park_seconds': ('requested_at', 'parked_at'),
+    'dwell_seconds': ('parked_at', 'retrieve_requested_at'),
+    'retrieve_wait_seconds': ('retrieve_requested_at', 'delivered_at'),
+}
+
+COLUMNS = list(FIELDS) + list(DURATIONS)
+
+
+def parse_bound(value):
+    """An aware datetime from an ISO date or datetime string; None for empty. Raises ValueError."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date "{value}", expected YYYY-MM-DD or an ISO datetime')
+        parsed = datetime.datetime(day.year, day.month, day.day)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(company, start=None, end=None, statuses=None):
+    """Transactions of ``company`` requested in [start, end), oldest first."""
+    queryset = ParkingTransaction.objects.filter(company=company)
+    if start is not None:
+        queryset = queryset.filter(requested_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(requested_at__lt=end)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset.order_by('requested_at', 'id').values_list(*FIELDS.values())
+
+
+def rows(queryset):
+    """Export rows as dicts, read through a server-side cursor."""
+    # Inside a transaction the cursor is declared WITHOUT HOLD, so rows are
+    # produced as they are fetched rather than materialized at commit.
+    with db_transaction.atomic():
+        for values in queryset.iterator(chunk_size=CURSOR_CHUNK_SIZE):
+            row = dict(zip(FIELDS, values))
+            for column, (start, end) in DURATIONS.items():
+                if row[start] is not None and row[end] is not None:
+                    row[column] = round((row[end] - row[start]).total_seconds(), 1)
+                else:
+                    row[column] = None
+            yield row
+
+
+def _text(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def csv_chunks(queryset):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in rows(queryset):
+        writer.writerow({column: _text(value) if value is not None else None for column, value in row.items()})
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(queryset):
+    lines = []
+    for row in rows(queryset):
+        lines.append(json.dumps(row, default=_text))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+# format → (chunk generator, content type)
+FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+}
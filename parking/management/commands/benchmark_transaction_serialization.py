@@ -0,0 +1,77 @@
+"""
+Django command to compare nested and flat serialization of transaction listings
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from rest_framework.renderers import JSONRenderer
+from core.models import CoreUser
+from companies.models import Company
+from parking import projections
+from parking.models import Customer, ParkingSlot, ParkingTransaction
+from parking.serializers import ParkingTransactionSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data"""
+
+
+class Command(BaseCommand):
+    """Django command to benchmark transaction list serialization"""
+    help = 'Serialize N seeded transactions with the nested serializer and the flat projection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--slots', type=int, default=200)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            with db_transaction.atomic():
+                company = self.seed(options['rows'], options['slots'])
+                queryset = ParkingTransaction.objects.filter(company=company).order_by('-requested_at', '-id')
+                self.report('nested serializer', lambda: ParkingTransactionSerializer(
+                    queryset.select_related('customer', 'slot'), many=True
+                ).data)
+                fields = list(projections.FLAT_FIELDS)
+                self.report('flat projection', lambda: dict(zip(
+                    ('results', 'slots'),
+                    projections.flat_rows(projections.flat_queryset(queryset, fields), fields)
+                )))
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows, slot_count):
+        self.stdout.write(f'Seeding {rows} transactions over {slot_count} slots (rolled back afterwards)...')
+        admin = CoreUser.objects.create_user(username='benchmark-serialization-admin', password=None,
+                                             role=CoreUser.Role.COMPANY_ADMIN)
+        company = Company.objects.create(name='Benchmark Serialization', phone_number='+0000000000',
+                                         location='Benchmark', company_code='BENCHSER', admin_user=admin)
+        slots = ParkingSlot.objects.bulk_create(
+            ParkingSlot(company=company, name=f'S{i:04d}', division=f'Level {i % 4}') for i in range(slot_count)
+        )
+        customers = Customer.objects.bulk_create(
+            Customer(phone_number=f'+1999{i:07d}') for i in range(rows // 3 + 1)
+        )
+        ParkingTransaction.objects.bulk_create(
+            (ParkingTransaction(
+                company=company,
+                slot=slots[i % slot_count],
+                customer=customers[i % len(customers)],
+                plate_number=f'BM{i:06d}',
+            ) for i in range(rows)),
+            batch_size=2000,
+        )
+        return company
+
+    def report(self, label, build):
+        started = time.perf_counter()
+        data = build()
+        built = time.perf_counter()
+        payload = JSONRenderer().render(data)
+        rendered = time.perf_counter()
+        self.stdout.write(
+            f'{label:>18}: build {built - started:.3f}s, render {rendered - built:.3f}s, '
+            f'total {rendered - started:.3f}s, payload {len(payload) / 1024:.0f} KiB'
+        )
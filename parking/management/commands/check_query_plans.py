@@ -0,0 +1,151 @@
+"""
+Django command to check that the parking hot-path queries are planned with their indexes
+"""
+import json
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from companies.models import Company
+from parking.models import NotificationLog, ParkingSlot, ParkingTransaction
+from parking.pagination import TransactionCursorPagination
+
+
+def hot_queries(company):
+    """(label, queryset, expected index) for the queries behind the API and webhook."""
+    slot = ParkingSlot.objects.filter(company=company).first()
+    tx = ParkingTransaction.objects.filter(company=company).first()
+    division = slot.division if slot else 'Level 1'
+    slot_id = slot.id if slot else uuid.uuid4()
+    customer_id = tx.customer_id if tx and tx.customer_id else 0
+    tx_id = tx.id if tx else uuid.uuid4()
+    page = TransactionCursorPagination.page_size + 1
+
+    return [
+        (
+            'transaction list (cursor page)',
+            ParkingTransaction.objects.filter(company=company).order_by('-requested_at', '-id')[:page],
+            'parking_tx_company_req_idx',
+        ),
+        (
+            'transaction list filtered by status',
+            ParkingTransaction.objects.filter(
+                company=company,
+                status=ParkingTransaction.Status.PARKED
+            ).order_by('-requested_at', '-id')[:page],
+            'parking_tx_company_status_idx',
+        ),
+        (
+            'active transaction in slot',
+            ParkingTransaction.objects.filter(slot_id=slot_id, status__in=ParkingTransaction.ACTIVE_STATUSES),
+            'parking_tx_active_slot_idx',
+        ),
+        (
+            'active transactions of customer',
+            ParkingTransaction.objects.filter(
+                customer_id=customer_id,
+                status__in=ParkingTransaction.ACTIVE_STATUSES
+            ).order_by('-requested_at'),
+            'parking_tx_active_cust_idx',
+        ),
+        (
+            'free slots of division (allocation)',
+            ParkingSlot.objects.filter(
+                company=company,
+                division=division,
+                is_active=True,
+                is_occupied=False
+            ).order_by('name').values_list('id', flat=True),
+            'parking_slot_free_idx',
+        ),
+        (
+            'slots of division',
+            ParkingSlot.objects.filter(company=company, division=division).order_by('name'),
+            'parking_slot_division_idx',
+        ),
+        (
+            'message history of transaction',
+            NotificationLog.objects.filter(transaction_id=tx_id).order_by('timestamp'),
+            'parking_log_tx_ts_idx',
+        ),
+    ]
+
+
+def plan_indexes(plan):
+    """Names of every index used anywhere in an EXPLAIN (FORMAT JSON) plan tree."""
+    names = set()
+    if 'Index Name' in plan:
+        names.add(plan['Index Name'])
+    for child in plan.get('Plans', ()):
+        names |= plan_indexes(child)
+    return names
+
+
+def with_parent_indexes(cursor, names):
+    """Add the parent index of every partition index in ``names`` (see parking/partitions.py)."""
+    if not names:
+        return names
+    cursor.execute(
+        """
+        SELECT parent.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE child.relkind = 'i' AND child.relname = ANY(%s)
+        """,
+        [sorted(names)]
+    )
+    return names | {name for (name,) in cursor.fetchall()}
+
+
+class Command(BaseCommand):
+    """Django command to EXPLAIN the parking hot-path queries"""
+    help = 'EXPLAIN each hot query and fail unless it is planned with its index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-code', help='Company whose data parameterizes the queries (default: first company)')
+        parser.add_argument(
+            '--natural', action='store_true',
+            help='Keep the planner free to choose sequential scans and sorts (meaningful on production-sized data only)'
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print each plan')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('check_query_plans needs PostgreSQL')
+
+        if options['company_code']:
+            try:
+                company = Company.objects.get(company_code=options['company_code'].upper())
+            except Company.DoesNotExist:
+                raise CommandError(f"Unknown company code {options['company_code']}")
+        else:
+            company = Company.objects.order_by('id').first()
+            if company is None:
+                raise CommandError('No company to run the queries for')
+
+        failures = []
+        with db_transaction.atomic():
+            if not options['natural']:
+                # Small development tables are cheaper to scan and sort; this
+                # checks the index can serve the query and its ORDER BY, not
+                # whether the planner prefers it at today's table sizes.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_sort = off')
+
+            for label, queryset, expected in hot_queries(company):
+                plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+                with connection.cursor() as cursor:
+                    used = with_parent_indexes(cursor, plan_indexes(plan))
+                if options['verbose_plans']:
+                    self.stdout.write(queryset.explain())
+                if expected in used:
+                    self.stdout.write(self.style.SUCCESS(f'ok    {label}: {expected}'))
+                else:
+                    found = ', '.join(sorted(used)) or f"{plan['Node Type']}, no index"
+                    self.stdout.write(self.style.ERROR(f'FAIL  {label}: expected {expected}, got {found}'))
+                    failures.append(label)
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot query(ies) not using their index: {", ".join(failures)}')
@@ -0,0 +1,49 @@
+"""
+Django command to export a company's transactions as CSV or NDJSON
+"""
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Company
+from parking import export
+from parking.models import ParkingTransaction
+
+
+class Command(BaseCommand):
+    """Django command to stream transactions to a file or stdout"""
+    help = 'Export transactions requested in [--from, --to) as CSV or NDJSON with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-code', required=True)
+        parser.add_argument('--from', dest='start', help='YYYY-MM-DD or ISO datetime, inclusive')
+        parser.add_argument('--to', dest='end', help='YYYY-MM-DD or ISO datetime, exclusive')
+        parser.add_argument('--status', help='Comma-separated statuses to include')
+        parser.add_argument('--format', dest='file_format', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            company = Company.objects.get(company_code=options['company_code'].upper())
+        except Company.DoesNotExist:
+            raise CommandError(f"Unknown company code {options['company_code']}")
+
+        try:
+            start = export.parse_bound(options['start'])
+            end = export.parse_bound(options['end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        statuses = [value for value in (options['status'] or '').split(',') if value]
+        invalid = set(statuses) - set(ParkingTransaction.Status.values)
+        if invalid:
+            raise CommandError(f"Invalid status: {', '.join(sorted(invalid))}")
+
+        generate, _ = export.FORMATS[options['file_format']]
+        chunks = generate(export.export_queryset(company, start, end, statuses))
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
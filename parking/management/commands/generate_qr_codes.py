@@ -0,0 +1,36 @@
+"""
+Django command to render QR codes for parking slots on a process pool
+"""
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Company
+from parking import qr
+from parking.models import ParkingSlot
+
+
+class Command(BaseCommand):
+    """Django command to generate slot QR codes"""
+    help = 'Render QR codes for a company or division, skipping slots whose content is unchanged'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-code', help='Only this company (default: all companies)')
+        parser.add_argument('--division', help='Only this division')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--force', action='store_true', help='Re-render even unchanged codes')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        slots = ParkingSlot.objects.all()
+        if options['company_code']:
+            try:
+                company = Company.objects.get(company_code=options['company_code'].upper())
+            except Company.DoesNotExist:
+                raise CommandError(f"Unknown company code {options['company_code']}")
+            slots = slots.filter(company=company)
+        if options['division']:
+            slots = slots.filter(division=options['division'])
+
+        report = qr.generate(slots, workers=options['workers'], force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {report['rendered']} QR code(s), skipped {report['skipped']} unchanged "
+            f"of {report['total']} in {report['elapsed_seconds']}s"
+        ))
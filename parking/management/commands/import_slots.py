@@ -0,0 +1,46 @@
+"""
+Django command to provision parking slots in bulk from a CSV or JSON file
+"""
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Company
+from parking import bulk
+
+
+class Command(BaseCommand):
+    """Django command to import parking slots"""
+    help = 'Import slots from a CSV (name,division,is_active) or JSON list file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file to import')
+        parser.add_argument('--company-code', required=True, help='Company that owns the slots')
+        parser.add_argument('--chunk-size', type=int, default=bulk.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            company = Company.objects.get(company_code=options['company_code'].upper())
+        except Company.DoesNotExist:
+            raise CommandError(f"Unknown company code {options['company_code']}")
+
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        text = path.read_text(encoding='utf-8-sig')
+        if path.suffix.lower() == '.json':
+            rows = json.loads(text)
+            if isinstance(rows, dict):
+                rows = rows.get('slots', [])
+        else:
+            rows = bulk.read_csv(text)
+
+        self.stdout.write(f'Importing {len(rows)} slot(s) into {company.name}...')
+        report = bulk.import_slots(company, rows, chunk_size=options['chunk_size'])
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"  row {error['row']} ({error['name']}): {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} of {report['total_rows']} slot(s) "
+            f"in {report['elapsed_seconds']}s ({report['rows_per_second']} rows/s)"
+        ))
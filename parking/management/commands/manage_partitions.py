@@ -0,0 +1,71 @@
+"""
+Django command to create upcoming history partitions and expire old ones
+"""
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from parking import partitions, payloads
+from parking.models import NotificationLog, ParkingTransaction
+
+
+class Command(BaseCommand):
+    """Django command to maintain the monthly partitions of transactions and message logs"""
+    help = 'Pre-create monthly partitions and detach (or drop) months past the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead', type=int, default=settings.PARKING_PARTITION_MONTHS_AHEAD,
+            help='Create partitions up to this many months after the current one'
+        )
+        parser.add_argument(
+            '--transaction-retention', type=int, default=settings.PARKING_TRANSACTION_RETENTION_MONTHS,
+            help='Months of transactions to keep (0 keeps everything)'
+        )
+        parser.add_argument(
+            '--log-retention', type=int, default=settings.NOTIFICATION_LOG_RETENTION_MONTHS,
+            help='Months of notification logs to keep (0 keeps everything)'
+        )
+        parser.add_argument('--drop', action='store_true', help='Drop expired partitions instead of only detaching them')
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running, maintaining partitions every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL')
+
+        transaction_retention = options['transaction_retention']
+        log_retention = options['log_retention']
+        if transaction_retention and not 0 < log_retention <= transaction_retention:
+            # Logs point at their transaction without a database constraint
+            raise CommandError('Notification logs must not be kept longer than the transactions they belong to')
+
+        retention = {
+            ParkingTransaction._meta.db_table: transaction_retention,
+            NotificationLog._meta.db_table: log_retention,
+        }
+        while True:
+            dropped = False
+            for table, column in partitions.PARTITIONED_TABLES.items():
+                with connection.cursor() as cursor:
+                    if not partitions.is_partitioned(cursor, table):
+                        raise CommandError(f'{table} is not partitioned; run migrate first')
+                with db_transaction.atomic():
+                    for name in partitions.ensure_partitions(connection, table, column, options['months_ahead']):
+                        self.stdout.write(f'created {name}')
+                if retention[table]:
+                    with db_transaction.atomic():
+                        for action, name in partitions.expire_partitions(
+                            connection, table, retention[table], drop=options['drop']
+                        ):
+                            self.stdout.write(f'{action} {name}')
+                            dropped = dropped or action == 'dropped'
+            if dropped:
+                self.stdout.write(f'deleted {payloads.prune()} unreferenced payload(s)')
+            self.stdout.write(self.style.SUCCESS('Partitions are up to date'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
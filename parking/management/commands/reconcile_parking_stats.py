@@ -0,0 +1,35 @@
+"""
+Django command to rebuild parking stats counters from the source tables
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Company
+from parking import stats
+
+
+class Command(BaseCommand):
+    """Django command to reconcile ParkingStats counters"""
+    help = 'Rebuild ParkingStats counters and report how many rows had drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company-code', help='Only reconcile this company')
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running, reconciling every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        company_id = None
+        if options['company_code']:
+            try:
+                company_id = Company.objects.get(company_code=options['company_code'].upper()).id
+            except Company.DoesNotExist:
+                raise CommandError(f"Unknown company code {options['company_code']}")
+
+        while True:
+            drifted = stats.reconcile(company_id)
+            self.stdout.write(self.style.SUCCESS(f'Reconciled parking stats: {drifted} row(s) corrected'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
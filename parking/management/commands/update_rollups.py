@@ -0,0 +1,57 @@
+"""
+Django command to bring the daily parking rollups up to date
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from companies.models import Company
+from parking import rollups
+
+
+class Command(BaseCommand):
+    """Django command to update DailyRollup rows"""
+    help = (
+        'Recompute the daily rollups of days with transactions changed since the last run. '
+        'Use --rebuild after deleting transactions or moving slots between divisions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every day instead of only changed ones')
+        parser.add_argument('--company-code', help='Only rebuild this company (with --rebuild)')
+        parser.add_argument('--since', help='Only rebuild days from this date, YYYY-MM-DD (with --rebuild)')
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running, updating every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['rebuild']:
+            company_id = None
+            if options['company_code']:
+                try:
+                    company_id = Company.objects.get(company_code=options['company_code'].upper()).id
+                except Company.DoesNotExist:
+                    raise CommandError(f"Unknown company code {options['company_code']}")
+            since_day = None
+            if options['since']:
+                since_day = parse_date(options['since'])
+                if since_day is None:
+                    raise CommandError(f"Invalid date {options['since']}, expected YYYY-MM-DD")
+            started = time.monotonic()
+            days = rollups.rebuild(company_id, since_day)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {days} company day(s) in {time.monotonic() - started:.2f}s'
+            ))
+            return
+
+        while True:
+            started = time.monotonic()
+            report = rollups.update()
+            self.stdout.write(self.style.SUCCESS(
+                f"Updated {report['days']} company day(s) through {report['until']:%Y-%m-%d %H:%M:%S} "
+                f"in {time.monotonic() - started:.2f}s"
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.21 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_transaction_company(apps, schema_editor):
+    ParkingSlot = apps.get_model("parking", "ParkingSlot")
+    ParkingTransaction = apps.get_model("parking", "ParkingTransaction")
+    ParkingTransaction.objects.filter(company__isnull=True).update(
+        company_id=Subquery(
+            ParkingSlot.objects.filter(id=OuterRef("slot_id")).values("company_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0002_initial"),
+        ("parking", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkingtransaction",
+            name="company",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="parking_transactions",
+                to="companies.company",
+            ),
+        ),
+        migrations.RunPython(backfill_transaction_company, migrations.RunPython.noop),
+    ]
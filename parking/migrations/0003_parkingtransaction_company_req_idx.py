@@ -0,0 +1,31 @@
+# Generated by Django 4.2.21 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0002_initial"),
+        ("parking", "0002_parkingtransaction_company"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="parkingtransaction",
+            name="company",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="parking_transactions",
+                to="companies.company",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingtransaction",
+            index=models.Index(
+                fields=["company", "requested_at", "id"],
+                name="parking_tx_company_req_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_initial'),
+        ('parking', '0003_parkingtransaction_company_req_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParkingStats',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('division', models.CharField(max_length=100)),
+                ('total_slots', models.IntegerField(default=0)),
+                ('active_slots', models.IntegerField(default=0)),
+                ('occupied_slots', models.IntegerField(default=0)),
+                ('pending_park', models.IntegerField(default=0)),
+                ('parked', models.IntegerField(default=0)),
+                ('pending_retrieve', models.IntegerField(default=0)),
+                ('delivered', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parking_stats', to='companies.company')),
+            ],
+            options={
+                'verbose_name_plural': 'parking stats',
+                'unique_together': {('company', 'division')},
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.21 on 2026-10-18 20:44
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Indexes are built with CREATE INDEX CONCURRENTLY so the transaction and
+    # log tables stay writable; that cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("parking", "0005_parkingslot_qr_code_hash"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="notificationlog",
+            index=models.Index(
+                fields=["transaction", "timestamp"], name="parking_log_tx_ts_idx"
+            ),
+        ),
+        # The single-column FK index is a prefix of parking_log_tx_ts_idx
+        migrations.AlterField(
+            model_name="notificationlog",
+            name="transaction",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="notification_logs",
+                to="parking.parkingtransaction",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="parkingslot",
+            index=models.Index(
+                fields=["company", "division", "name"], name="parking_slot_division_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="parkingslot",
+            index=models.Index(
+                condition=models.Q(("is_active", True), ("is_occupied", False)),
+                fields=["company", "division", "name"],
+                name="parking_slot_free_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="parkingtransaction",
+            index=models.Index(
+                fields=["company", "status", "requested_at", "id"],
+                name="parking_tx_company_status_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="parkingtransaction",
+            index=models.Index(
+                condition=models.Q(
+                    ("status__in", ("pending_park", "parked", "pending_retrieve"))
+                ),
+                fields=["slot", "status"],
+                name="parking_tx_active_slot_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="parkingtransaction",
+            index=models.Index(
+                condition=models.Q(
+                    ("status__in", ("pending_park", "parked", "pending_retrieve"))
+                ),
+                fields=["customer", "requested_at"],
+                name="parking_tx_active_cust_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.21 on 2026-10-18 21:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from parking import partitions
+
+
+def partition_history_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column in partitions.PARTITIONED_TABLES.items():
+        partitions.convert_table(schema_editor.connection, table, column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0006_hot_path_indexes"),
+    ]
+
+    operations = [
+        # A partitioned ParkingTransaction has no unique index on id alone to reference
+        migrations.AlterField(
+            model_name="notificationlog",
+            name="transaction",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="notification_logs",
+                to="parking.parkingtransaction",
+            ),
+        ),
+        migrations.RunPython(partition_history_tables),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.21 on 2026-10-18 21:20
+
+from django.db import migrations, transaction
+
+from parking import payloads
+
+CHUNK_SIZE = 1000
+
+
+def backfill_raw_payloads(apps, schema_editor):
+    RawPayload = apps.get_model("parking", "RawPayload")
+    for model_name, field in (("ParkingTransaction", "raw_whatsapp_payload"), ("NotificationLog", "payload")):
+        model = apps.get_model("parking", model_name)
+        pending = model.objects.filter(raw_payload__isnull=True, **{f"{field}__isnull": False})
+        while True:
+            # One transaction per chunk, so a large backfill neither holds
+            # locks for its whole run nor starts over after an interruption
+            with transaction.atomic():
+                rows = list(pending.order_by().values_list("id", field)[:CHUNK_SIZE])
+                if not rows:
+                    break
+                encoded = {row_id: payloads.encode(data) for row_id, data in rows}
+                RawPayload.objects.bulk_create(
+                    [
+                        RawPayload(digest=digest, data=blob, size=size)
+                        for digest, blob, size in {value[0]: value for value in encoded.values()}.values()
+                    ],
+                    ignore_conflicts=True,
+                )
+                payload_ids = dict(
+                    RawPayload.objects.filter(
+                        digest__in={digest for digest, _, _ in encoded.values()}
+                    ).values_list("digest", "id")
+                )
+                updated = [
+                    model(id=row_id, raw_payload_id=payload_ids[digest])
+                    for row_id, (digest, _, _) in encoded.items()
+                ]
+                model.objects.bulk_update(updated, ["raw_payload"])
+
+
+class Migration(migrations.Migration):
+    # Chunks commit independently
+    atomic = False
+
+    dependencies = [
+        ("parking", "0008_rawpayload"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_raw_payloads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.21 on 2026-10-18 21:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0009_backfill_rawpayload"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="parkingtransaction",
+            name="raw_whatsapp_payload",
+        ),
+        migrations.RemoveField(
+            model_name="notificationlog",
+            name="payload",
+        ),
+        migrations.AlterField(
+            model_name="notificationlog",
+            name="raw_payload",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="parking.rawpayload",
+            ),
+        ),
+    ]
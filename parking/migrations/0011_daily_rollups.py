@@ -0,0 +1,65 @@
+# Generated by Django 4.2.21 on 2026-10-18 21:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_initial'),
+        ('parking', '0010_drop_inline_payloads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('division', models.CharField(blank=True, max_length=100)),
+                ('day', models.DateField()),
+                ('requests', models.IntegerField(default=0)),
+                ('parked', models.IntegerField(default=0)),
+                ('delivered', models.IntegerField(default=0)),
+                ('time_to_park_avg', models.FloatField(null=True)),
+                ('time_to_park_p50', models.FloatField(null=True)),
+                ('time_to_park_p90', models.FloatField(null=True)),
+                ('time_to_park_p99', models.FloatField(null=True)),
+                ('dwell_avg', models.FloatField(null=True)),
+                ('dwell_p50', models.FloatField(null=True)),
+                ('dwell_p90', models.FloatField(null=True)),
+                ('dwell_p99', models.FloatField(null=True)),
+                ('retrieve_latency_avg', models.FloatField(null=True)),
+                ('retrieve_latency_p50', models.FloatField(null=True)),
+                ('retrieve_latency_p90', models.FloatField(null=True)),
+                ('retrieve_latency_p99', models.FloatField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='parkingtransaction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='parkingtransaction',
+            index=models.Index(fields=['updated_at'], name='parking_tx_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='companies.company'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyrollup',
+            unique_together={('company', 'day', 'division')},
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0012_notificationlog_transaction_optional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingstats',
+            name='cancelled',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='parkingtransaction',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='parkingtransaction',
+            name='status',
+            field=models.CharField(choices=[('pending_park', 'Pending Park'), ('parked', 'Parked'), ('pending_retrieve', 'Pending Retrieve'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending_park', max_length=20),
+        ),
+    ]
@@ -2,7 +2,9 @@ from django.db import models
 
 # Create your models here.
 # parking/models.py
+import json
 import uuid
+import zlib
 from django.db import models
 from django.conf import settings
 
@@ -19,6 +21,7 @@ class ParkingSlot(models.Model):
     name = models.CharField(max_length=100)
     division = models.CharField(max_length=100)
     qr_code_image = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    qr_code_hash = models.CharField(max_length=64, blank=True, default='')  # content hash of the rendered QR code
     is_active = models.BooleanField(default=True)
     is_occupied = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -26,6 +29,16 @@ class ParkingSlot(models.Model):
 
     class Meta:
         unique_together = ('company', 'name')    # slot names unique per company
+        indexes = [
+            # Slots of a division in name order (division filters, QR archives, stats grouping)
+            models.Index(fields=['company', 'division', 'name'], name='parking_slot_division_idx'),
+            # Free-slot lists loaded by parking.allocation
+            models.Index(
+                fields=['company', 'division', 'name'],
+                condition=models.Q(is_active=True, is_occupied=False),
+                name='parking_slot_free_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.company.name}"
@@ -43,17 +56,48 @@ class Customer(models.Model):
     def __str__(self):
         return self.phone_number
 
+class RawPayload(models.Model):
+    """
+    A raw webhook payload, stored once per distinct content as zlib-compressed
+    canonical JSON keyed by its SHA-256. Written through parking.payloads.
+    """
+    id = models.BigAutoField(primary_key=True)
+    digest = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField()   # uncompressed bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def value(self):
+        return json.loads(zlib.decompress(self.data))
+
+    def __str__(self):
+        return f"Payload {self.digest[:12]} ({self.size} bytes)"
+
+# Used in ParkingTransaction.Meta, where the class attributes are not in scope yet
+ACTIVE_TRANSACTION_STATUSES = ('pending_park', 'parked', 'pending_retrieve')
+
 class ParkingTransaction(models.Model):
     """
-    Tracks each parking request: pending_park → parked → pending_retrieve → delivered.
+    Tracks each parking request: pending_park → parked → pending_retrieve → delivered,
+    or pending_park → cancelled when the customer withdraws it.
     """
     class Status(models.TextChoices):
         PENDING_PARK = 'pending_park', 'Pending Park'
         PARKED = 'parked', 'Parked'
         PENDING_RETRIEVE = 'pending_retrieve', 'Pending Retrieve'
         DELIVERED = 'delivered', 'Delivered'
+        CANCELLED = 'cancelled', 'Cancelled'
+
+    # Statuses of a car that is still with the valet
+    ACTIVE_STATUSES = ACTIVE_TRANSACTION_STATUSES
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.CASCADE,
+        related_name='parking_transactions'
+    )                                                                     # denormalized from slot for company-scoped indexes
     customer = models.ForeignKey(
         Customer,
         on_delete=models.SET_NULL,
@@ -83,8 +127,47 @@ class ParkingTransaction(models.Model):
     parked_at = models.DateTimeField(blank=True, null=True)               # when employee confirms “Parked”
     retrieve_requested_at = models.DateTimeField(blank=True, null=True)   # when customer says “Get my car”
     delivered_at = models.DateTimeField(blank=True, null=True)            # when employee marks “Delivered”
-    raw_whatsapp_payload = models.JSONField(blank=True, null=True)        # store full webhook payload
+    cancelled_at = models.DateTimeField(blank=True, null=True)            # when customer cancels before parking
+    raw_payload = models.ForeignKey(
+        RawPayload,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+'
+    )                                                                     # full webhook payload, see parking/payloads.py
     ticket_code = models.CharField(max_length=50, blank=True, null=True)  # optionally generated OTP/code
+    updated_at = models.DateTimeField(auto_now=True)                      # set explicitly by queryset updates too; drives parking.rollups
+
+    class Meta:
+        indexes = [
+            # Company-scoped listing ordered by (requested_at, id), used by cursor pagination
+            models.Index(fields=['company', 'requested_at', 'id'], name='parking_tx_company_req_idx'),
+            # Same listing filtered by ?status=, and per-status counts in stats.reconcile
+            models.Index(fields=['company', 'status', 'requested_at', 'id'], name='parking_tx_company_status_idx'),
+            # Active transaction in a slot / for a customer; delivered history is left out
+            models.Index(
+                fields=['slot', 'status'],
+                condition=models.Q(status__in=ACTIVE_TRANSACTION_STATUSES),
+                name='parking_tx_active_slot_idx'
+            ),
+            models.Index(
+                fields=['customer', 'requested_at'],
+                condition=models.Q(status__in=ACTIVE_TRANSACTION_STATUSES),
+                name='parking_tx_active_cust_idx'
+            ),
+            # Transactions changed since the rollup watermark
+            models.Index(fields=['updated_at'], name='parking_tx_updated_idx'),
+        ]
+
+    @property
+    def raw_whatsapp_payload(self):
+        """Full webhook payload; fetched and decompressed on access."""
+        return self.raw_payload.value if self.raw_payload_id else None
+
+    def save(self, *args, **kwargs):
+        if self.company_id is None and self.slot_id is not None:
+            self.company_id = self.slot.company_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"TX {self.id} | Slot {self.slot.name} | Status {self.status}"
@@ -101,12 +184,106 @@ class NotificationLog(models.Model):
     transaction = models.ForeignKey(
         ParkingTransaction,
         on_delete=models.CASCADE,
-        related_name='notification_logs'
+        null=True,                       # replies sent before any transaction exists
+        blank=True,
+        related_name='notification_logs',
+        db_index=False,                  # covered by parking_log_tx_ts_idx
+        db_constraint=False              # transactions are partitioned, see parking/partitions.py
     )
     direction = models.CharField(max_length=10, choices=Direction.choices)
     whatsapp_message_id = models.CharField(max_length=100, blank=True, null=True)
-    payload = models.JSONField()   # full WhatsApp payload or our custom structure
+    raw_payload = models.ForeignKey(
+        RawPayload,
+        on_delete=models.PROTECT,
+        related_name='+'
+    )                              # full WhatsApp payload or our custom structure
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # A transaction's message history in order
+            models.Index(fields=['transaction', 'timestamp'], name='parking_log_tx_ts_idx'),
+        ]
+
+    @property
+    def payload(self):
+        """Full message payload; fetched and decompressed on access."""
+        return self.raw_payload.value
+
+    def __str__(self):
+        return f"Log {self.id} | {self.direction} | TX {self.transaction_id}"
+
+class ParkingStats(models.Model):
+    """
+    Slot and transaction counters per company division, kept current by parking.stats.
+    Transaction counter columns are named after ParkingTransaction.Status values.
+    """
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.CASCADE,
+        related_name='parking_stats'
+    )
+    division = models.CharField(max_length=100)
+    total_slots = models.IntegerField(default=0)
+    active_slots = models.IntegerField(default=0)
+    occupied_slots = models.IntegerField(default=0)
+    pending_park = models.IntegerField(default=0)
+    parked = models.IntegerField(default=0)
+    pending_retrieve = models.IntegerField(default=0)
+    delivered = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('company', 'division')
+        verbose_name_plural = 'parking stats'
+
+    def __str__(self):
+        return f"Stats {self.company_id} / {self.division}"
+
+class DailyRollup(models.Model):
+    """
+    Per-day operations metrics for a company division, built by parking.rollups.
+    Rows with an empty division cover the whole company. Durations are in
+    seconds; a transaction counts towards the day it was requested.
+    """
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.CASCADE,
+        related_name='daily_rollups'
+    )
+    division = models.CharField(max_length=100, blank=True)
+    day = models.DateField()
+    requests = models.IntegerField(default=0)
+    parked = models.IntegerField(default=0)      # requests that reached parked
+    delivered = models.IntegerField(default=0)   # requests that reached delivered
+    time_to_park_avg = models.FloatField(null=True)
+    time_to_park_p50 = models.FloatField(null=True)
+    time_to_park_p90 = models.FloatField(null=True)
+    time_to_park_p99 = models.FloatField(null=True)
+    dwell_avg = models.FloatField(null=True)
+    dwell_p50 = models.FloatField(null=True)
+    dwell_p90 = models.FloatField(null=True)
+    dwell_p99 = models.FloatField(null=True)
+    retrieve_latency_avg = models.FloatField(null=True)
+    retrieve_latency_p50 = models.FloatField(null=True)
+    retrieve_latency_p90 = models.FloatField(null=True)
+    retrieve_latency_p99 = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('company', 'day', 'division')
+
+    def __str__(self):
+        return f"Rollup {self.company_id} / {self.division or '*'} / {self.day}"
+
+class RollupWatermark(models.Model):
+    """How far parking.rollups has processed ParkingTransaction.updated_at."""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"Log {self.id} | {self.direction} | TX {self.transaction.id}"
+        return f"{self.name} @ {self.position}"
@@ -0,0 +1,15 @@
+# parking/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (requested_at, id), newest first.
+
+    Each page is a range scan on parking_tx_company_req_idx, so its cost does
+    not depend on how deep into the history the client has paged.
+    """
+    ordering = ('-requested_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,228 @@
+# parking/partitions.py
+"""
+Monthly range partitioning of the append-only history tables (PostgreSQL).
+
+ParkingTransaction is partitioned on requested_at and NotificationLog on
+timestamp. Each table has one partition per calendar month (UTC), named
+``<table>_pYYYYMM``, plus a ``<table>_default`` partition that catches rows
+outside the prepared months so inserts never fail. ``ensure_partitions``
+creates the coming months ahead of time (moving any matching rows out of the
+default partition first), and ``expire_partitions`` detaches or drops whole
+months past the retention period, which is a catalog change rather than a
+DELETE.
+
+PostgreSQL requires the partition key in every unique index, so the primary
+keys become (id, <partition column>) in the database while Django keeps
+treating ``id`` as the primary key. Nothing can hold a foreign key
+constraint to a partitioned table through ``id`` alone, which is why
+NotificationLog.transaction has db_constraint=False; Django still applies
+on_delete itself.
+
+Indexes added to these tables later are created on the parent and cascade
+to every partition, but cannot use CREATE INDEX CONCURRENTLY.
+"""
+import datetime
+import re
+
+# table → partition column; table names rather than models so migrations can use this
+PARTITIONED_TABLES = {
+    'parking_parkingtransaction': 'requested_at',
+    'parking_notificationlog': 'timestamp',
+}
+
+
+def month_start(value):
+    return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def _month_of(table, name):
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+    if match is None:
+        return None
+    return datetime.datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=datetime.timezone.utc)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+    return cursor.fetchone() is not None
+
+
+def attached_partitions(cursor, table):
+    """{month: name} of the monthly partitions currently attached to ``table``."""
+    cursor.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [table]
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        month = _month_of(table, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+def detached_partitions(cursor, table):
+    """{month: name} of monthly tables left behind by an earlier detach."""
+    cursor.execute(
+        """
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r'
+          AND relnamespace = current_schema()::regnamespace
+          AND relname LIKE %s
+          AND NOT relispartition
+        """,
+        [f"{table}_p%"]
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        month = _month_of(table, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+def create_partition(cursor, quote_name, table, column, month):
+    """
+    Create and attach the partition for ``month``. Rows for that month that
+    landed in the default partition are moved into it first, since ATTACH
+    refuses to proceed while the default partition holds matching rows.
+    """
+    name = partition_name(table, month)
+    start, end = month, add_months(month, 1)
+    cursor.execute(f"CREATE TABLE {quote_name(name)} (LIKE {quote_name(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {quote_name(default_partition_name(table))}
+            WHERE {quote_name(column)} >= %s AND {quote_name(column)} < %s
+            RETURNING *
+        )
+        INSERT INTO {quote_name(name)} SELECT * FROM moved
+        """,
+        [start, end]
+    )
+    cursor.execute(
+        f"ALTER TABLE {quote_name(table)} ATTACH PARTITION {quote_name(name)} FOR VALUES FROM (%s) TO (%s)",
+        [start, end]
+    )
+    return name
+
+
+def ensure_partitions(connection, table, column, months_ahead, now=None):
+    """Create any missing partitions from the current month through ``months_ahead`` months ahead."""
+    quote_name = connection.ops.quote_name
+    current = month_start(now or datetime.datetime.now(datetime.timezone.utc))
+    created = []
+    with connection.cursor() as cursor:
+        existing = attached_partitions(cursor, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(create_partition(cursor, quote_name, table, column, month))
+    return created
+
+
+def expire_partitions(connection, table, retention_months, drop=False, now=None):
+    """
+    Detach the monthly partitions that ended more than ``retention_months``
+    months before the current month. With ``drop`` they are dropped, along
+    with tables detached by earlier runs. Returns [(action, name)].
+    """
+    quote_name = connection.ops.quote_name
+    cutoff = add_months(month_start(now or datetime.datetime.now(datetime.timezone.utc)), -retention_months)
+    actions = []
+    with connection.cursor() as cursor:
+        for month, name in sorted(attached_partitions(cursor, table).items()):
+            if add_months(month, 1) <= cutoff:
+                cursor.execute(f"ALTER TABLE {quote_name(table)} DETACH PARTITION {quote_name(name)}")
+                actions.append(('detached', name))
+        if drop:
+            for month, name in sorted(detached_partitions(cursor, table).items()):
+                if add_months(month, 1) <= cutoff:
+                    cursor.execute(f"DROP TABLE {quote_name(name)}")
+                    actions.append(('dropped', name))
+    return actions
+
+
+def convert_table(connection, table, column, months_ahead=3):
+    """
+    Rebuild a plain table as a partitioned one with the same columns, indexes
+    and outgoing foreign keys, copying its rows across. Runs inside the
+    caller's transaction and locks the table for the duration of the copy.
+    """
+    quote_name = connection.ops.quote_name
+    legacy = f"{table}_unpartitioned"
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return
+
+        cursor.execute(
+            "SELECT 1 FROM pg_constraint WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+            [table]
+        )
+        if cursor.fetchone():
+            raise RuntimeError(f"{table} is referenced by a foreign key constraint; drop it before partitioning")
+
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+              AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p')
+            """,
+            [table, table]
+        )
+        index_definitions = [definition for (definition,) in cursor.fetchall()]
+        if any(definition.startswith('CREATE UNIQUE') for definition in index_definitions):
+            raise RuntimeError(f"{table} has a unique index without {column}; it cannot be partitioned as is")
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT min({quote_name(column)}) FROM {quote_name(table)}")
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {quote_name(table)} RENAME TO {quote_name(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {quote_name(table)} (LIKE {quote_name(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({quote_name(column)})"
+        )
+        cursor.execute(
+            f"CREATE TABLE {quote_name(default_partition_name(table))} PARTITION OF {quote_name(table)} DEFAULT"
+        )
+        current = month_start(datetime.datetime.now(datetime.timezone.utc))
+        month = month_start(oldest) if oldest is not None and oldest < current else current
+        while month <= add_months(current, months_ahead):
+            create_partition(cursor, quote_name, table, column, month)
+            month = add_months(month, 1)
+
+        cursor.execute(f"INSERT INTO {quote_name(table)} SELECT * FROM {quote_name(legacy)}")
+        cursor.execute(f"DROP TABLE {quote_name(legacy)}")
+
+        # Names are free again now that the old table is gone
+        cursor.execute(
+            f"ALTER TABLE {quote_name(table)} ADD CONSTRAINT {quote_name(table + '_pkey')} "
+            f"PRIMARY KEY (id, {quote_name(column)})"
+        )
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {quote_name(table)} ADD CONSTRAINT {quote_name(name)} {definition}")
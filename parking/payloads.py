@@ -0,0 +1,83 @@
+# parking/payloads.py
+"""
+Compressed, deduplicated storage for raw webhook payloads.
+
+Payloads are serialized to canonical JSON (sorted keys, no whitespace),
+compressed with zlib and stored once per SHA-256 in RawPayload. Transactions
+and notification logs only hold a foreign key, so the hot rows stay narrow
+and the payload is read only when something asks for it (the transaction
+detail endpoint, the admin). The same webhook recorded on a transaction and
+its incoming log is stored once.
+"""
+import hashlib
+import json
+import zlib
+
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.db.models.expressions import RawSQL
+
+from . import partitions
+from .models import NotificationLog, ParkingTransaction, RawPayload
+
+COMPRESSION_LEVEL = 6
+
+
+def encode(data):
+    """(digest, compressed bytes, uncompressed size) of a JSON-serializable payload."""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    return hashlib.sha256(canonical).hexdigest(), zlib.compress(canonical, COMPRESSION_LEVEL), len(canonical)
+
+
+def store(data):
+    """Return the RawPayload holding ``data``, inserting it if this content is new; None for None."""
+    if data is None:
+        return None
+    digest, blob, size = encode(data)
+    # ON CONFLICT DO NOTHING, so concurrent writers of the same content don't fail
+    RawPayload.objects.bulk_create([RawPayload(digest=digest, data=blob, size=size)], ignore_conflicts=True)
+    return RawPayload.objects.get(digest=digest)
+
+
+def store_many(items):
+    """RawPayloads for a list of payloads, in order, with one insert and one select."""
+    encoded = [encode(data) for data in items]
+    RawPayload.objects.bulk_create(
+        [RawPayload(digest=digest, data=blob, size=size) for digest, blob, size in encoded],
+        ignore_conflicts=True
+    )
+    by_digest = RawPayload.objects.in_bulk([digest for digest, _, _ in encoded], field_name='digest')
+    return [by_digest[digest] for digest, _, _ in encoded]
+
+
+def _detached_references():
+    """Subqueries of the payload ids referenced from partitions detached but not dropped (PostgreSQL)."""
+    if connection.vendor != 'postgresql':
+        return []
+    quote_name = connection.ops.quote_name
+    subqueries = []
+    with connection.cursor() as cursor:
+        for model in (ParkingTransaction, NotificationLog):
+            column = quote_name(model._meta.get_field('raw_payload').column)
+            for name in partitions.detached_partitions(cursor, model._meta.db_table).values():
+                subqueries.append(RawSQL(
+                    f"SELECT {column} FROM {quote_name(name)} WHERE {column} IS NOT NULL", []
+                ))
+    return subqueries
+
+
+def prune():
+    """
+    Delete payloads nothing refers to any more, e.g. after partitions were
+    dropped. Detached partitions keep their foreign key to RawPayload, so the
+    payloads they refer to are kept as well.
+    """
+    payloads = RawPayload.objects.exclude(
+        Exists(ParkingTransaction.objects.filter(raw_payload=OuterRef('pk')))
+    ).exclude(
+        Exists(NotificationLog.objects.filter(raw_payload=OuterRef('pk')))
+    )
+    for subquery in _detached_references():
+        payloads = payloads.exclude(pk__in=subquery)
+    deleted, _ = payloads.delete()
+    return deleted
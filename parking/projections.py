@@ -0,0 +1,67 @@
+# parking/projections.py
+"""
+Flat listing mode for transactions (?mode=flat, optionally ?fields=a,b,c).
+
+Rows are read with .values() and rendered as plain dicts, so no model
+instances or nested serializers are built per row. Slots are emitted once
+per page in a separate ``slots`` map keyed by slot id, and each row only
+carries the slot id.
+"""
+
+# Output field → ORM lookup
+FLAT_FIELDS = {
+    'id': 'id',
+    'status': 'status',
+    'plate_number': 'plate_number',
+    'slot': 'slot_id',
+    'customer_phone': 'customer__phone_number',
+    'customer_name': 'customer__name',
+    'employee_assigned': 'employee_assigned_id',
+    'requested_at': 'requested_at',
+    'parked_at': 'parked_at',
+    'retrieve_requested_at': 'retrieve_requested_at',
+    'delivered_at': 'delivered_at',
+    'cancelled_at': 'cancelled_at',
+    'ticket_code': 'ticket_code',
+}
+
+# Slot reference emitted once per unique slot: output field → ORM lookup
+SLOT_REF_FIELDS = {
+    'name': 'slot__name',
+    'division': 'slot__division',
+}
+
+# Needed for cursor positions whether or not the client asked for them
+CURSOR_FIELDS = ('id', 'requested_at')
+
+
+def parse_fields(value):
+    """Validate a ?fields= value; returns the requested output fields in FLAT_FIELDS order."""
+    if not value:
+        return list(FLAT_FIELDS)
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(FLAT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return [field for field in FLAT_FIELDS if field in requested]
+
+
+def flat_queryset(queryset, fields):
+    """Project a ParkingTransaction queryset down to the columns ``fields`` need."""
+    lookups = {FLAT_FIELDS[field] for field in fields} | set(CURSOR_FIELDS)
+    if 'slot' in fields:
+        lookups.update(SLOT_REF_FIELDS.values())
+    return queryset.values(*lookups)
+
+
+def flat_rows(rows, fields):
+    """Turn projected rows into ``(results, slots)``."""
+    results = []
+    slots = {}
+    for row in rows:
+        results.append({field: row[FLAT_FIELDS[field]] for field in fields})
+        if 'slot' in fields:
+            slot_id = str(row['slot_id'])
+            if slot_id not in slots:
+                slots[slot_id] = {field: row[lookup] for field, lookup in SLOT_REF_FIELDS.items()}
+    return results, slots
@@ -0,0 +1,190 @@
+# parking/qr.py
+"""
+QR codes for parking slots.
+
+Each code encodes a WhatsApp link that pre-fills the park message with the
+slot's UUID, with the slot name and division printed underneath. The SHA-256
+of everything that goes into the image is stored on the slot, so regenerating
+a company or division only renders slots whose content actually changed.
+Rendering runs on a pool of "spawn" processes (parking/qr_render.py); PNGs
+are written to MEDIA_ROOT/qr_codes/. The ZIP download only reads stored
+PNGs: while any code of the selection is missing or stale it starts
+generation in the background instead of rendering on the web worker.
+"""
+import hashlib
+import io
+import multiprocessing
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+
+from .models import ParkingSlot
+from .qr_render import render_png
+
+# Bump when the image layout changes so every code is re-rendered once
+RENDER_VERSION = '1'
+
+
+def slot_link(slot):
+    number = ''.join(ch for ch in settings.TWILIO_WHATSAPP_NUMBER if ch.isdigit())
+    message = settings.WHATSAPP_QR_MESSAGE.format(slot_id=slot.id)
+    return f"https://wa.me/{number}?text={quote(message)}"
+
+
+def slot_content(slot):
+    """Everything rendered into a slot's image: (link, caption)."""
+    return slot_link(slot), f"{slot.name} · {slot.division}"
+
+
+def content_hash(content):
+    link, caption = content
+    return hashlib.sha256(f"{RENDER_VERSION}\n{link}\n{caption}".encode('utf-8')).hexdigest()
+
+
+def file_name(slot):
+    return f"qr_codes/{slot.company_id}/{slot.id}.png"
+
+
+def is_fresh(slot, digest):
+    return bool(slot.qr_code_image) and slot.qr_code_hash == digest and default_storage.exists(slot.qr_code_image.name)
+
+
+def stale_slots(slots, force=False):
+    """[(slot, content, digest)] for the ``slots`` (a queryset) whose stored image is missing or out of date."""
+    stale = []
+    for slot in slots.only('id', 'company_id', 'name', 'division', 'qr_code_image', 'qr_code_hash'):
+        content = slot_content(slot)
+        digest = content_hash(content)
+        if force or not is_fresh(slot, digest):
+            stale.append((slot, content, digest))
+    return stale
+
+
+def generate(slots, workers=None, force=False, chunk_size=32):
+    """
+    Render and store QR codes for ``slots`` (a ParkingSlot queryset), skipping
+    slots whose stored image already matches their content hash.
+    Returns {"total", "rendered", "skipped", "elapsed_seconds"}.
+    """
+    started = time.monotonic()
+    total = slots.count()
+    stale = stale_slots(slots, force)
+
+    if stale:
+        # "spawn" rather than fork: this may run on a thread of a web worker,
+        # whose locks and sockets a forked child would inherit mid-use
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            images = pool.map(render_png, [content for _, content, _ in stale], chunksize=chunk_size)
+            for (slot, _, digest), png in zip(stale, images):
+                name = file_name(slot)
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                slot.qr_code_image.name = default_storage.save(name, ContentFile(png))
+                slot.qr_code_hash = digest
+        ParkingSlot.objects.bulk_update([slot for slot, _, _ in stale], ['qr_code_image', 'qr_code_hash'], batch_size=500)
+
+    return {
+        'total': total,
+        'rendered': len(stale),
+        'skipped': total - len(stale),
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def slot_png(slot):
+    """PNG bytes for one slot, rendering and storing it if it is missing or stale."""
+    content = slot_content(slot)
+    digest = content_hash(content)
+    if is_fresh(slot, digest):
+        with default_storage.open(slot.qr_code_image.name, 'rb') as stored:
+            return stored.read()
+
+    png = render_png(content)
+    name = file_name(slot)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    slot.qr_code_image.name = default_storage.save(name, ContentFile(png))
+    slot.qr_code_hash = digest
+    ParkingSlot.objects.filter(id=slot.id).update(qr_code_image=slot.qr_code_image.name, qr_code_hash=digest)
+    return png
+
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+def generate_in_background(company_id, division=None, force=False):
+    """
+    Run ``generate`` for a company (or one division) on a daemon thread so no
+    web worker waits on it. Returns False if this process is already
+    generating that selection.
+    """
+    key = (company_id, division)
+    with _running_lock:
+        if key in _running:
+            return False
+        _running.add(key)
+
+    def run():
+        try:
+            slots = ParkingSlot.objects.filter(company_id=company_id)
+            if division:
+                slots = slots.filter(division=division)
+            report = generate(slots, force=force)
+            print(f"[QR generation] company {company_id}: {report}")
+        except Exception as e:
+            print(f"[Error generating QR codes] {e}")
+        finally:
+            with _running_lock:
+                _running.discard(key)
+            connections.close_all()
+
+    threading.Thread(target=run, name='qr-generation', daemon=True).start()
+    return True
+
+
+def _archive_name(*parts):
+    return '/'.join(part.replace('/', '_').replace('\\', '_') for part in parts)
+
+
+class _ZipBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that lets zipfile stream its output."""
+
+    def __init__(self):
+        super().__init__()
+        self._data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._data.extend(data)
+        return len(data)
+
+    def drain(self):
+        data = bytes(self._data)
+        self._data.clear()
+        return data
+
+
+def stream_zip(slots):
+    """
+    Yield a ZIP archive of the stored QR codes of ``slots``, one slot at a
+    time. Nothing is rendered; slots without a stored image are left out.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for slot in slots.order_by('division', 'name').iterator(chunk_size=500):
+            if not slot.qr_code_image or not default_storage.exists(slot.qr_code_image.name):
+                continue
+            with default_storage.open(slot.qr_code_image.name, 'rb') as stored:
+                archive.writestr(_archive_name(slot.division, f"{slot.name}.png"), stored.read())
+            yield buffer.drain()
+    yield buffer.drain()
@@ -0,0 +1,32 @@
+# parking/qr_render.py
+"""
+Renders slot QR codes to PNG. Kept apart from parking/qr.py and free of
+Django imports, so the "spawn" worker processes that render codes can load
+it without setting Django up.
+"""
+import io
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+CAPTION_HEIGHT = 60
+
+
+def render_png(content):
+    """Render one QR code with its caption to PNG bytes. Pure function, safe to run in a worker process."""
+    link, caption = content
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=4)
+    code.add_data(link)
+    code.make(fit=True)
+    qr_image = code.make_image(fill_color='black', back_color='white').convert('L')
+
+    image = Image.new('L', (qr_image.width, qr_image.height + CAPTION_HEIGHT), 'white')
+    image.paste(qr_image, (0, 0))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    text_width = draw.textlength(caption, font=font)
+    draw.text(((image.width - text_width) / 2, qr_image.height + CAPTION_HEIGHT / 3), caption, fill='black', font=font)
+
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
@@ -0,0 +1,178 @@
+# parking/rollups.py
+"""
+Daily operations rollups behind /api/parking/rollups/.
+
+Each DailyRollup row holds one day of one company division (and, with an
+empty division, the whole company): request counts plus average and
+p50/p90/p99 of time to park, dwell and retrieve latency. Percentiles cannot
+be adjusted incrementally, so ``update`` finds the (company, day) buckets
+touched by transactions whose ``updated_at`` moved past the stored watermark
+and recomputes just those days from their own rows; a day is a bounded,
+indexed range of one company's transactions, so the cost follows the amount
+of change, not the size of the history.
+
+The watermark trails the clock by ``SAFETY_LAG`` so that transactions still
+being committed when a run starts are picked up by the next one.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRollup, ParkingTransaction, RollupWatermark
+
+WATERMARK = 'daily_rollups'
+SAFETY_LAG = datetime.timedelta(minutes=5)
+
+# metric → (start, end) timestamps
+METRICS = {
+    'time_to_park': ('requested_at', 'parked_at'),
+    'dwell': ('parked_at', 'retrieve_requested_at'),
+    'retrieve_latency': ('retrieve_requested_at', 'delivered_at'),
+}
+PERCENTILES = (50, 90, 99)
+ALL_DIVISIONS = ''
+
+COUNT_FIELDS = ('requests', 'parked', 'delivered')
+METRIC_FIELDS = tuple(
+    f'{metric}_{suffix}' for metric in METRICS for suffix in ['avg'] + [f'p{pct}' for pct in PERCENTILES]
+)
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list; None if it is empty."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.datetime(day.year, day.month, day.day))
+    return start, start + datetime.timedelta(days=1)
+
+
+def _summarize(company_id, division, day, rows):
+    rollup = DailyRollup(company_id=company_id, division=division, day=day, requests=len(rows))
+    rollup.parked = sum(1 for row in rows if row['parked_at'] is not None)
+    rollup.delivered = sum(1 for row in rows if row['delivered_at'] is not None)
+    for metric, (start, end) in METRICS.items():
+        values = sorted(
+            (row[end] - row[start]).total_seconds()
+            for row in rows
+            if row[start] is not None and row[end] is not None
+        )
+        setattr(rollup, f'{metric}_avg', sum(values) / len(values) if values else None)
+        for pct in PERCENTILES:
+            setattr(rollup, f'{metric}_p{pct}', percentile(values, pct))
+    return rollup
+
+
+def rebuild_day(company_id, day):
+    """Recompute every rollup row of one company and day from its transactions; returns the rows."""
+    start, end = _day_bounds(day)
+    rows = list(
+        ParkingTransaction.objects.filter(
+            company_id=company_id,
+            requested_at__gte=start,
+            requested_at__lt=end
+        ).values('slot__division', *{field for pair in METRICS.values() for field in pair})
+    )
+    by_division = defaultdict(list)
+    for row in rows:
+        by_division[row['slot__division']].append(row)
+
+    rollups = [_summarize(company_id, division, day, division_rows) for division, division_rows in by_division.items()]
+    rollups.append(_summarize(company_id, ALL_DIVISIONS, day, rows))
+
+    with db_transaction.atomic():
+        # Divisions that no longer have transactions on this day
+        DailyRollup.objects.filter(company_id=company_id, day=day).exclude(
+            division__in=[rollup.division for rollup in rollups]
+        ).delete()
+        DailyRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['company', 'day', 'division'],
+            update_fields=list(COUNT_FIELDS + METRIC_FIELDS) + ['updated_at'],
+        )
+    return rollups
+
+
+def changed_days(since, until):
+    """{(company_id, day)} of transactions whose updated_at is in (since, until]."""
+    changed = ParkingTransaction.objects.filter(updated_at__lte=until)
+    if since is not None:
+        changed = changed.filter(updated_at__gt=since)
+    return set(
+        changed.annotate(day=TruncDate('requested_at')).values_list('company_id', 'day').distinct()
+    )
+
+
+def update(now=None):
+    """
+    Rebuild the days touched since the watermark and advance it.
+    Returns {"days", "since", "until"}.
+    """
+    until = (now or timezone.now()) - SAFETY_LAG
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    since = watermark.position if watermark else None
+    if since is not None and since >= until:
+        return {'days': 0, 'since': since, 'until': since}
+
+    days = changed_days(since, until)
+    for company_id, day in sorted(days):
+        rebuild_day(company_id, day)
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'position': until})
+    return {'days': len(days), 'since': since, 'until': until}
+
+
+def rebuild(company_id=None, since_day=None):
+    """Recompute every day with transactions (optionally one company, from ``since_day``); returns the day count."""
+    transactions = ParkingTransaction.objects.all()
+    if company_id is not None:
+        transactions = transactions.filter(company_id=company_id)
+    if since_day is not None:
+        transactions = transactions.filter(requested_at__gte=_day_bounds(since_day)[0])
+    days = set(transactions.annotate(day=TruncDate('requested_at')).values_list('company_id', 'day').distinct())
+    for company_id, day in sorted(days):
+        rebuild_day(company_id, day)
+    return len(days)
+
+
+def company_rollups(company, start_day, end_day, division=None, by_division=False):
+    """Rollup rows of ``company`` for days in [start_day, end_day], oldest first."""
+    rollups = DailyRollup.objects.filter(company=company, day__gte=start_day, day__lte=end_day)
+    if division is not None:
+        rollups = rollups.filter(division=division)
+    elif not by_division:
+        rollups = rollups.filter(division=ALL_DIVISIONS)
+    else:
+        rollups = rollups.exclude(division=ALL_DIVISIONS)
+    return [
+        _format(row)
+        for row in rollups.order_by('day', 'division').values('day', 'division', *COUNT_FIELDS, *METRIC_FIELDS)
+    ]
+
+
+def _format(row):
+    data = {
+        'day': row['day'],
+        'division': row['division'] or None,
+    }
+    data.update({field: row[field] for field in COUNT_FIELDS})
+    for metric in METRICS:
+        data[metric] = {
+            suffix: round(row[f'{metric}_{suffix}'], 1) if row[f'{metric}_{suffix}'] is not None else None
+            for suffix in ['avg'] + [f'p{pct}' for pct in PERCENTILES]
+        }
+    return data
+
+
+def generated_through():
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    return watermark.position if watermark else None
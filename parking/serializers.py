@@ -1,6 +1,6 @@
 # parking/serializers.py
 from rest_framework import serializers
-from .models import ParkingSlot, ParkingTransaction, Customer
+from .models import ParkingSlot, ParkingTransaction, Customer, NotificationLog
 
 class ParkingSlotSerializer(serializers.ModelSerializer):
     class Meta:
@@ -40,6 +40,22 @@ class ParkingTransactionSerializer(serializers.ModelSerializer):
             'parked_at',
             'retrieve_requested_at',
             'delivered_at',
+            'cancelled_at',
             'ticket_code',
         ]
         read_only_fields = ['id', 'requested_at']
+
+class NotificationLogSerializer(serializers.ModelSerializer):
+    payload = serializers.JSONField(read_only=True)
+
+    class Meta:
+        model = NotificationLog
+        fields = ['id', 'direction', 'whatsapp_message_id', 'payload', 'timestamp']
+
+class ParkingTransactionDetailSerializer(ParkingTransactionSerializer):
+    """Single transaction with its raw webhook payload and message history."""
+    raw_whatsapp_payload = serializers.JSONField(read_only=True)
+    notification_logs = NotificationLogSerializer(many=True, read_only=True)
+
+    class Meta(ParkingTransactionSerializer.Meta):
+        fields = ParkingTransactionSerializer.Meta.fields + ['raw_whatsapp_payload', 'notification_logs']
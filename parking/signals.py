@@ -0,0 +1,14 @@
+# parking/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import allocation, slot_cache, stats
+from .models import ParkingSlot
+
+
+@receiver(post_save, sender=ParkingSlot)
+@receiver(post_delete, sender=ParkingSlot)
+def slot_changed(sender, instance, **kwargs):
+    stats.refresh_slot_counts(instance.company_id)
+    allocation.index.invalidate(instance.company_id)
+    slot_cache.invalidate(instance.id)
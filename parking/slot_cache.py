@@ -0,0 +1,38 @@
+# parking/slot_cache.py
+"""
+Read-through cache of ParkingSlot rows keyed by id, for the webhook's slot
+lookups (QR scans and free-slot allocation).
+
+Slots rarely change, so a lookup is usually served from the cache framework
+instead of the database. Entries are dropped by the slot save/delete signals
+(parking/signals.py) and expire after CACHE_TIMEOUT seconds otherwise, which
+bounds staleness in processes that did not see the change. Occupancy is
+flipped with queryset updates that bypass those signals, so ``is_occupied``
+and ``is_active`` on a cached slot are only hints: claims re-check both in
+SQL (see parking/allocation.py). Unknown ids are cached as well, so junk
+QR codes cost one query per timeout.
+"""
+from django.core.cache import cache
+
+from .models import ParkingSlot
+
+CACHE_TIMEOUT = 300
+_MISSING = object()
+
+
+def _key(slot_id):
+    return f"parking:slot:{slot_id}"
+
+
+def get(slot_id):
+    """The slot with ``slot_id``, or None if there is none."""
+    key = _key(slot_id)
+    slot = cache.get(key, _MISSING)
+    if slot is _MISSING:
+        slot = ParkingSlot.objects.filter(id=slot_id).first()
+        cache.set(key, slot, CACHE_TIMEOUT)
+    return slot
+
+
+def invalidate(slot_id):
+    cache.delete(_key(slot_id))
@@ -0,0 +1,203 @@
+# parking/state_machine.py
+"""
+Transaction lifecycle: pending_park → parked → pending_retrieve → delivered,
+or pending_park → cancelled.
+
+Transitions are applied as conditional UPDATEs (``WHERE status = <expected>``)
+so two staff members acting on the same transaction cannot both succeed, and
+slot occupancy is written in the same database transaction with a targeted
+UPDATE of ``is_occupied`` only. Stats counters, live events and the free-slot
+index (parking/allocation.py) follow the same commit.
+"""
+from collections import defaultdict
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from . import allocation, events, stats
+from .models import ParkingSlot, ParkingTransaction
+
+Status = ParkingTransaction.Status
+
+# new status → the only status it may be reached from
+PREVIOUS_STATUS = {
+    Status.PARKED: Status.PENDING_PARK,
+    Status.PENDING_RETRIEVE: Status.PARKED,
+    Status.DELIVERED: Status.PENDING_RETRIEVE,
+    Status.CANCELLED: Status.PENDING_PARK,
+}
+
+# new status → timestamp field stamped by the transition
+TIMESTAMP_FIELDS = {
+    Status.PARKED: 'parked_at',
+    Status.PENDING_RETRIEVE: 'retrieve_requested_at',
+    Status.DELIVERED: 'delivered_at',
+    Status.CANCELLED: 'cancelled_at',
+}
+
+# new status → slot occupancy after the transition
+SLOT_OCCUPANCY = {
+    Status.PARKED: True,
+    Status.DELIVERED: False,
+    Status.CANCELLED: False,      # the slot was claimed when the request came in
+}
+
+
+class TransitionError(Exception):
+    """A transition could not be applied; ``status_code`` is the HTTP status to report."""
+    status_code = 409
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+
+
+def check_transition(old_status, new_status):
+    if not isinstance(new_status, str):
+        # e.g. a list from the JSON body, which is not even hashable
+        raise TransitionError('Invalid status', status_code=400)
+    if new_status not in PREVIOUS_STATUS:
+        if new_status in Status.values:
+            raise TransitionError(f"Cannot move a transaction to {new_status}", status_code=400)
+        raise TransitionError('Invalid status', status_code=400)
+    if PREVIOUS_STATUS[new_status] != old_status:
+        raise TransitionError(f"Cannot move a transaction from {old_status} to {new_status}")
+
+
+def apply_transition(company, transaction_id, new_status):
+    """
+    Move one transaction of ``company`` to ``new_status`` and return it.
+    Raises TransitionError if it does not exist, the move is not allowed, or
+    another request changed the transaction first.
+    """
+    with db_transaction.atomic():
+        tx = ParkingTransaction.objects.select_related('slot', 'customer').filter(
+            id=transaction_id,
+            company=company
+        ).first()
+        if tx is None:
+            raise TransitionError('Transaction not found', status_code=404)
+        old_status = tx.status
+        check_transition(old_status, new_status)
+
+        now = timezone.now()
+        # Queryset updates skip auto_now, and updated_at drives parking.rollups
+        changes = {'status': new_status, TIMESTAMP_FIELDS[new_status]: now, 'updated_at': now}
+        updated = ParkingTransaction.objects.filter(id=tx.id, status=old_status).update(**changes)
+        if not updated:
+            raise TransitionError('Transaction was updated by someone else, please reload')
+        for field, value in changes.items():
+            setattr(tx, field, value)
+
+        deltas = {old_status: -1, new_status: 1}
+        occupied = SLOT_OCCUPANCY.get(new_status)
+        if occupied is not None and _set_occupancy([tx.slot_id], occupied, now):
+            tx.slot.is_occupied = occupied
+            deltas['occupied_slots'] = 1 if occupied else -1
+            if not occupied:
+                allocation.release_on_commit(company.id, tx.slot.division, [tx.slot_id])
+        stats.record_changes(company.id, tx.slot.division, deltas)
+
+        _publish(tx, old_status, occupancy_changed='occupied_slots' in deltas)
+    return tx
+
+
+def apply_transitions(company, transitions):
+    """
+    Apply many ``(transaction_id, new_status)`` transitions in one database
+    transaction. The batch is row-locked with a single SELECT, valid moves are
+    applied with one UPDATE per target status, and invalid ones are reported
+    without affecting the rest. Returns one result dict per requested item.
+    """
+    results = []
+    with db_transaction.atomic():
+        ids = [transaction_id for transaction_id, _ in transitions]
+        locked = {
+            str(tx.id): tx
+            for tx in ParkingTransaction.objects.select_for_update(of=('self',)).select_related('slot').filter(
+                id__in=ids,
+                company=company
+            ).order_by('id')
+        }
+
+        now = timezone.now()
+        by_status = defaultdict(list)
+        seen = set()
+        for transaction_id, new_status in transitions:
+            key = str(transaction_id)
+            tx = locked.get(key)
+            try:
+                if tx is None:
+                    raise TransitionError('Transaction not found', status_code=404)
+                if key in seen:
+                    raise TransitionError('Transaction appears more than once in the batch', status_code=400)
+                check_transition(tx.status, new_status)
+            except TransitionError as e:
+                results.append({'id': key, 'status': new_status, 'ok': False, 'error': str(e)})
+                continue
+            seen.add(key)
+            by_status[new_status].append(tx)
+            results.append({'id': key, 'status': new_status, 'ok': True})
+
+        deltas = defaultdict(lambda: defaultdict(int))
+        for new_status, batch in by_status.items():
+            old_status = PREVIOUS_STATUS[new_status]
+            ParkingTransaction.objects.filter(id__in=[tx.id for tx in batch]).update(
+                status=new_status,
+                updated_at=now,
+                **{TIMESTAMP_FIELDS[new_status]: now}
+            )
+
+            occupied = SLOT_OCCUPANCY.get(new_status)
+            slots_by_division = defaultdict(list)
+            for tx in batch:
+                deltas[tx.slot.division][old_status] -= 1
+                deltas[tx.slot.division][new_status] += 1
+                slots_by_division[tx.slot.division].append(tx.slot_id)
+            flipped = set()
+            if occupied is not None:
+                for division, slot_ids in slots_by_division.items():
+                    division_flipped = _set_occupancy(slot_ids, occupied, now)
+                    flipped.update(division_flipped)
+                    count = len(division_flipped)
+                    deltas[division]['occupied_slots'] += count if occupied else -count
+                    if division_flipped and not occupied:
+                        allocation.release_on_commit(company.id, division, division_flipped)
+
+            for tx in batch:
+                tx.status = new_status
+                tx.updated_at = now
+                setattr(tx, TIMESTAMP_FIELDS[new_status], now)
+                occupancy_changed = tx.slot_id in flipped
+                if occupancy_changed:
+                    tx.slot.is_occupied = occupied
+                    # One event per slot, even if several transactions of the batch share it
+                    flipped.discard(tx.slot_id)
+                _publish(tx, old_status, occupancy_changed=occupancy_changed)
+
+        for division, division_deltas in deltas.items():
+            stats.record_changes(company.id, division, division_deltas)
+    return results
+
+
+def _set_occupancy(slot_ids, occupied, now):
+    """Flip ``is_occupied`` on slots that are not already in that state; returns the ids flipped."""
+    # Locked, so the ids read are the rows the UPDATE changes
+    flipped = list(
+        ParkingSlot.objects.select_for_update().filter(id__in=slot_ids).exclude(is_occupied=occupied)
+        .values_list('id', flat=True)
+    )
+    if flipped:
+        ParkingSlot.objects.filter(id__in=flipped).update(is_occupied=occupied, updated_at=now)
+    return flipped
+
+
+def _publish(tx, old_status, occupancy_changed):
+    events.publish_on_commit(
+        tx.company_id,
+        events.TRANSACTION_STATUS_CHANGED,
+        events.transaction_data(tx, previous_status=old_status)
+    )
+    if occupancy_changed:
+        events.publish_on_commit(tx.company_id, events.SLOT_OCCUPANCY_CHANGED, events.slot_data(tx.slot))
@@ -0,0 +1,132 @@
+# parking/stats.py
+"""
+Incrementally maintained counters behind /api/parking/stats/.
+
+Transaction and occupancy counters are adjusted with F() expressions inside
+the caller's database transaction, so they commit or roll back together with
+the state change (see parking/state_machine.py). Slot counters are recomputed
+for the company whenever a slot is saved or deleted (see parking/signals.py).
+``reconcile`` rebuilds every counter from the source tables and is run
+periodically to correct any drift, e.g. from admin edits or a slot moving to
+another division.
+"""
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import ParkingSlot, ParkingStats, ParkingTransaction
+
+SLOT_FIELDS = ('total_slots', 'active_slots', 'occupied_slots')
+STATUS_FIELDS = tuple(ParkingTransaction.Status.values)
+COUNTER_FIELDS = SLOT_FIELDS + STATUS_FIELDS
+
+
+def record_transaction_created(transaction, division):
+    record_changes(transaction.company_id, division, {transaction.status: 1})
+
+
+def record_changes(company_id, division, deltas):
+    """Apply counter deltas, e.g. {'parked': 1, 'pending_park': -1}, to one division."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = ParkingStats.objects.filter(company_id=company_id, division=division).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        # First event for this division: build the row from the source tables,
+        # which already include the caller's change.
+        reconcile(company_id)
+
+
+def _slot_counts(company_id=None):
+    slots = ParkingSlot.objects.all()
+    if company_id is not None:
+        slots = slots.filter(company_id=company_id)
+    return slots.values('company_id', 'division').annotate(
+        total_slots=Count('id'),
+        active_slots=Count('id', filter=Q(is_active=True)),
+        occupied_slots=Count('id', filter=Q(is_occupied=True)),
+    )
+
+
+def refresh_slot_counts(company_id):
+    """Recompute slot counters for one company with a single grouped query."""
+    rows = [ParkingStats(**row) for row in _slot_counts(company_id)]
+    ParkingStats.objects.filter(company_id=company_id).exclude(
+        division__in=[row.division for row in rows]
+    ).update(total_slots=0, active_slots=0, occupied_slots=0, updated_at=timezone.now())
+    if rows:
+        ParkingStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['company', 'division'],
+            update_fields=list(SLOT_FIELDS) + ['updated_at'],
+        )
+
+
+def reconcile(company_id=None):
+    """
+    Rebuild counters from ParkingSlot and ParkingTransaction.
+    Returns the number of (company, division) rows whose counters had drifted.
+    """
+    expected = {}
+    for row in _slot_counts(company_id):
+        key = (row.pop('company_id'), row.pop('division'))
+        expected.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0)).update(row)
+
+    transactions = ParkingTransaction.objects.all()
+    if company_id is not None:
+        transactions = transactions.filter(company_id=company_id)
+    status_counts = transactions.values('company_id', 'slot__division', 'status').annotate(count=Count('id'))
+    for row in status_counts:
+        key = (row['company_id'], row['slot__division'])
+        expected.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0))[row['status']] = row['count']
+
+    existing = ParkingStats.objects.all()
+    if company_id is not None:
+        existing = existing.filter(company_id=company_id)
+    current = {
+        (row['company_id'], row['division']): row
+        for row in existing.values('company_id', 'division', *COUNTER_FIELDS)
+    }
+
+    drifted = []
+    for key, counters in expected.items():
+        row = current.pop(key, None)
+        if row is None or any(row[field] != counters[field] for field in COUNTER_FIELDS):
+            drifted.append(ParkingStats(company_id=key[0], division=key[1], **counters))
+    # Divisions that no longer have any slots or transactions
+    for key in current:
+        if any(current[key][field] for field in COUNTER_FIELDS):
+            drifted.append(ParkingStats(company_id=key[0], division=key[1]))
+
+    if drifted:
+        ParkingStats.objects.bulk_create(
+            drifted,
+            update_conflicts=True,
+            unique_fields=['company', 'division'],
+            update_fields=list(COUNTER_FIELDS) + ['updated_at'],
+        )
+    return len(drifted)
+
+
+def company_stats(company):
+    """Counters for one company, totalled and broken down by division."""
+    divisions = []
+    totals = dict.fromkeys(COUNTER_FIELDS, 0)
+    for row in ParkingStats.objects.filter(company=company).order_by('division').values('division', *COUNTER_FIELDS):
+        for field in COUNTER_FIELDS:
+            totals[field] += row[field]
+        divisions.append(_format(row, division=row['division']))
+    return {
+        'company': _format(totals, id=company.id, name=company.name),
+        'divisions': divisions,
+    }
+
+
+def _format(counters, **extra):
+    data = dict(extra)
+    data.update({field: counters[field] for field in SLOT_FIELDS})
+    data['transactions'] = {status: counters[status] for status in STATUS_FIELDS}
+    return data
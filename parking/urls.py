@@ -6,10 +6,34 @@ urlpatterns = [
     # List all slots or create a new one
     path('slots/', views.ParkingSlotListCreateAPIView.as_view(), name='slot-list-create'),
 
+    # Bulk import of slots (JSON or CSV upload)
+    path('slots/bulk/', views.bulk_create_slots, name='slot-bulk-create'),
+
+    # Claim the next free slot of a division
+    path('slots/allocate/', views.allocate_slot, name='slot-allocate'),
+    path('slots/<uuid:pk>/release/', views.release_slot, name='slot-release'),
+
     # Retrieve, update, or delete a single slot by UUID
     path('slots/<uuid:pk>/', views.ParkingSlotRetrieveUpdateDestroyAPIView.as_view(), name='slot-detail'),
 
+    # QR codes
+    path('slots/<uuid:pk>/qr-code/', views.slot_qr_code, name='slot-qr-code'),
+    path('slots/qr-codes/generate/', views.generate_slot_qr_codes, name='slot-qr-codes-generate'),
+    path('slots/qr-codes.zip', views.download_slot_qr_codes, name='slot-qr-codes-zip'),
+
     # Transaction endpoints
     path('transactions/', views.ParkingTransactionListAPIView.as_view(), name='transaction-list'),
+    path('transactions/export.<str:file_format>', views.export_transactions, name='transaction-export'),
+    path('transactions/<uuid:transaction_id>/', views.ParkingTransactionRetrieveAPIView.as_view(), name='transaction-detail'),
     path('transactions/<uuid:transaction_id>/update-status/', views.update_transaction_status, name='transaction-update-status'),
+    path('transactions/bulk-update-status/', views.bulk_update_transaction_status, name='transaction-bulk-update-status'),
+
+    # Aggregated counters for the dashboard
+    path('stats/', views.parking_stats, name='parking-stats'),
+
+    # Daily operations metrics (time to park, dwell, retrieve latency)
+    path('rollups/', views.parking_rollups, name='parking-rollups'),
+
+    # Live transaction/slot events (Server-Sent Events, ASGI only)
+    path('events/', views.transaction_events, name='parking-events'),
 ]
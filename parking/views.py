@@ -1,11 +1,23 @@
+import asyncio
+import csv
+import uuid
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction as db_transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.utils import timezone
-from .models import ParkingSlot, ParkingTransaction
-from .serializers import ParkingSlotSerializer, ParkingTransactionSerializer
-from core.permissions import IsCompanyAdminOrEmployee, get_user_company
+from . import allocation, bulk, events, export, projections, qr, rollups, state_machine, stats
+from .models import NotificationLog, ParkingSlot, ParkingTransaction
+from .serializers import ParkingSlotSerializer, ParkingTransactionDetailSerializer, ParkingTransactionSerializer
+from .pagination import TransactionCursorPagination
+from core.permissions import IsCompanyAdmin, IsCompanyAdminOrEmployee, get_user_company
 # Create your views here.
 # parking/views.py
 
@@ -97,12 +109,177 @@ class ParkingSlotRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIV
         return ParkingSlot.objects.none()
 
 
+# Largest number of rows accepted by one bulk slot import
+BULK_SLOT_IMPORT_LIMIT = 10000
+
+
+@api_view(['POST'])
+@permission_classes([IsCompanyAdmin])
+def bulk_create_slots(request):
+    """
+    POST /api/parking/slots/bulk/ → create many slots for the admin's company
+    Body: {"slots": [{"name": "A-001", "division": "Level 1", "is_active": true}, ...]}
+      or: multipart upload "file" with a CSV header line name,division,is_active
+    Returns the number created and a per-row error report.
+    """
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    upload = request.FILES.get('file')
+    if upload is not None:
+        try:
+            rows = bulk.read_csv(upload.read().decode('utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Invalid CSV file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        rows = request.data.get('slots') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'slots must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(rows) > BULK_SLOT_IMPORT_LIMIT:
+        return Response({'error': f'At most {BULK_SLOT_IMPORT_LIMIT} slots per import'},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    report = bulk.import_slots(user_company, rows)
+    response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+    return Response(report, status=response_status)
+
+
+@api_view(['GET'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def slot_qr_code(request, pk):
+    """
+    GET /api/parking/slots/<uuid:pk>/qr-code/ → PNG QR code for one slot (company-scoped)
+    Rendered and stored on first request or when the slot's content changed.
+    """
+    user_company = get_user_company(request.user)
+    slot = ParkingSlot.objects.filter(id=pk, company=user_company).first()
+    if slot is None:
+        return Response({'error': 'Slot not found'}, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(qr.slot_png(slot), content_type='image/png')
+
+
+@api_view(['POST'])
+@permission_classes([IsCompanyAdmin])
+def generate_slot_qr_codes(request):
+    """
+    POST /api/parking/slots/qr-codes/generate/
+    Body: {"division": "<optional>", "force": false}
+    Starts rendering QR codes for the company (or one division) in the
+    background; unchanged slots are skipped.
+    """
+    user_company = get_user_company(request.user)
+    division = request.data.get('division') or None
+    qr.generate_in_background(user_company.id, division=division, force=bool(request.data.get('force')))
+    return Response({'message': 'QR code generation started', 'division': division},
+                    status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def download_slot_qr_codes(request):
+    """
+    GET /api/parking/slots/qr-codes.zip?division=<optional> → streamed ZIP of QR codes
+    Only stored codes are sent: if any is missing or out of date, generation
+    starts in the background and 202 asks the client to retry later.
+    """
+    user_company = get_user_company(request.user)
+    slots = ParkingSlot.objects.filter(company=user_company)
+    division = request.query_params.get('division')
+    if division:
+        slots = slots.filter(division=division)
+
+    stale = qr.stale_slots(slots)
+    if stale:
+        qr.generate_in_background(user_company.id, division=division)
+        return Response({'message': 'QR codes are being generated, retry the download shortly',
+                         'division': division, 'pending': len(stale)},
+                        status=status.HTTP_202_ACCEPTED)
+
+    file_name = f"qr-codes-{user_company.company_code}{'-' + division if division else ''}.zip"
+    response = StreamingHttpResponse(qr.stream_zip(slots), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def allocate_slot(request):
+    """
+    POST /api/parking/slots/allocate/
+    Body: {"division": "Level 1"}
+    Claims the next free active slot of the division for the user's company
+    and returns it (marked occupied); 409 if the division has no free slot.
+    A slot that ends up unused goes back with POST /slots/<uuid:pk>/release/.
+    """
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    division = str(request.data.get('division') or '').strip()
+    if not division:
+        return Response({'error': 'division is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    with db_transaction.atomic():
+        slot = allocation.allocate(user_company.id, division)
+    if slot is None:
+        return Response({'error': f'No free slot in {division}'}, status=status.HTTP_409_CONFLICT)
+    return Response(ParkingSlotSerializer(slot, context={'request': request}).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def release_slot(request, pk):
+    """
+    POST /api/parking/slots/<uuid:pk>/release/
+    Frees an allocated slot that no active transaction holds (e.g. the car
+    never arrived) and returns it; 409 if a transaction is using it.
+    """
+    user_company = get_user_company(request.user)
+    slot = ParkingSlot.objects.filter(id=pk, company=user_company).first()
+    if slot is None:
+        return Response({'error': 'Slot not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    with db_transaction.atomic():
+        released = allocation.release(slot)
+    if not released:
+        if ParkingTransaction.objects.filter(slot=slot, status__in=allocation.HOLDING_STATUSES).exists():
+            return Response({'error': 'Slot is held by an active transaction'}, status=status.HTTP_409_CONFLICT)
+        # Already free
+        slot.refresh_from_db()
+    return Response(ParkingSlotSerializer(slot, context={'request': request}).data)
+
+
 class ParkingTransactionListAPIView(generics.ListAPIView):
     """
     GET /api/parking/transactions/ → list transactions for user's company only
+
+    Cursor-paginated, newest first: ?cursor=<opaque>&page_size=<n, max 200>
+    ?mode=flat returns flat rows with a slot id and a page-level "slots" map;
+    ?fields=id,status,... selects flat-mode fields (implies mode=flat)
     """
     serializer_class = ParkingTransactionSerializer
     permission_classes = [IsCompanyAdminOrEmployee]
+    pagination_class = TransactionCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('mode') != 'flat' and 'fields' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            fields = projections.parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = projections.flat_queryset(self.get_queryset(), fields)
+        page = self.paginate_queryset(queryset)
+        results, slots = projections.flat_rows(page, fields)
+        response = self.get_paginated_response(results)
+        response.data['slots'] = slots
+        return response
 
     def get_queryset(self):
         """Return only transactions for slots belonging to user's company"""
@@ -111,14 +288,90 @@ class ParkingTransactionListAPIView(generics.ListAPIView):
             return ParkingTransaction.objects.none()
 
         queryset = ParkingTransaction.objects.filter(
-            slot__company=user_company
-        ).select_related('customer', 'slot', 'employee_assigned')
+            company=user_company
+        ).select_related('customer', 'slot')
 
         # Add filtering by status if provided
         status_filter = self.request.query_params.get('status', None)
         if status_filter:
             queryset = queryset.filter(status=status_filter)
-        return queryset.order_by('-requested_at')
+        return queryset.order_by('-requested_at', '-id')
+
+
+class ParkingTransactionRetrieveAPIView(generics.RetrieveAPIView):
+    """
+    GET /api/parking/transactions/<uuid:transaction_id>/ → one transaction of the user's company
+    Includes the raw webhook payload and the message history, which the list
+    endpoints never load.
+    """
+    serializer_class = ParkingTransactionDetailSerializer
+    permission_classes = [IsCompanyAdminOrEmployee]
+    lookup_url_kwarg = 'transaction_id'
+
+    def get_queryset(self):
+        user_company = get_user_company(self.request.user)
+        if not user_company:
+            return ParkingTransaction.objects.none()
+        return ParkingTransaction.objects.filter(company=user_company).select_related(
+            'customer', 'slot', 'raw_payload'
+        ).prefetch_related(
+            Prefetch(
+                'notification_logs',
+                queryset=NotificationLog.objects.select_related('raw_payload').order_by('timestamp')
+            )
+        )
+
+
+async def _async_chunks(chunks):
+    """Feed a synchronous chunk generator to the ASGI server one chunk at a time."""
+    # thread_sensitive keeps every step on one thread, and so on the
+    # database connection that holds the export's server-side cursor
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+@api_view(['GET'])
+@permission_classes([IsCompanyAdmin])
+def export_transactions(request, file_format):
+    """
+    GET /api/parking/transactions/export.<csv|ndjson>?from=YYYY-MM-DD&to=YYYY-MM-DD&status=parked,delivered
+    Streams the company's transactions requested in [from, to), oldest first,
+    with wait_to_park_seconds, dwell_seconds and retrieve_wait_seconds columns.
+    Large exports should go through the ASGI server, which has no worker timeout.
+    """
+    if file_format not in export.FORMATS:
+        return Response({'error': f'Unknown export format {file_format}'}, status=status.HTTP_404_NOT_FOUND)
+
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        start = export.parse_bound(request.query_params.get('from'))
+        end = export.parse_bound(request.query_params.get('to'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    statuses = [value for value in request.query_params.get('status', '').split(',') if value]
+    invalid = set(statuses) - set(ParkingTransaction.Status.values)
+    if invalid:
+        return Response({'error': f"Invalid status: {', '.join(sorted(invalid))}"},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    generate, content_type = export.FORMATS[file_format]
+    chunks = generate(export.export_queryset(user_company, start, end, statuses))
+    if isinstance(request._request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+
+    file_name = f"transactions-{user_company.company_code}.{file_format}"
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['POST'])
@@ -126,8 +379,9 @@ class ParkingTransactionListAPIView(generics.ListAPIView):
 def update_transaction_status(request, transaction_id):
     """
     POST /api/parking/transactions/<uuid:transaction_id>/update-status/
-    Body: {"status": "parked|pending_retrieve|delivered"}
-    Only allows updating transactions for user's company
+    Body: {"status": "parked|pending_retrieve|delivered|cancelled"}
+    Only allows updating transactions for user's company, one step at a time
+    along pending_park → parked → pending_retrieve → delivered (or pending_park → cancelled)
     """
     user_company = get_user_company(request.user)
     if not user_company:
@@ -135,35 +389,166 @@ def update_transaction_status(request, transaction_id):
                        status=status.HTTP_403_FORBIDDEN)
 
     try:
-        # Only get transactions for slots belonging to user's company
-        transaction = ParkingTransaction.objects.get(
-            id=transaction_id,
-            slot__company=user_company
-        )
-    except ParkingTransaction.DoesNotExist:
-        return Response({'error': 'Transaction not found'},
-                       status=status.HTTP_404_NOT_FOUND)
-
-    new_status = request.data.get('status')
-    if new_status not in [choice[0] for choice in ParkingTransaction.Status.choices]:
-        return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Update status and timestamps
-    transaction.status = new_status
-    if new_status == ParkingTransaction.Status.PARKED:
-        transaction.parked_at = timezone.now()
-        # Mark slot as occupied
-        transaction.slot.is_occupied = True
-        transaction.slot.save()
-    elif new_status == ParkingTransaction.Status.PENDING_RETRIEVE:
-        transaction.retrieve_requested_at = timezone.now()
-    elif new_status == ParkingTransaction.Status.DELIVERED:
-        transaction.delivered_at = timezone.now()
-        # Mark slot as available
-        transaction.slot.is_occupied = False
-        transaction.slot.save()
-
-    transaction.save()
+        transaction = state_machine.apply_transition(user_company, transaction_id, request.data.get('status'))
+    except state_machine.TransitionError as e:
+        return Response({'error': str(e)}, status=e.status_code)
 
     serializer = ParkingTransactionSerializer(transaction)
     return Response(serializer.data)
+
+
+# Largest number of transitions accepted by one bulk request
+BULK_TRANSITION_LIMIT = 500
+
+
+@api_view(['POST'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def bulk_update_transaction_status(request):
+    """
+    POST /api/parking/transactions/bulk-update-status/
+    Body: {"transitions": [{"id": "<uuid>", "status": "parked|pending_retrieve|delivered|cancelled"}, ...]}
+    Applies every valid transition in one database transaction and reports
+    the outcome of each item.
+    """
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    items = request.data.get('transitions')
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'transitions must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > BULK_TRANSITION_LIMIT:
+        return Response({'error': f'At most {BULK_TRANSITION_LIMIT} transitions per request'},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    transitions = []
+    for item in items:
+        try:
+            if not isinstance(item['status'], str):
+                raise TypeError('status must be a string')
+            transitions.append((uuid.UUID(str(item['id'])), item['status']))
+        except (TypeError, KeyError, ValueError):
+            return Response({'error': f'Invalid transition: {item}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = state_machine.apply_transitions(user_company, transitions)
+    return Response({
+        'applied': sum(1 for result in results if result['ok']),
+        'results': results,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def parking_stats(request):
+    """
+    GET /api/parking/stats/
+    Slot occupancy and transaction counts by status for the user's company,
+    totalled and per division. Served from ParkingStats counters.
+    """
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    return Response(stats.company_stats(user_company))
+
+
+# Seconds between keep-alive comments, and the lifetime of one stream before
+# the browser's EventSource transparently reconnects with Last-Event-ID.
+EVENT_STREAM_KEEPALIVE = 15
+EVENT_STREAM_MAX_SECONDS = 300
+
+
+# Longest date range served by one rollups request
+ROLLUP_MAX_DAYS = 731
+
+
+@api_view(['GET'])
+@permission_classes([IsCompanyAdminOrEmployee])
+def parking_rollups(request):
+    """
+    GET /api/parking/rollups/?from=YYYY-MM-DD&to=YYYY-MM-DD → daily metrics for the user's company
+    Defaults to the last 30 days. Company-wide rows unless ?division=<name>,
+    or one row per division and day with ?by_division=1. Durations are in seconds.
+    """
+    user_company = get_user_company(request.user)
+    if not user_company:
+        return Response({'error': 'User not associated with any company'},
+                       status=status.HTTP_403_FORBIDDEN)
+
+    today = timezone.localdate()
+    try:
+        end_day = parse_date(request.query_params.get('to') or today.isoformat())
+        start_day = parse_date(request.query_params.get('from') or (today - timedelta(days=29)).isoformat())
+    except ValueError:
+        end_day = start_day = None
+    if start_day is None or end_day is None:
+        return Response({'error': 'from and to must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    if start_day > end_day or (end_day - start_day).days >= ROLLUP_MAX_DAYS:
+        return Response({'error': f'from must not be after to, and the range is limited to {ROLLUP_MAX_DAYS} days'},
+                       status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'from': start_day,
+        'to': end_day,
+        'generated_through': rollups.generated_through(),
+        'days': rollups.company_rollups(
+            user_company,
+            start_day,
+            end_day,
+            division=request.query_params.get('division') or None,
+            by_division=request.query_params.get('by_division') in ('1', 'true'),
+        ),
+    })
+
+
+def _event_stream_company(request):
+    if not request.user.is_authenticated:
+        return None
+    return get_user_company(request.user)
+
+
+async def _event_stream(company_id, last_event_id):
+    relay = events.get_relay()
+    if relay is not None:
+        relay.ensure_listening()
+
+    subscription = events.broker.subscribe(company_id, last_event_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EVENT_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 3000\n\n"
+        while loop.time() < deadline:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=EVENT_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield event.to_sse()
+    finally:
+        events.broker.unsubscribe(subscription)
+
+
+async def transaction_events(request):
+    """
+    GET /api/parking/events/ → Server-Sent Events stream for the user's company
+    Events: transaction.created, transaction.status_changed, slot.occupancy_changed, reset
+    Resume with the Last-Event-ID header (sent automatically by EventSource)
+    or ?last_event_id=. Served only by the ASGI application (valet_project.asgi).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Event stream requires the ASGI server'}, status=501)
+
+    user_company = await sync_to_async(_event_stream_company)(request)
+    if not user_company:
+        return JsonResponse({'error': 'User not associated with any company'}, status=403)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    response = StreamingHttpResponse(
+        _event_stream(user_company.id, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
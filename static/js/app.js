@@ -168,8 +168,8 @@ async function loadParkingSlots() {
 
 async function loadTransactions() {
     try {
-        const transactions = await apiRequest(API_ENDPOINTS.transactions);
-        return transactions;
+        const page = await apiRequest(API_ENDPOINTS.transactions);
+        return page.results;
     } catch (error) {
         showAlert('Failed to load transactions', 'danger');
         return [];
@@ -189,6 +189,44 @@ async function updateTransactionStatus(transactionId, newStatus) {
     }
 }
 
+// Live Updates
+// Subscribes to /api/parking/events/ (Server-Sent Events). Calls onUnavailable
+// when the stream cannot be opened so the page can fall back to polling.
+function subscribeToParkingEvents(onEvent, onUnavailable) {
+    if (!window.EventSource) {
+        onUnavailable();
+        return null;
+    }
+
+    const source = new EventSource('/api/parking/events/', { withCredentials: true });
+    let opened = false;
+    source.onopen = () => { opened = true; };
+    source.onerror = () => {
+        // EventSource reconnects on its own once a stream was established;
+        // a stream that never opened (e.g. WSGI-only deployment) is given up.
+        if (!opened) {
+            source.close();
+            onUnavailable();
+        }
+    };
+
+    ['transaction.created', 'transaction.status_changed', 'slot.occupancy_changed', 'reset'].forEach(type => {
+        source.addEventListener(type, event => {
+            onEvent(type, event.data ? JSON.parse(event.data) : {});
+        });
+    });
+    return source;
+}
+
+// Coalesces bursts of events into a single reload
+function debounce(fn, wait) {
+    let timer = null;
+    return (...args) => {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn(...args), wait);
+    };
+}
+
 // Form Handlers
 function handleCompanyForm(event) {
     event.preventDefault();
@@ -237,6 +275,7 @@ function getStatusBadge(status) {
         'parked': 'status-parked',
         'pending_retrieve': 'status-pending',
         'delivered': 'status-delivered',
+        'cancelled': 'status-occupied',
         'occupied': 'status-occupied',
         'available': 'status-available',
     };
@@ -246,6 +285,7 @@ function getStatusBadge(status) {
         'parked': 'Parked',
         'pending_retrieve': 'Pending Retrieve',
         'delivered': 'Delivered',
+        'cancelled': 'Cancelled',
         'occupied': 'Occupied',
         'available': 'Available',
     };
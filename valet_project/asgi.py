@@ -3,6 +3,11 @@ ASGI config for valet_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+It also serves the live parking event stream (/api/parking/events/), which
+needs an async server, e.g.:
+
+    uvicorn valet_project.asgi:application --host 0.0.0.0 --port 8001
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
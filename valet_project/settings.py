@@ -9,7 +9,9 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import json
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 
     # Third-party
     'rest_framework',
+    'rest_framework.authtoken',
     'drf_yasg',          # if you want Swagger
 
     # Our apps
@@ -108,10 +111,54 @@ DATABASES = {
     }
 }
 
+# Cache. With REDIS_URL, Redis holds the cache (sessions included, in front
+# of the database, see SESSION_ENGINE), and the local tier takes over while
+# Redis is unreachable, retrying it every CACHE_RETRY_AFTER seconds
+# (core/cache.py). Without it the local tier is the cache. 'locmem' keeps one
+# per process, so invalidations made by one worker reach the others only
+# when their entries expire; 'file' (CACHE_DIR) is shared by the workers of
+# one host, but culls by listing the directory on every write, so keep its
+# CACHE_MAX_ENTRIES small.
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_LOCAL_TIER = os.getenv('CACHE_LOCAL_TIER', 'locmem')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'valet-parking-cache'))
+LOCAL_CACHE = {
+    'file': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_DIR},
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'valet-parking'},
+}[CACHE_LOCAL_TIER]
+LOCAL_CACHE['OPTIONS'] = {
+    'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '2000' if CACHE_LOCAL_TIER == 'file' else '50000'))
+}
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.FailoverCache',
+            'OPTIONS': {
+                'PRIMARY': {
+                    'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                    'LOCATION': REDIS_URL,
+                    # Fail over quickly instead of holding requests on a dead connection
+                    'OPTIONS': {'socket_connect_timeout': 0.5, 'socket_timeout': 0.5},
+                },
+                'FALLBACK': LOCAL_CACHE,
+                'RETRY_AFTER': float(os.getenv('CACHE_RETRY_AFTER', '30')),
+            },
+        }
+    }
+else:
+    CACHES = {'default': LOCAL_CACHE}
+
+# Sessions are read through the cache but stored in the django_session table:
+# the failover tier starts empty and recovery deletes keys written during an
+# outage, which would log users out with a cache-only session engine.
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        # Session and token authentication with cached user resolution (core/auth_cache.py)
+        'core.authentication.CachedSessionAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -120,6 +167,17 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Users, sessions and API tokens resolved by core.authentication are kept in
+# a per-process LRU (AUTH_CACHE_SIZE entries per kind, AUTH_CACHE_TIMEOUT
+# seconds) and, with AUTH_CACHE_SHARED, in the shared cache for
+# AUTH_CACHE_SHARED_TIMEOUT seconds. AUTH_CACHE_TIMEOUT bounds how long
+# another process may keep serving a user after a logout, a token revocation,
+# a password change or a deactivation.
+AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))
+AUTH_CACHE_TIMEOUT = float(os.getenv('AUTH_CACHE_TIMEOUT', '15'))
+AUTH_CACHE_SHARED = os.getenv('AUTH_CACHE_SHARED', str(bool(REDIS_URL))).lower() == 'true'
+AUTH_CACHE_SHARED_TIMEOUT = int(os.getenv('AUTH_CACHE_SHARED_TIMEOUT', '300'))
+
 # Optionally, specify schema metadata and security schemes:
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Valet Parking API',
@@ -139,6 +197,77 @@ SPECTACULAR_SETTINGS = {
     ],
 }
 
+# WhatsApp via Twilio
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '')
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '')
+TWILIO_WHATSAPP_NUMBER = os.getenv('TWILIO_WHATSAPP_NUMBER', '')
+
+# Transport the outbox worker sends through (whatsapp/transports.py), with its
+# keyword arguments as JSON, e.g. WHATSAPP_TRANSPORT=whatsapp.transports.FakeTransport
+# and WHATSAPP_TRANSPORT_OPTIONS='{"latency": 0.2, "error_rate": 0.01}' for load tests.
+WHATSAPP_TRANSPORT = os.getenv('WHATSAPP_TRANSPORT', 'whatsapp.transports.TwilioTransport')
+WHATSAPP_TRANSPORT_OPTIONS = json.loads(os.getenv('WHATSAPP_TRANSPORT_OPTIONS', '{}'))
+
+# Outbound message queue (whatsapp/outbox.py), drained by run_outbox_worker.
+# Failed sends are retried after BACKOFF * 2^(attempt-1) seconds, capped at BACKOFF_MAX.
+WHATSAPP_OUTBOX_MAX_ATTEMPTS = int(os.getenv('WHATSAPP_OUTBOX_MAX_ATTEMPTS', '8'))
+WHATSAPP_OUTBOX_BACKOFF_SECONDS = float(os.getenv('WHATSAPP_OUTBOX_BACKOFF_SECONDS', '5'))
+WHATSAPP_OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv('WHATSAPP_OUTBOX_BACKOFF_MAX_SECONDS', '900'))
+
+# 'sync' handles each message in the webhook request; 'inbox' only queues it
+# and answers at once, leaving the work to run_inbox_worker (whatsapp/inbox.py).
+WHATSAPP_WEBHOOK_MODE = os.getenv('WHATSAPP_WEBHOOK_MODE', 'sync')
+# Messages that fail are retried after BACKOFF * 2^(attempt-1) seconds, capped at BACKOFF_MAX.
+WHATSAPP_INBOX_MAX_ATTEMPTS = int(os.getenv('WHATSAPP_INBOX_MAX_ATTEMPTS', '5'))
+WHATSAPP_INBOX_BACKOFF_SECONDS = float(os.getenv('WHATSAPP_INBOX_BACKOFF_SECONDS', '2'))
+WHATSAPP_INBOX_BACKOFF_MAX_SECONDS = float(os.getenv('WHATSAPP_INBOX_BACKOFF_MAX_SECONDS', '300'))
+# Days processed InboundMessages are kept (prune_inbound_messages); well past
+# the provider's retry window, so deduplication is unaffected.
+WHATSAPP_INBOX_RETENTION_DAYS = int(os.getenv('WHATSAPP_INBOX_RETENTION_DAYS', '7'))
+
+# Provider message ids each process remembers to answer webhook retries without
+# a database query (whatsapp/idempotency.py)
+WHATSAPP_RECENT_MESSAGE_IDS = int(os.getenv('WHATSAPP_RECENT_MESSAGE_IDS', '10000'))
+
+# Token buckets for incoming messages (whatsapp/ratelimit.py): per sender
+# phone and for the webhook as a whole; a rate of 0 turns a bucket off.
+# Messages over budget are acknowledged and dropped. Buckets are kept in a
+# SQLite file shared by the workers of one host, or in Redis when
+# WHATSAPP_RATE_LIMIT_REDIS_URL is set (workers on several hosts).
+WHATSAPP_RATE_LIMIT_SENDER_PER_MINUTE = float(os.getenv('WHATSAPP_RATE_LIMIT_SENDER_PER_MINUTE', '12'))
+WHATSAPP_RATE_LIMIT_SENDER_BURST = int(os.getenv('WHATSAPP_RATE_LIMIT_SENDER_BURST', '10'))
+WHATSAPP_RATE_LIMIT_GLOBAL_PER_SECOND = float(os.getenv('WHATSAPP_RATE_LIMIT_GLOBAL_PER_SECOND', '100'))
+WHATSAPP_RATE_LIMIT_GLOBAL_BURST = int(os.getenv('WHATSAPP_RATE_LIMIT_GLOBAL_BURST', '500'))
+WHATSAPP_RATE_LIMIT_PATH = os.getenv(
+    'WHATSAPP_RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'valet-whatsapp-ratelimit.sqlite3')
+)
+WHATSAPP_RATE_LIMIT_REDIS_URL = os.getenv('WHATSAPP_RATE_LIMIT_REDIS_URL')
+
+# Broadcasts to parked customers (whatsapp/broadcasts.py): sends in flight
+# at once, and sends started per second at most (0: no limit) to stay under
+# the provider's throughput limit (80/s for a Twilio WhatsApp sender).
+WHATSAPP_BROADCAST_CONCURRENCY = int(os.getenv('WHATSAPP_BROADCAST_CONCURRENCY', '32'))
+WHATSAPP_BROADCAST_RATE = float(os.getenv('WHATSAPP_BROADCAST_RATE', '60'))
+
+# Bulk employee onboarding (companies/onboarding.py): processes hashing
+# passwords (by default every CPU but one, which is left to the web workers)
+# and the nice value they run at, so requests are served first.
+EMPLOYEE_IMPORT_PROCESSES = int(os.getenv('EMPLOYEE_IMPORT_PROCESSES', str(max(1, (os.cpu_count() or 2) - 1))))
+EMPLOYEE_IMPORT_NICENESS = int(os.getenv('EMPLOYEE_IMPORT_NICENESS', '10'))
+
+# Message pre-filled by the WhatsApp link in each slot's QR code
+WHATSAPP_QR_MESSAGE = os.getenv('WHATSAPP_QR_MESSAGE', 'Park my car - PLATE - {slot_id}')
+
+# Live parking events (/api/parking/events/). When set, events are relayed
+# through Redis so the WSGI workers and the ASGI stream server share them.
+PARKING_EVENTS_REDIS_URL = os.getenv('PARKING_EVENTS_REDIS_URL')
+
+# Monthly partitions of transaction and message history (parking/partitions.py).
+# Retention is in whole months; 0 keeps everything.
+PARKING_PARTITION_MONTHS_AHEAD = int(os.getenv('PARKING_PARTITION_MONTHS_AHEAD', '3'))
+PARKING_TRANSACTION_RETENTION_MONTHS = int(os.getenv('PARKING_TRANSACTION_RETENTION_MONTHS', '0'))
+NOTIFICATION_LOG_RETENTION_MONTHS = int(os.getenv('NOTIFICATION_LOG_RETENTION_MONTHS', '0'))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
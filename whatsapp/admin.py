@@ -1,3 +1,26 @@
 from django.contrib import admin
+from .models import Broadcast, InboundMessage, OutboundMessage
 
 # Register your models here.
+# whatsapp/admin.py
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to_phone', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_phone', 'provider_message_id')
+    raw_id_fields = ('transaction',)
+
+
+@admin.register(InboundMessage)
+class InboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'message_sid', 'sender', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status',)
+    search_fields = ('message_sid', 'sender')
+
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ('id', 'company', 'division', 'status', 'recipients', 'sent', 'failed', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    raw_id_fields = ('company', 'created_by')
@@ -0,0 +1,228 @@
+# whatsapp/broadcasts.py
+"""
+Broadcasts: one message to every customer whose car is parked at a company
+(or in one of its divisions), e.g. "Valet closing in 30 minutes, please
+request your car".
+
+The API only records a Broadcast and run_broadcast_worker claims and sends
+it, so web workers never wait on the provider; send_broadcast sends one
+from the command line.
+Recipients are read with one query over the company/status index, one per
+customer. ``dispatch`` sends from an asyncio loop with at most
+``concurrency`` sends in flight, started no faster than ``rate`` per second
+to stay under the provider's throughput limit. Transports are blocking, so
+each send runs on a thread. Results are recorded in batches as outgoing
+NotificationLogs, and the Broadcast's counters are updated with each batch
+so its progress can be followed.
+
+Failed sends are counted and logged, not retried: a broadcast is a one-off
+notice, and the outbox (whatsapp/outbox.py) keeps handling conversational
+replies. Their NotificationLogs have no provider message id and carry the
+error in the payload, so missed recipients can be followed up.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from parking import payloads
+from parking.models import NotificationLog, ParkingTransaction
+
+from .models import Broadcast
+from .transports import get_transport
+
+# Results written per database round trip, at most, and seconds between writes
+RECORD_BATCH = 200
+RECORD_INTERVAL = 1.0
+# A sending broadcast without progress for this long lost its worker
+STALE_SECONDS = 300
+
+
+def create(company, body, division='', created_by=None):
+    """Record a broadcast for run_broadcast_worker to send."""
+    return Broadcast.objects.create(company=company, body=body, division=(division or '').strip(),
+                                    created_by=created_by)
+
+
+def recipients(broadcast):
+    """[(transaction id, phone)] of the customers with a car parked, one per customer (their latest car)."""
+    transactions = ParkingTransaction.objects.filter(
+        company_id=broadcast.company_id,
+        status=ParkingTransaction.Status.PARKED,
+        customer__isnull=False
+    )
+    if broadcast.division:
+        transactions = transactions.filter(slot__division=broadcast.division)
+    return list(
+        transactions.order_by('customer_id', '-requested_at').distinct('customer_id')
+        .values_list('id', 'customer__phone_number')
+    )
+
+
+def claim():
+    """Mark the oldest pending broadcast as sending and return it, or None."""
+    now = timezone.now()
+    with db_transaction.atomic():
+        # Sends are not recorded per recipient before they complete, so a
+        # broadcast whose worker died is not resumed (that could send twice)
+        Broadcast.objects.filter(
+            status=Broadcast.Status.SENDING,
+            heartbeat_at__lt=now - timedelta(seconds=STALE_SECONDS)
+        ).update(status=Broadcast.Status.FAILED, last_error='Worker stopped while sending', finished_at=now)
+
+        broadcast = Broadcast.objects.filter(
+            status=Broadcast.Status.PENDING
+        ).order_by('created_at').select_for_update(skip_locked=True).first()
+        if broadcast is None:
+            return None
+        start(broadcast)
+    return broadcast
+
+
+def start(broadcast):
+    """Mark ``broadcast`` as being sent."""
+    broadcast.status = Broadcast.Status.SENDING
+    broadcast.started_at = broadcast.heartbeat_at = timezone.now()
+    broadcast.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+
+class Pacer:
+    """Spaces the calls to ``wait`` at least 1/rate seconds apart; a rate of 0 never waits."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        # Reserve the slot before sleeping, so waiters queue up in order
+        at = max(now, self.next_at)
+        self.next_at = at + self.interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+def record(broadcast, results):
+    """
+    Log a batch of results, [(transaction id, phone, provider message id,
+    error)], and count them. Every send gets an outgoing NotificationLog;
+    a failed one has no message id and its error in the payload.
+    """
+    errors = [(phone, error) for _, phone, _, error in results if error is not None]
+    for phone, error in errors:
+        print(f"[Error sending WhatsApp broadcast {broadcast.id}] {phone}: {error}")
+    sent = len(results) - len(errors)
+
+    logged = []
+    for transaction_id, phone, sid, error in results:
+        payload = {'To': f"whatsapp:{phone}", 'Body': broadcast.body, 'MessageSid': sid, 'BroadcastId': broadcast.id}
+        if error is not None:
+            payload['Error'] = str(error)[:1000]
+        logged.append((transaction_id, sid, payload))
+    with db_transaction.atomic():
+        raw_payloads = payloads.store_many([payload for _, _, payload in logged])
+        NotificationLog.objects.bulk_create([
+            NotificationLog(
+                transaction_id=transaction_id,
+                direction=NotificationLog.Direction.OUTGOING,
+                whatsapp_message_id=sid,
+                raw_payload=raw_payload
+            )
+            for (transaction_id, sid, _), raw_payload in zip(logged, raw_payloads)
+        ])
+        changes = {'sent': F('sent') + sent, 'failed': F('failed') + len(errors), 'heartbeat_at': timezone.now()}
+        if errors:
+            changes['last_error'] = str(errors[-1][1])[:1000]
+        Broadcast.objects.filter(id=broadcast.id).update(**changes)
+    broadcast.sent += sent
+    broadcast.failed += len(errors)
+    broadcast.last_error = changes.get('last_error', broadcast.last_error)
+
+
+async def dispatch(broadcast, targets, transport, executor, concurrency, rate, progress=None):
+    """
+    Send ``broadcast.body`` to ``targets`` ([(transaction id, phone)]) through
+    ``transport``, on ``executor`` threads. ``progress(broadcast)`` is
+    called after each recorded batch.
+    """
+    loop = asyncio.get_running_loop()
+    pacer = Pacer(rate)
+    remaining = iter(targets)
+    results = asyncio.Queue()
+    record_async = sync_to_async(record, thread_sensitive=True)
+
+    async def sender():
+        # The senders share one iterator, so each target is taken once
+        for transaction_id, phone in remaining:
+            await pacer.wait()
+            try:
+                sid = await loop.run_in_executor(executor, transport.send, phone, broadcast.body)
+                await results.put((transaction_id, phone, sid, None))
+            except Exception as e:
+                await results.put((transaction_id, phone, None, e))
+
+    async def recorder():
+        # Writes what arrived in the last RECORD_INTERVAL, or RECORD_BATCH
+        # results as soon as they are in; None ends the stream
+        finished = False
+        while not finished:
+            batch = []
+            deadline = loop.time() + RECORD_INTERVAL
+            while len(batch) < RECORD_BATCH:
+                try:
+                    result = await asyncio.wait_for(results.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if result is None:
+                    finished = True
+                    break
+                batch.append(result)
+            if batch:
+                await record_async(broadcast, batch)
+                if progress is not None:
+                    progress(broadcast)
+
+    recording = asyncio.create_task(recorder())
+    try:
+        await asyncio.gather(*(sender() for _ in range(max(1, min(concurrency, len(targets))))))
+    finally:
+        await results.put(None)
+        await recording
+        # The connection of the thread that recorded the results
+        await sync_to_async(connections.close_all, thread_sensitive=True)()
+
+
+def run(broadcast, transport=None, concurrency=None, rate=None, progress=None):
+    """
+    Send a claimed broadcast to its recipients and mark it done (or failed
+    if sending broke off). WHATSAPP_BROADCAST_* settings are the defaults.
+    """
+    transport = transport or get_transport()
+    concurrency = concurrency or settings.WHATSAPP_BROADCAST_CONCURRENCY
+    rate = settings.WHATSAPP_BROADCAST_RATE if rate is None else rate
+
+    targets = recipients(broadcast)
+    broadcast.recipients = len(targets)
+    Broadcast.objects.filter(id=broadcast.id).update(recipients=broadcast.recipients)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='whatsapp-broadcast')
+    try:
+        asyncio.run(dispatch(broadcast, targets, transport, executor, concurrency, rate, progress))
+        broadcast.status = Broadcast.Status.DONE
+    except Exception as e:
+        print(f"[Error in WhatsApp broadcast {broadcast.id}] {e}")
+        broadcast.status = Broadcast.Status.FAILED
+        broadcast.last_error = str(e)[:1000]
+    finally:
+        executor.shutdown(wait=True)
+    broadcast.finished_at = timezone.now()
+    Broadcast.objects.filter(id=broadcast.id).update(
+        status=broadcast.status, finished_at=broadcast.finished_at, last_error=broadcast.last_error
+    )
+    return broadcast
@@ -0,0 +1,219 @@
+# whatsapp/handlers.py
+"""
+Handling of one incoming WhatsApp message: route it by intent (park,
+retrieve, status, cancel), apply it, log it and queue the reply. Run by the
+webhook directly, or by the inbox workers when the webhook only acknowledges
+(see whatsapp/inbox.py).
+"""
+import uuid
+from django.db import transaction as db_transaction
+from companies.models import Company
+from parking import allocation, customers, events, payloads, slot_cache, state_machine, stats
+from parking.models import ParkingTransaction, NotificationLog
+from . import idempotency, intents, outbox
+
+
+def handle_incoming(payload, deduplicate=True):
+    """
+    Route one message to the handler for its intent (see whatsapp/intents.py),
+    log it, and queue the handler's reply. Example payload (Twilio):
+    {
+      "From": "whatsapp:+1234567890",
+      "Body": "Park my car - GJ01AB1234 - <slot_uuid>",
+      "MessageSid": "SMxxxxxxxxxxxx",
+      ...
+    }
+    With ``deduplicate`` the MessageSid is recorded first and a message seen
+    before is skipped. Database errors are raised.
+    """
+    raw_from = payload.get('From', '')
+    # Twilio’s format is "whatsapp:+1234567890", so strip “whatsapp:”
+    phone = raw_from.replace("whatsapp:", "")
+    message_sid = payload.get('MessageSid')
+    intent, fields = intents.parse(payload.get('Body', ''))
+
+    # Writes and replies commit together with the MessageSid, so a retry
+    # either finds it recorded or starts over from scratch.
+    with db_transaction.atomic():
+        if deduplicate and message_sid and not idempotency.first_delivery(message_sid):
+            return
+
+        # Stored once, compressed, and shared by a new transaction and its log
+        raw_payload = payloads.store(payload)
+        tx, reply = INTENT_HANDLERS[intent](phone, fields, raw_payload)
+
+        # Log incoming
+        NotificationLog.objects.create(
+            transaction=tx,
+            direction=NotificationLog.Direction.INCOMING,
+            whatsapp_message_id=message_sid,
+            raw_payload=raw_payload
+        )
+        send_whatsapp_message(phone, reply, tx)
+
+
+def handle_park(phone, fields, raw_payload):
+    """Claim the slot and open a pending_park transaction. Returns (transaction, reply)."""
+    # Fetch or create Customer in one statement
+    customer = customers.upsert(phone)
+
+    slot, error_text = claim_slot(fields['slot'])
+    if slot is None:
+        return None, error_text
+
+    # Create new transaction
+    tx = ParkingTransaction.objects.create(
+        customer=customer,
+        slot=slot,
+        plate_number=fields['plate'],
+        status=ParkingTransaction.Status.PENDING_PARK,
+        raw_payload=raw_payload
+    )
+    stats.record_transaction_created(tx, slot.division)
+    events.publish_on_commit(slot.company_id, events.TRANSACTION_CREATED, events.transaction_data(tx))
+    return tx, f"Received your request to park car {tx.plate_number} in slot {slot.name}. Please wait for confirmation."
+
+
+def handle_retrieve(phone, fields, raw_payload):
+    """Move the customer's parked car to pending_retrieve."""
+    cars = active_transactions(phone, fields.get('plate'))
+    parked = [tx for tx in cars if tx.status == ParkingTransaction.Status.PARKED]
+    if len(parked) > 1:
+        return None, choose_plate_text(parked, 'get my car')
+    if not parked:
+        if cars:
+            return cars[0], status_text(cars)
+        return None, NO_CAR_TEXT
+    tx = parked[0]
+    try:
+        tx = state_machine.apply_transition(tx.company, tx.id, ParkingTransaction.Status.PENDING_RETRIEVE)
+    except state_machine.TransitionError:
+        return tx, "Sorry, we could not process that right now. Please try again."
+    return tx, f"We are bringing your car {tx.plate_number} from slot {tx.slot.name}. We will let you know when it is ready."
+
+
+def handle_status(phone, fields, raw_payload):
+    """Report where the customer's cars are."""
+    cars = active_transactions(phone, fields.get('plate'))
+    if not cars:
+        return None, NO_CAR_TEXT
+    return cars[0], status_text(cars)
+
+
+def handle_cancel(phone, fields, raw_payload):
+    """Cancel a request whose car has not been parked yet, freeing its slot."""
+    cars = active_transactions(phone, fields.get('plate'))
+    pending = [tx for tx in cars if tx.status == ParkingTransaction.Status.PENDING_PARK]
+    if len(pending) > 1:
+        return None, choose_plate_text(pending, 'cancel')
+    if not pending:
+        if cars:
+            return cars[0], status_text(cars) + " It can no longer be cancelled."
+        return None, "You have no parking request to cancel."
+    tx = pending[0]
+    try:
+        tx = state_machine.apply_transition(tx.company, tx.id, ParkingTransaction.Status.CANCELLED)
+    except state_machine.TransitionError:
+        return tx, "Sorry, your car is already being parked and the request can no longer be cancelled."
+    return tx, f"Your parking request for car {tx.plate_number} has been cancelled."
+
+
+def handle_unknown(phone, fields, raw_payload):
+    return None, HELP_TEXT
+
+
+INTENT_HANDLERS = {
+    intents.PARK: handle_park,
+    intents.RETRIEVE: handle_retrieve,
+    intents.STATUS: handle_status,
+    intents.CANCEL: handle_cancel,
+    intents.UNKNOWN: handle_unknown,
+}
+
+HELP_TEXT = (
+    "Sorry, we did not understand that. You can send:\n"
+    "• \"Park my car - <plate> - <slot>\" (scan the QR code at your slot)\n"
+    "• \"Get my car\" when you want it back\n"
+    "• \"Status\" to see where your car is\n"
+    "• \"Cancel\" to withdraw a request before the car is parked"
+)
+NO_CAR_TEXT = "We could not find a car with us for this number."
+
+# Active status → how it is described to the customer
+STATUS_DESCRIPTIONS = {
+    ParkingTransaction.Status.PENDING_PARK: 'is waiting to be parked in slot {slot}',
+    ParkingTransaction.Status.PARKED: 'is parked in slot {slot}',
+    ParkingTransaction.Status.PENDING_RETRIEVE: 'is on its way to you from slot {slot}',
+}
+
+
+def active_transactions(phone, plate=None):
+    """The customer's cars still with the valet, newest first, optionally for one plate."""
+    transactions = list(ParkingTransaction.objects.select_related('slot', 'company').filter(
+        customer__phone_number=phone,
+        status__in=ParkingTransaction.ACTIVE_STATUSES
+    ).order_by('-requested_at')[:10])
+    if plate:
+        # "GJ01AB1234" and "gj-01-ab 1234" are the same plate
+        plate = plate_key(plate)
+        transactions = [tx for tx in transactions if plate_key(tx.plate_number) == plate]
+    return transactions
+
+
+def plate_key(plate):
+    return ''.join(char for char in (plate or '').upper() if char.isalnum())
+
+
+def status_text(transactions):
+    return ' '.join(
+        f"Car {tx.plate_number} {STATUS_DESCRIPTIONS[tx.status].format(slot=tx.slot.name)}."
+        for tx in transactions
+    )
+
+
+def choose_plate_text(transactions, command):
+    plates = ', '.join(tx.plate_number or '-' for tx in transactions)
+    return f"You have more than one car with us ({plates}). Please send \"{command} <plate>\"."
+
+
+def claim_slot(slot_ref):
+    """
+    Claim the slot a message refers to, inside the caller's transaction.
+    A slot UUID (from a QR code) claims that slot, or another free slot in
+    the same division if it is taken; "<COMPANY_CODE>:<division>" claims
+    any free slot in the division. Returns (slot, None) or (None, reply).
+    """
+    try:
+        slot_id = uuid.UUID(slot_ref)
+    except ValueError:
+        company_code, _, division = slot_ref.partition(':')
+        division = division.strip()
+        company = Company.objects.filter(company_code=company_code.strip().upper()).first()
+        if company is None or not division:
+            return None, "Invalid slot. Please scan a valid QR code."
+        slot = allocation.allocate(company.id, division)
+        if slot is None:
+            return None, f"Sorry, there is no free slot in {division} right now. Please try again shortly."
+        return slot, None
+
+    slot = slot_cache.get(slot_id)
+    if slot is None:
+        return None, "Invalid slot. Please scan a valid QR code."
+    if allocation.claim(slot):
+        return slot, None
+    slot = allocation.allocate(slot.company_id, slot.division)
+    if slot is None:
+        return None, "Sorry, that slot is currently occupied. Please try another slot."
+    return slot, None
+
+
+def send_whatsapp_message(to_phone, message_text, transaction=None):
+    """
+    Queue an outbound message; run_outbox_worker sends it through Twilio
+    (or the WhatsApp Cloud API) and logs it. See whatsapp/outbox.py.
+    """
+    try:
+        return outbox.enqueue(to_phone, message_text, transaction)
+    except Exception as ex:
+        print(f"[Error queueing WhatsApp] {ex}")
+        return None
@@ -0,0 +1,67 @@
+# whatsapp/idempotency.py
+"""
+Deduplication of webhook deliveries by provider message id (MessageSid).
+
+Twilio retries a webhook that timed out, so the same message can arrive more
+than once. The webhook records each MessageSid in InboundMessage, whose
+unique index is the source of truth, inside the transaction that handles the
+message: a concurrent retry waits on the index and then sees the duplicate,
+and a delivery that failed part-way leaves nothing behind to block its retry.
+NotificationLog itself cannot carry the constraint because it is partitioned
+by timestamp (see parking/partitions.py).
+
+``recent_message_ids`` is a bounded, per-process LRU of ids already seen, so
+most retries are answered without a database round trip.
+"""
+import collections
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+
+from .models import InboundMessage
+
+
+class RecentIds:
+    """Thread-safe LRU set of the last ``size`` ids."""
+
+    def __init__(self, size):
+        self.size = size
+        self._ids = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, key):
+        """Whether ``key`` is in the set, refreshing it if so."""
+        with self._lock:
+            if key in self._ids:
+                self._ids.move_to_end(key)
+                return True
+            return False
+
+    def add(self, key):
+        with self._lock:
+            self._ids[key] = None
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.size:
+                self._ids.popitem(last=False)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+recent_message_ids = RecentIds(settings.WHATSAPP_RECENT_MESSAGE_IDS)
+
+
+def first_delivery(message_sid):
+    """
+    Record ``message_sid`` inside the caller's transaction. False when it was
+    already recorded, i.e. this delivery is a retry and must not be processed.
+    """
+    try:
+        with db_transaction.atomic():
+            InboundMessage.objects.create(message_sid=message_sid)
+    except IntegrityError:
+        recent_message_ids.add(message_sid)
+        return False
+    db_transaction.on_commit(lambda: recent_message_ids.add(message_sid))
+    return True
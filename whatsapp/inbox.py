@@ -0,0 +1,123 @@
+# whatsapp/inbox.py
+"""
+Ack-first webhook handling (WHATSAPP_WEBHOOK_MODE = 'inbox').
+
+The webhook only appends the delivery to InboundMessage with a single
+INSERT ... ON CONFLICT DO NOTHING, which also drops provider retries, and
+answers straight away. The run_inbox_worker command processes the queue with
+a pool of worker threads, each running whatsapp.handlers.handle_incoming in
+the same transaction that holds the row: rows are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED, so workers never wait on each other, and a
+worker that dies simply releases its row. A burst of arrivals queues up in
+the table instead of tying up web workers.
+
+A message is only claimed once every earlier message from the same sender
+has been processed, so one customer's messages are handled in order. A
+message that fails is retried with exponential backoff
+(WHATSAPP_INBOX_* settings) until its attempts run out; while it waits for
+its retry it no longer holds up the sender's later messages.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import handlers, idempotency
+from .models import InboundMessage
+
+
+def accept(payload):
+    """Queue an incoming delivery; a MessageSid already queued or handled is ignored."""
+    data = payload.dict() if hasattr(payload, 'dict') else dict(payload)
+    message_sid = data.get('MessageSid') or None
+    InboundMessage.objects.bulk_create([
+        InboundMessage(
+            message_sid=message_sid,
+            sender=data.get('From', '').replace('whatsapp:', '')[:50],
+            payload=data,
+            status=InboundMessage.Status.RECEIVED
+        )
+    ], ignore_conflicts=True)
+    if message_sid:
+        idempotency.recent_message_ids.add(message_sid)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying after the ``attempts``-th failure, with jitter."""
+    delay = min(
+        settings.WHATSAPP_INBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.WHATSAPP_INBOX_BACKOFF_MAX_SECONDS
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def process_next():
+    """
+    Claim and process the oldest message that is ready, in one transaction.
+    Returns the message, or None when nothing is ready.
+    """
+    now = timezone.now()
+    earlier = InboundMessage.objects.filter(
+        sender=OuterRef('sender'),
+        id__lt=OuterRef('id'),
+        status=InboundMessage.Status.RECEIVED,
+        available_at__lte=now
+    )
+    with db_transaction.atomic():
+        message = InboundMessage.objects.filter(
+            status=InboundMessage.Status.RECEIVED,
+            available_at__lte=now
+        ).exclude(
+            Exists(earlier)
+        ).order_by('id').select_for_update(skip_locked=True).first()
+        if message is None:
+            return None
+
+        message.attempts += 1
+        try:
+            with db_transaction.atomic():
+                handlers.handle_incoming(message.payload, deduplicate=False)
+        except Exception as e:
+            print(f"[Error processing incoming WhatsApp] {message.message_sid}: {e}")
+            message.last_error = str(e)[:1000]
+            if message.attempts >= settings.WHATSAPP_INBOX_MAX_ATTEMPTS:
+                message.status = InboundMessage.Status.FAILED
+            else:
+                message.available_at = timezone.now() + timedelta(seconds=backoff(message.attempts))
+        else:
+            message.status = InboundMessage.Status.PROCESSED
+            message.processed_at = timezone.now()
+            message.payload = None     # kept in RawPayload by the handler
+            message.last_error = ''
+        message.save(update_fields=['status', 'attempts', 'available_at', 'last_error', 'processed_at', 'payload'])
+    return message
+
+
+def prune(retention_days, batch_size=10000):
+    """
+    Delete processed messages received more than ``retention_days`` ago, in
+    batches of ``batch_size`` so no delete holds locks for long. Provider
+    retries arrive within minutes, so older rows are no longer needed for
+    deduplication. Failed messages are kept for inspection. Returns the
+    number deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        ids = list(
+            InboundMessage.objects.filter(
+                status=InboundMessage.Status.PROCESSED,
+                received_at__lt=cutoff
+            ).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += InboundMessage.objects.filter(id__in=ids).delete()[0]
+
+
+def backlog():
+    """Number of messages waiting to be processed."""
+    return InboundMessage.objects.filter(status=InboundMessage.Status.RECEIVED).count()
@@ -0,0 +1,87 @@
+# whatsapp/intents.py
+"""
+Intent router for incoming WhatsApp messages.
+
+``parse`` maps a message body to an intent name and its fields using a fixed
+list of patterns compiled at import. Bodies are normalized first (dash
+variants, whitespace) and cut to MAX_BODY_LENGTH characters, and every
+pattern is anchored, so the cost per message is bounded whatever customers
+type. Anything unrecognized is the UNKNOWN intent rather than an error.
+
+    park        "Park my car - GJ-01-AB-1234 - <slot uuid>"
+                "park GJ01AB1234 ACME:Level 1"
+    retrieve    "Get my car", "bring my car GJ01AB1234", "retrieve"
+    status      "Status", "where is my car?", "status GJ01AB1234"
+    cancel      "Cancel", "cancel my request"
+
+The corpus in intent_corpus.tsv lists real-world variants and the intent
+each must map to; benchmark_intents checks and times it.
+"""
+import re
+
+PARK = 'park'
+RETRIEVE = 'retrieve'
+STATUS = 'status'
+CANCEL = 'cancel'
+UNKNOWN = 'unknown'
+
+MAX_BODY_LENGTH = 300
+
+_DASHES = re.compile(r'[‐-―−]')
+_SPACES = re.compile(r'\s+')
+
+# A plate: letters and digits, optionally split by single spaces or hyphens.
+# Each repetition starts at a separator, so there is only one way to match.
+_PLATE = r'(?P<plate>[a-z0-9]+(?:[ -][a-z0-9]+){0,5})'
+_SEP = r'(?:\s*[-:,]\s*|\s+)'
+_CAR = r'(?:\s+(?:my|the)\b)?(?:\s+(?:car|vehicle)\b)?'
+_TRAILER = r'(?:\s+(?:please|pls|plz|now|asap)\b)?[\s.!?]*'
+
+PATTERNS = [
+    (PARK, re.compile(
+        r'(?:please\s+)?park\b' + _CAR + _SEP + _PLATE + _SEP +
+        r'(?P<slot>[0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12}|[a-z0-9_]+\s*:\s*[^:]{1,100}?)'
+        + _TRAILER,
+        re.IGNORECASE
+    )),
+    (RETRIEVE, re.compile(
+        r'(?:(?:please\s+)?(?:get|bring|fetch|return|retrieve|pick\s?up)\b(?:\s+back\b)?' + _CAR +
+        r'|(?:i\s+)?(?:want|need)\s+(?:my|the)\s+(?:car|vehicle)\b)' +
+        r'(?:\s+back\b)?(?:' + _SEP + _PLATE + r')??' + _TRAILER,
+        re.IGNORECASE
+    )),
+    (STATUS, re.compile(
+        r"(?:(?:car\s+|check\s+(?:my\s+)?)?status\b|where(?:'?s|\s+is)\s+my\s+(?:car|vehicle)\b)"
+        r'(?:' + _SEP + _PLATE + r')??' + _TRAILER,
+        re.IGNORECASE
+    )),
+    (CANCEL, re.compile(
+        r'(?:please\s+|i\s+want\s+to\s+)?cancel\b(?:\s+(?:my|the)\b)?(?:\s+(?:request|parking|booking)\b)?'
+        r'(?:' + _SEP + _PLATE + r')??' + _TRAILER,
+        re.IGNORECASE
+    )),
+]
+
+
+def normalize(body):
+    body = _DASHES.sub('-', (body or '')[:MAX_BODY_LENGTH])
+    return _SPACES.sub(' ', body).strip()
+
+
+def parse(body):
+    """(intent, fields) for a message body; fields hold the named groups that matched."""
+    text = normalize(body)
+    for intent, pattern in PATTERNS:
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        fields = {key: value.strip() for key, value in match.groupdict().items() if value}
+        if 'plate' in fields:
+            # An optional trailing plate must carry a digit, so words like
+            # "now or else" are not taken for one. Park keeps whatever sits
+            # between its separators (the QR message pre-fills "PLATE").
+            if intent != PARK and not any(char.isdigit() for char in fields['plate']):
+                continue
+            fields['plate'] = fields['plate'].upper()
+        return intent, fields
+    return UNKNOWN, {}
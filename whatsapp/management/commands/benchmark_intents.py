@@ -0,0 +1,123 @@
+"""
+Django command to check and time the WhatsApp intent router
+"""
+import gc
+import random
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from whatsapp import intents
+
+CORPUS = Path(intents.__file__).with_name('intent_corpus.tsv')
+
+
+def load_corpus(path):
+    """[(expected intent, message)] from a corpus file; see intent_corpus.tsv."""
+    corpus = []
+    with open(path, encoding='utf-8') as corpus_file:
+        for line in corpus_file:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            expected, _, message = line.partition('\t')
+            corpus.append((expected, message))
+    return corpus
+
+
+def mutate(message, rng):
+    """A random variant of ``message``: characters dropped, repeated, swapped or injected."""
+    chars = list(message)
+    for _ in range(rng.randint(1, 6)):
+        position = rng.randint(0, len(chars))
+        operation = rng.randrange(5)
+        if operation == 0 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif operation == 1:
+            chars.insert(position, rng.choice(' -–:,.!?aZ09\t\n🚗é'))
+        elif operation == 2 and chars:
+            chars[min(position, len(chars) - 1)] *= rng.randint(2, 40)
+        elif operation == 3:
+            chars.insert(position, rng.choice(['-' * 50, ' a' * 60, ':' * 30, '0' * 80, ' -a1' * 40]))
+        else:
+            chars = chars[:position] + chars[position:][::-1]
+    return ''.join(chars)
+
+
+def adversarial():
+    """Long inputs aimed at the patterns' repetitions."""
+    return [
+        'park ' + 'a-' * 500,
+        'park my car ' + 'a1 ' * 400 + 'x:' + 'y' * 400,
+        'get my car ' + 'a1 ' * 500,
+        'status ' + '-' * 1000,
+        'cancel ' + 'a1-' * 400 + '!',
+        ' ' * 5000 + 'get my car',
+        'Park my car - ' + 'GJ01 ' * 300 + '- 550e8400-e29b-41d4-a716-446655440000',
+        '🚗' * 3000,
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to benchmark intent parsing"""
+    help = (
+        'Check every message in the intent corpus maps to its expected intent, time parsing, '
+        'and fuzz the router with mutated and adversarial messages'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=str(CORPUS), help='Corpus file (default: whatsapp/intent_corpus.tsv)')
+        parser.add_argument('--iterations', type=int, default=200, help='Timed passes over the corpus (default: 200)')
+        parser.add_argument('--fuzz', type=int, default=20000, help='Mutated messages to parse (default: 20000)')
+        parser.add_argument('--seed', type=int, default=0, help='Fuzzing seed (default: 0)')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        corpus = load_corpus(options['corpus'])
+        if not corpus:
+            raise CommandError(f"No messages in {options['corpus']}")
+
+        mismatches = [
+            (expected, message, intents.parse(message))
+            for expected, message in corpus
+            if intents.parse(message)[0] != expected
+        ]
+        for expected, message, got in mismatches:
+            self.stdout.write(self.style.ERROR(f'FAIL  expected {expected}, got {got[0]} {got[1]}: {message!r}'))
+        self.stdout.write(f'{len(corpus) - len(mismatches)}/{len(corpus)} corpus messages routed as expected')
+
+        messages = [message for _, message in corpus]
+        started = time.perf_counter()
+        for _ in range(options['iterations']):
+            for message in messages:
+                intents.parse(message)
+        per_message = (time.perf_counter() - started) / (options['iterations'] * len(messages))
+        self.stdout.write(self.style.SUCCESS(
+            f'corpus: {per_message * 1e6:.1f} µs/message, {1 / per_message:,.0f} messages/s'
+        ))
+
+        rng = random.Random(options['seed'])
+        fuzzed = [mutate(rng.choice(messages), rng) for _ in range(options['fuzz'])] + adversarial()
+        slowest, slowest_message, counts = 0.0, '', {}
+        # Best of three runs with the collector off, so pauses are not blamed on a message
+        gc.disable()
+        try:
+            for message in fuzzed:
+                elapsed = None
+                for _ in range(3):
+                    started = time.perf_counter()
+                    intent = intents.parse(message)[0]       # must never raise
+                    run = time.perf_counter() - started
+                    elapsed = run if elapsed is None else min(elapsed, run)
+                counts[intent] = counts.get(intent, 0) + 1
+                if elapsed > slowest:
+                    slowest, slowest_message = elapsed, message
+        finally:
+            gc.enable()
+        breakdown = ', '.join(f'{intent} {count}' for intent, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'fuzz: {len(fuzzed)} messages ({breakdown}), slowest {slowest * 1e6:.1f} µs '
+            f'({len(slowest_message)} chars)'
+        ))
+
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} corpus message(s) routed to the wrong intent')
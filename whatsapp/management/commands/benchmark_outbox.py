@@ -0,0 +1,85 @@
+"""
+Django command to measure outbound message throughput against the fake gateway
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from parking.models import NotificationLog, RawPayload
+from whatsapp import outbox
+from whatsapp.models import OutboundMessage
+from whatsapp.transports import FakeTransport
+
+PHONE_PREFIX = '+1999'
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the WhatsApp outbox"""
+    help = (
+        'Queue messages, drain them through the outbox with an in-process fake gateway '
+        'and report the throughput. The queued rows and their logs are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Messages to send (default: 2000)')
+        parser.add_argument('--recipients', type=int, default=500, help='Distinct recipients (default: 500)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Messages sent in parallel (default: 16)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per round (default: 50)')
+        parser.add_argument('--latency', type=float, default=0.05, help='Gateway latency in seconds (default: 0.05)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency, up to this many seconds')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of sends that fail, 0-1')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['messages'] < 1 or options['recipients'] < 1:
+            raise CommandError('--messages and --recipients must be at least 1')
+        # claim() would hand real queued messages to the fake gateway
+        if OutboundMessage.objects.filter(status__in=outbox.UNSENT_STATUSES).exists():
+            raise CommandError('The outbox has unsent messages; run the benchmark on an idle queue')
+
+        OutboundMessage.objects.bulk_create([
+            OutboundMessage(to_phone=f'{PHONE_PREFIX}{i % options["recipients"]:07d}', body=f'Benchmark message {i}')
+            for i in range(options['messages'])
+        ], batch_size=1000)
+        transport = FakeTransport(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate']
+        )
+
+        rounds = 0
+        started = time.monotonic()
+        try:
+            # Retries are due immediately so failures cost a round, not a backoff period
+            with override_settings(WHATSAPP_OUTBOX_BACKOFF_SECONDS=0), \
+                    ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                while True:
+                    messages = outbox.claim(options['batch_size'])
+                    if not messages:
+                        break
+                    outbox.dispatch(messages, transport, executor)
+                    rounds += 1
+            elapsed = time.monotonic() - started
+            failed = OutboundMessage.objects.filter(
+                to_phone__startswith=PHONE_PREFIX,
+                status=OutboundMessage.Status.FAILED
+            ).count()
+        finally:
+            self._cleanup()
+
+        self.stdout.write(
+            f"{transport.sent_count} sent, {transport.error_count} failed attempt(s), {failed} given up, "
+            f"{rounds} round(s) in {elapsed:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(f'{transport.sent_count / elapsed:.0f} messages/s'))
+
+    def _cleanup(self):
+        logs = NotificationLog.objects.filter(
+            direction=NotificationLog.Direction.OUTGOING,
+            whatsapp_message_id__startswith='FAKE'
+        )
+        # Each payload names its own message id, so none is shared with real logs
+        payload_ids = list(logs.values_list('raw_payload_id', flat=True))
+        logs.delete()
+        RawPayload.objects.filter(id__in=payload_ids).delete()
+        OutboundMessage.objects.filter(to_phone__startswith=PHONE_PREFIX).delete()
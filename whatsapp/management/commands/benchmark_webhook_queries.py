@@ -0,0 +1,95 @@
+"""
+Django command to count the database queries the webhook makes per message
+"""
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.test.utils import CaptureQueriesContext
+from core.models import CoreUser
+from companies.models import Company
+from parking import allocation, state_machine
+from parking.models import ParkingSlot, ParkingTransaction
+from whatsapp import handlers, idempotency
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data"""
+
+
+class Command(BaseCommand):
+    """Django command to benchmark webhook query counts"""
+    help = (
+        'Run typical incoming messages through the webhook pipeline against a seeded company '
+        '(rolled back afterwards) and report the queries each one makes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-queries', action='store_true', help='Print every query')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        self.verbose = options['verbose_queries']
+        company = None
+        try:
+            with db_transaction.atomic():
+                company, slots = self.seed()
+                self.run_scenarios(company, slots)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if company is not None:
+                allocation.index.invalidate(company.id)
+
+    def seed(self):
+        admin = CoreUser.objects.create_user(username='benchmark-webhook-admin', password=None,
+                                             role=CoreUser.Role.COMPANY_ADMIN)
+        company = Company.objects.create(name='Benchmark Webhook', phone_number='+0000000000',
+                                         location='Benchmark', company_code='BENCHWH', admin_user=admin)
+        slots = ParkingSlot.objects.bulk_create(
+            ParkingSlot(company=company, name=f'S{i:03d}', division='Level 1') for i in range(20)
+        )
+        return company, slots
+
+    def message(self, phone, body, message_sid=None):
+        return {
+            'From': f'whatsapp:{phone}',
+            'Body': body,
+            'MessageSid': message_sid or f'SMbench{uuid.uuid4().hex}',
+        }
+
+    def measure(self, label, payload):
+        with CaptureQueriesContext(connection) as context:
+            handlers.handle_incoming(payload)
+        statements = [query['sql'] for query in context.captured_queries]
+        savepoints = sum(1 for sql in statements if 'SAVEPOINT' in sql)
+        self.stdout.write(f'{len(statements) - savepoints:3d} queries (+{savepoints} savepoint statements)  {label}')
+        if self.verbose:
+            for sql in statements:
+                self.stdout.write(f'      {sql[:160]}')
+
+    def run_scenarios(self, company, slots):
+        # Numbers no customer has yet
+        new_phone, returning_phone, division_phone = (f'+1{uuid.uuid4().int % 10 ** 10:010d}' for _ in range(3))
+        # A returning customer who has used the first slot before
+        handlers.handle_incoming(self.message(returning_phone, f'Park my car - GJ01AB0001 - {slots[0].id}'))
+        handlers.handle_incoming(self.message(returning_phone, 'cancel'))
+
+        self.measure('park by slot QR, new customer, slot not seen before',
+                     self.message(new_phone, f'Park my car - GJ01AB0002 - {slots[1].id}'))
+        self.measure('park by slot QR, returning customer, slot seen before',
+                     self.message(returning_phone, f'Park my car - GJ01AB0001 - {slots[0].id}'))
+        self.measure('park by division',
+                     self.message(division_phone, f'Park my car - GJ01AB0003 - {company.company_code}:Level 1'))
+        self.measure('status', self.message(new_phone, 'status'))
+
+        tx = ParkingTransaction.objects.filter(company=company, customer__phone_number=new_phone).first()
+        state_machine.apply_transition(company, tx.id, ParkingTransaction.Status.PARKED)
+        self.measure('get my car', self.message(new_phone, 'get my car'))
+        self.measure('cancel', self.message(returning_phone, 'cancel'))
+        self.measure('unrecognized message', self.message(new_phone, 'hello'))
+
+        duplicate = self.message(new_phone, 'status')
+        handlers.handle_incoming(duplicate)
+        idempotency.recent_message_ids = idempotency.RecentIds(idempotency.recent_message_ids.size)
+        self.measure('duplicate delivery (not in the recent-id cache)', duplicate)
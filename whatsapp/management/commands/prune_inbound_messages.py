@@ -0,0 +1,31 @@
+"""
+Django command to delete processed inbound WhatsApp messages past the retention period
+"""
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from whatsapp import inbox
+
+
+class Command(BaseCommand):
+    """Django command to prune InboundMessage"""
+    help = 'Delete processed inbound WhatsApp messages older than the retention period (failed ones are kept)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.WHATSAPP_INBOX_RETENTION_DAYS,
+            help='Days of processed messages to keep'
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running, pruning every N seconds'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        while True:
+            deleted = inbox.prune(options['days'])
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} processed inbound message(s)'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,61 @@
+"""
+Django command to send the broadcasts created through the API
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from whatsapp import broadcasts
+
+
+def progress_printer(stdout):
+    """A ``progress`` callback for broadcasts.run that writes one line per recorded batch."""
+    started = time.monotonic()
+
+    def progress(broadcast):
+        elapsed = time.monotonic() - started
+        done = broadcast.sent + broadcast.failed
+        stdout.write(
+            f'Broadcast {broadcast.id}: {done}/{broadcast.recipients} '
+            f'({broadcast.failed} failed) in {elapsed:.1f}s, {done / max(elapsed, 1e-6):.0f}/s'
+        )
+    return progress
+
+
+class Command(BaseCommand):
+    """Django command to run the WhatsApp broadcast sender"""
+    help = (
+        'Send pending broadcasts to every customer with a car parked, '
+        'with bounded concurrency and a provider send rate'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Sends in flight (default: WHATSAPP_BROADCAST_CONCURRENCY)')
+        parser.add_argument('--rate', type=float, help='Sends per second, 0 for no limit (default: WHATSAPP_BROADCAST_RATE)')
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait when no broadcast is pending (default: 2)'
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once no broadcast is pending')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['concurrency'] is not None and options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        while True:
+            try:
+                broadcast = broadcasts.claim()
+            except Exception as e:
+                print(f"[Error in broadcast worker] {e}")
+                connection.close()
+                broadcast = None
+            if broadcast is not None:
+                broadcasts.run(broadcast, concurrency=options['concurrency'], rate=options['rate'],
+                               progress=progress_printer(self.stdout))
+                self.stdout.write(self.style.SUCCESS(
+                    f'Broadcast {broadcast.id} {broadcast.status}: sent {broadcast.sent}/{broadcast.recipients}'
+                ))
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
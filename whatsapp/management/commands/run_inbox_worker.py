@@ -0,0 +1,68 @@
+"""
+Django command to process the queued incoming WhatsApp messages
+"""
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from whatsapp import inbox
+
+
+class Command(BaseCommand):
+    """Django command to run the WhatsApp inbox processors"""
+    help = (
+        'Process messages queued by the webhook in inbox mode (WHATSAPP_WEBHOOK_MODE=inbox) '
+        'with a pool of worker threads'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker threads (default: 4)')
+        parser.add_argument(
+            '--poll-interval', type=float, default=0.5,
+            help='Seconds a worker waits when the queue is empty (default: 0.5)'
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        self.processed = 0
+        self.lock = threading.Lock()
+        started = time.monotonic()
+        workers = [
+            threading.Thread(target=self.work, args=(options['poll_interval'], options['once']), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {self.processed} message(s) in {time.monotonic() - started:.2f}s'
+        ))
+
+    def work(self, poll_interval, once):
+        """One processor; each thread has its own database connection."""
+        try:
+            while True:
+                try:
+                    message = inbox.process_next()
+                except Exception as e:
+                    print(f"[Error in inbox worker] {e}")
+                    connection.close()
+                    message = None
+                if message is not None:
+                    with self.lock:
+                        self.processed += 1
+                    continue
+                if once:
+                    break
+                time.sleep(poll_interval)
+        finally:
+            connection.close()
@@ -0,0 +1,45 @@
+"""
+Django command to send the queued outbound WhatsApp messages
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from whatsapp import outbox, transports
+
+
+class Command(BaseCommand):
+    """Django command to drain the WhatsApp outbox"""
+    help = 'Send queued WhatsApp messages with bounded concurrency, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Messages sent in parallel (default: 8)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per round (default: 50)')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when nothing is due (default: 1)'
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once no message is due')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--concurrency and --batch-size must be at least 1')
+
+        transport = transports.get_transport()
+        total = 0
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            while True:
+                messages = outbox.claim(options['batch_size'])
+                if messages:
+                    started = time.monotonic()
+                    sent = outbox.dispatch(messages, transport, executor)
+                    total += sent
+                    self.stdout.write(
+                        f'Sent {sent}/{len(messages)} message(s) in {time.monotonic() - started:.2f}s'
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {total} message(s)'))
@@ -0,0 +1,57 @@
+"""
+Django command to send a WhatsApp broadcast to the customers with a car parked
+"""
+from django.core.management.base import BaseCommand, CommandError
+from companies.models import Company
+from whatsapp import broadcasts
+from whatsapp.models import Broadcast
+from whatsapp.management.commands.run_broadcast_worker import progress_printer
+
+
+class Command(BaseCommand):
+    """Django command to send a WhatsApp broadcast"""
+    help = (
+        'Message every customer with a car parked at a company (or one of its divisions) '
+        'and report progress as it goes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', required=True, help='Company code')
+        parser.add_argument('--message', required=True, help='Text to send')
+        parser.add_argument('--division', default='', help='Only customers parked in this division')
+        parser.add_argument('--concurrency', type=int, help='Sends in flight (default: WHATSAPP_BROADCAST_CONCURRENCY)')
+        parser.add_argument('--rate', type=float, help='Sends per second, 0 for no limit (default: WHATSAPP_BROADCAST_RATE)')
+        parser.add_argument(
+            '--queue', action='store_true',
+            help='Only record the broadcast for run_broadcast_worker instead of sending it here'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Count the recipients without sending')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['concurrency'] is not None and options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        company = Company.objects.filter(company_code=options['company'].strip().upper()).first()
+        if company is None:
+            raise CommandError(f"No company with code {options['company']}")
+        if not options['message'].strip():
+            raise CommandError('--message must not be empty')
+
+        if options['dry_run']:
+            broadcast = Broadcast(company=company, division=options['division'].strip())
+            count = len(broadcasts.recipients(broadcast))
+            self.stdout.write(f'{count} recipient(s); nothing sent')
+            return
+
+        broadcast = broadcasts.create(company, options['message'], options['division'])
+        if options['queue']:
+            self.stdout.write(self.style.SUCCESS(f'Broadcast {broadcast.id} queued'))
+            return
+
+        broadcasts.start(broadcast)
+        broadcasts.run(broadcast, concurrency=options['concurrency'], rate=options['rate'],
+                       progress=progress_printer(self.stdout))
+        self.stdout.write(self.style.SUCCESS(
+            f'Broadcast {broadcast.id} {broadcast.status}: sent {broadcast.sent}/{broadcast.recipients}, '
+            f'{broadcast.failed} failed'
+        ))
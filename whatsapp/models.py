@@ -1,3 +1,144 @@
 from django.db import models
 
 # Create your models here.
+# whatsapp/models.py
+from django.conf import settings
+from django.utils import timezone
+
+
+class OutboundMessage(models.Model):
+    """
+    A WhatsApp message waiting to be sent, or already sent, by the outbox
+    worker (see whatsapp/outbox.py). Messages to one recipient go out in id order.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENDING = 'sending', 'Sending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    id = models.BigAutoField(primary_key=True)
+    to_phone = models.CharField(max_length=20)
+    body = models.TextField()
+    transaction = models.ForeignKey(
+        'parking.ParkingTransaction',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbound_messages',
+        db_constraint=False              # transactions are partitioned, see parking/partitions.py
+    )
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)   # lease of the worker sending it
+    last_error = models.TextField(blank=True, default='')
+    provider_message_id = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Due messages, claimed by the worker
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='whatsapp_outbox_due_idx'
+            ),
+            # Earlier unsent messages to the same recipient
+            models.Index(
+                fields=['to_phone', 'id'],
+                condition=models.Q(status__in=['pending', 'sending']),
+                name='whatsapp_outbox_recipient_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Outbound {self.id} → {self.to_phone} ({self.status})"
+
+
+class InboundMessage(models.Model):
+    """
+    An incoming webhook delivery, keyed by the provider's message id (Twilio
+    MessageSid). Rows double as the deduplication record (whatsapp/idempotency.py)
+    and, when the webhook runs in inbox mode, as the queue the inbox workers
+    process (whatsapp/inbox.py). Messages handled by the webhook itself are
+    recorded as processed.
+    """
+    class Status(models.TextChoices):
+        RECEIVED = 'received', 'Received'
+        PROCESSED = 'processed', 'Processed'
+        FAILED = 'failed', 'Failed'
+
+    id = models.BigAutoField(primary_key=True)
+    message_sid = models.CharField(max_length=100, unique=True, blank=True, null=True)
+    sender = models.CharField(max_length=50, blank=True, default='')
+    payload = models.JSONField(blank=True, null=True)      # cleared once processed
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PROCESSED)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)   # not retried before this
+    last_error = models.TextField(blank=True, default='')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Queue order, and earlier unprocessed messages of the same sender
+            models.Index(
+                fields=['id'],
+                condition=models.Q(status='received'),
+                name='whatsapp_inbox_queue_idx'
+            ),
+            models.Index(
+                fields=['sender', 'id'],
+                condition=models.Q(status='received'),
+                name='whatsapp_inbox_sender_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Inbound {self.message_sid or self.id} ({self.status})"
+
+
+class Broadcast(models.Model):
+    """
+    One message sent to every customer with a car parked at a company, or in
+    one of its divisions. Created through the API or the send_broadcast
+    command and sent by run_broadcast_worker (see whatsapp/broadcasts.py);
+    the counters show its progress.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENDING = 'sending', 'Sending'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey('companies.Company', on_delete=models.CASCADE, related_name='broadcasts')
+    division = models.CharField(max_length=100, blank=True, default='')    # blank: the whole company
+    body = models.TextField()
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='broadcasts'
+    )
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    recipients = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)     # last progress update while sending
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Broadcasts waiting for the worker
+            models.Index(fields=['created_at'], condition=models.Q(status='pending'), name='whatsapp_broadcast_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Broadcast {self.id} → {self.company_id} {self.division or '(all)'} ({self.status})"
@@ -0,0 +1,149 @@
+# whatsapp/outbox.py
+"""
+Durable queue of outbound WhatsApp messages, kept in OutboundMessage.
+
+The webhook only enqueues its replies, so its latency no longer depends on
+Twilio; the run_outbox_worker command sends them. Workers claim due messages
+with SELECT ... FOR UPDATE SKIP LOCKED, so several can run side by side, and
+hold a lease while sending: a message whose worker died mid-send is picked up
+again once the lease runs out.
+
+A message is only claimed when no earlier message to the same recipient is
+still pending or being sent, so customers receive their messages in the order
+they were enqueued even across retries. Failed sends are retried with
+exponential backoff (WHATSAPP_OUTBOX_* settings) until the attempts run out.
+Each successful send is recorded as an outgoing NotificationLog carrying the
+provider's message id. Delivery itself is left to the transport.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from parking import payloads
+from parking.models import NotificationLog
+
+from .models import OutboundMessage
+
+LEASE_SECONDS = 120
+UNSENT_STATUSES = (OutboundMessage.Status.PENDING, OutboundMessage.Status.SENDING)
+
+
+def enqueue(to_phone, body, transaction=None):
+    """Queue a message to ``to_phone``; sent by the outbox worker."""
+    return OutboundMessage.objects.create(to_phone=to_phone, body=body, transaction=transaction)
+
+
+def claim(limit, lease_seconds=LEASE_SECONDS):
+    """
+    Mark up to ``limit`` due messages as sending and return them, at most one
+    per recipient. Their attempt count is already incremented.
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        # Messages of a worker that died mid-send
+        OutboundMessage.objects.filter(
+            status=OutboundMessage.Status.SENDING,
+            locked_until__lt=now
+        ).update(status=OutboundMessage.Status.PENDING, locked_until=None)
+
+        earlier = OutboundMessage.objects.filter(
+            to_phone=OuterRef('to_phone'),
+            id__lt=OuterRef('id'),
+            status__in=UNSENT_STATUSES
+        )
+        ids = list(
+            OutboundMessage.objects.filter(
+                status=OutboundMessage.Status.PENDING,
+                next_attempt_at__lte=now
+            ).exclude(
+                Exists(earlier)
+            ).order_by('next_attempt_at', 'id').select_for_update(skip_locked=True).values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(id__in=ids).update(
+            status=OutboundMessage.Status.SENDING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=lease_seconds)
+        )
+    return list(OutboundMessage.objects.filter(id__in=ids).order_by('id'))
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying after the ``attempts``-th failure, with jitter."""
+    delay = min(
+        settings.WHATSAPP_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.WHATSAPP_OUTBOX_BACKOFF_MAX_SECONDS
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def mark_sent(sent):
+    """Record successful sends, [(message, provider message id)], and their outgoing NotificationLogs."""
+    if not sent:
+        return
+    now = timezone.now()
+    for message, provider_message_id in sent:
+        message.status = OutboundMessage.Status.SENT
+        message.provider_message_id = provider_message_id
+        message.sent_at = now
+        message.locked_until = None
+        message.last_error = ''
+    with db_transaction.atomic():
+        OutboundMessage.objects.bulk_update(
+            [message for message, _ in sent],
+            ['status', 'provider_message_id', 'sent_at', 'locked_until', 'last_error']
+        )
+        raw_payloads = payloads.store_many([
+            {
+                'To': f"whatsapp:{message.to_phone}",
+                'Body': message.body,
+                'MessageSid': provider_message_id,
+                'OutboundMessageId': message.id,
+            }
+            for message, provider_message_id in sent
+        ])
+        NotificationLog.objects.bulk_create([
+            NotificationLog(
+                transaction_id=message.transaction_id,
+                direction=NotificationLog.Direction.OUTGOING,
+                whatsapp_message_id=provider_message_id,
+                raw_payload=raw_payload
+            )
+            for (message, provider_message_id), raw_payload in zip(sent, raw_payloads)
+        ])
+
+
+def mark_failed(message, error):
+    """Schedule a retry of ``message``, or give up once it has used all its attempts."""
+    if message.attempts >= settings.WHATSAPP_OUTBOX_MAX_ATTEMPTS:
+        changes = {'status': OutboundMessage.Status.FAILED}
+    else:
+        changes = {
+            'status': OutboundMessage.Status.PENDING,
+            'next_attempt_at': timezone.now() + timedelta(seconds=backoff(message.attempts)),
+        }
+    OutboundMessage.objects.filter(id=message.id).update(locked_until=None, last_error=str(error)[:1000], **changes)
+    return changes['status']
+
+
+def dispatch(messages, transport, executor=None):
+    """
+    Send claimed ``messages`` as one batch through ``transport`` (see
+    whatsapp/transports.py), in parallel on ``executor``, and record the
+    results from this thread. Returns the number sent.
+    """
+    results = transport.send_batch([(message.to_phone, message.body) for message in messages], executor)
+    sent = []
+    for message, (provider_message_id, error) in zip(messages, results):
+        if error is not None:
+            print(f"[Error sending WhatsApp] {message.to_phone}: {error}")
+            mark_failed(message, error)
+        else:
+            sent.append((message, provider_message_id))
+    mark_sent(sent)
+    return len(sent)
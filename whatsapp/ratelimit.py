@@ -0,0 +1,231 @@
+# whatsapp/ratelimit.py
+"""
+Token-bucket rate limiting for the WhatsApp webhook.
+
+Every incoming message takes a token from its sender's bucket and from one
+global bucket; a bucket refills at a steady rate up to its burst size. When
+either is empty the webhook acknowledges the message with a plain 200 and
+drops it, so a flood from one number (or from everyone) costs neither
+database writes nor outbound messages.
+
+The buckets live outside the process so every Gunicorn worker draws from the
+same budget:
+
+    SQLiteStore   a small SQLite file (WAL, no fsync) shared by the workers
+                  of one host; the default.
+    RedisStore    a Redis hash per bucket updated by a Lua script, for web
+                  workers spread over several hosts
+                  (WHATSAPP_RATE_LIMIT_REDIS_URL).
+
+Both take all of a message's tokens in one atomic step, and only when every
+bucket has one, so a sender over budget does not drain the global bucket.
+They also count allowed and rejected messages (``counters()``), shown by the
+rate-limits endpoint. If the store fails the message is let through: the
+limiter protects the webhook and must not take it down.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+SENDER = 'sender'
+GLOBAL = 'global'
+
+
+class SQLiteStore:
+    """Buckets and counters in a SQLite file shared by the processes of one host."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            full_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at);
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+    # Seconds between deletions of buckets that have refilled completely
+    PRUNE_INTERVAL = 60
+
+    def __init__(self, path, timeout=1.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pruned_at = 0.0
+
+    def _connection(self):
+        # One connection per thread, and never one inherited across a fork
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if connection is None or pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.executescript(self.SCHEMA)
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def take(self, buckets, now):
+        """
+        Take a token from each of ``buckets`` ([(name, key, rate, burst)]) if
+        all have one. Returns None, or the name of the first empty bucket.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            updates = []
+            for name, key, rate, burst in buckets:
+                row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+                if tokens < 1:
+                    self._count(connection, f'rejected_{name}')
+                    connection.execute('COMMIT')
+                    return name
+                updates.append((key, tokens - 1, now, now + (burst - tokens + 1) / rate))
+            connection.executemany(
+                'INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, '
+                'full_at = excluded.full_at',
+                updates
+            )
+            self._count(connection, 'allowed')
+            if now - self._pruned_at > self.PRUNE_INTERVAL:
+                # A full bucket is the same as a missing one
+                self._pruned_at = now
+                connection.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+            connection.execute('COMMIT')
+            return None
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _count(self, connection, name):
+        connection.execute(
+            'INSERT INTO counters (name, value) VALUES (?, 1) '
+            'ON CONFLICT (name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+
+    def counters(self):
+        return dict(self._connection().execute('SELECT name, value FROM counters'))
+
+    def reset(self):
+        connection = self._connection()
+        connection.execute('DELETE FROM buckets')
+        connection.execute('DELETE FROM counters')
+
+
+class RedisStore:
+    """Buckets and counters in Redis, for web workers on several hosts."""
+
+    PREFIX = 'whatsapp:ratelimit:'
+    # KEYS: the buckets, then the counters hash.
+    # ARGV: now, then rate, burst and name for each bucket.
+    TAKE = """
+        local now = tonumber(ARGV[1])
+        local count = #KEYS - 1
+        local remaining = {}
+        for i = 1, count do
+            local rate, burst = tonumber(ARGV[3 * i - 1]), tonumber(ARGV[3 * i])
+            local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'updated')
+            local tokens = tonumber(bucket[1]) or burst
+            local updated = tonumber(bucket[2]) or now
+            tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+            if tokens < 1 then
+                redis.call('HINCRBY', KEYS[count + 1], 'rejected_' .. ARGV[3 * i + 1], 1)
+                return ARGV[3 * i + 1]
+            end
+            remaining[i] = tokens - 1
+        end
+        for i = 1, count do
+            local rate, burst = tonumber(ARGV[3 * i - 1]), tonumber(ARGV[3 * i])
+            redis.call('HSET', KEYS[i], 'tokens', tostring(remaining[i]), 'updated', ARGV[1])
+            redis.call('EXPIRE', KEYS[i], math.ceil((burst - remaining[i]) / rate) + 1)
+        end
+        redis.call('HINCRBY', KEYS[count + 1], 'allowed', 1)
+        return false
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._take = self.client.register_script(self.TAKE)
+
+    def take(self, buckets, now):
+        keys = [self.PREFIX + key for _, key, _, _ in buckets] + [self.PREFIX + 'counters']
+        args = [repr(now)]
+        for name, _, rate, burst in buckets:
+            args += [repr(rate), repr(burst), name]
+        rejected = self._take(keys=keys, args=args)
+        return rejected.decode() if rejected else None
+
+    def counters(self):
+        return {name.decode(): int(value) for name, value in self.client.hgetall(self.PREFIX + 'counters').items()}
+
+    def reset(self):
+        keys = list(self.client.scan_iter(match=self.PREFIX + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class Limiter:
+    """
+    Per-sender and global token buckets. Rates are tokens per second; a rate
+    of 0 turns that bucket off.
+    """
+
+    def __init__(self, store, sender_rate, sender_burst, global_rate, global_burst):
+        self.store = store
+        self.sender = (sender_rate, max(sender_burst, 1))
+        self.global_ = (global_rate, max(global_burst, 1))
+
+    def check(self, sender):
+        """None if a message from ``sender`` may be handled, else SENDER or GLOBAL."""
+        buckets = []
+        if sender and self.sender[0] > 0:
+            buckets.append((SENDER, f'sender:{sender}', *self.sender))
+        if self.global_[0] > 0:
+            buckets.append((GLOBAL, 'global', *self.global_))
+        if not buckets:
+            return None
+        try:
+            return self.store.take(buckets, time.time())
+        except Exception as e:
+            print(f"[Error in WhatsApp rate limiter] {e}")
+            return None
+
+    def counters(self):
+        counters = {'allowed': 0, f'rejected_{SENDER}': 0, f'rejected_{GLOBAL}': 0}
+        counters.update(self.store.counters())
+        return counters
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """The process-wide limiter, built from settings on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if settings.WHATSAPP_RATE_LIMIT_REDIS_URL:
+                    store = RedisStore(settings.WHATSAPP_RATE_LIMIT_REDIS_URL)
+                else:
+                    store = SQLiteStore(settings.WHATSAPP_RATE_LIMIT_PATH)
+                _limiter = Limiter(
+                    store,
+                    sender_rate=settings.WHATSAPP_RATE_LIMIT_SENDER_PER_MINUTE / 60,
+                    sender_burst=settings.WHATSAPP_RATE_LIMIT_SENDER_BURST,
+                    global_rate=settings.WHATSAPP_RATE_LIMIT_GLOBAL_PER_SECOND,
+                    global_burst=settings.WHATSAPP_RATE_LIMIT_GLOBAL_BURST,
+                )
+    return _limiter
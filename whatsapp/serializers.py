@@ -0,0 +1,23 @@
+# whatsapp/serializers.py
+from rest_framework import serializers
+from .models import Broadcast
+
+
+class BroadcastSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Broadcast
+        fields = [
+            'id',
+            'company',
+            'division',
+            'body',
+            'status',
+            'recipients',
+            'sent',
+            'failed',
+            'last_error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = [field for field in fields if field not in ('division', 'body')]
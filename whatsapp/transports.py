@@ -0,0 +1,136 @@
+# whatsapp/transports.py
+"""
+Transports deliver outbound WhatsApp messages for the outbox worker.
+
+A transport exposes ``send(to_phone, body) -> provider message id`` and
+``send_batch(messages, executor=None)``. The one used by the process is built
+once from the WHATSAPP_TRANSPORT setting (a dotted class path) and
+WHATSAPP_TRANSPORT_OPTIONS (keyword arguments), and shared by every thread
+through ``get_transport()``, so HTTP connections and TLS sessions are reused
+across messages instead of being set up for each one.
+
+``FakeTransport`` is a local gateway that never leaves the process: it
+records what it is asked to send and can add latency and fail a share of the
+sends, for load tests and throughput measurements without real messages.
+"""
+import collections
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client as TwilioClient
+
+
+class TransportError(Exception):
+    """A send the gateway refused or could not complete."""
+
+
+class BaseTransport:
+    """Delivers messages; subclasses implement send()."""
+
+    def send(self, to_phone, body):
+        """Send one message and return the provider's message id; raises on failure."""
+        raise NotImplementedError
+
+    def send_batch(self, messages, executor=None):
+        """
+        Send [(to_phone, body), ...], in parallel on ``executor`` when given.
+        Returns one (provider message id, None) or (None, exception) per
+        message, in order.
+        """
+        if executor is None:
+            return [self._attempt(to_phone, body) for to_phone, body in messages]
+        futures = [executor.submit(self._attempt, to_phone, body) for to_phone, body in messages]
+        return [future.result() for future in futures]
+
+    def _attempt(self, to_phone, body):
+        try:
+            return self.send(to_phone, body), None
+        except Exception as e:
+            return None, e
+
+
+class TwilioTransport(BaseTransport):
+    """Twilio's WhatsApp API over one pooled keep-alive HTTP session."""
+
+    def __init__(self, pool_size=32, timeout=10, max_retries=0):
+        http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+        # One connection per concurrent sender; requests discards connections beyond pool_maxsize
+        http_client.session.mount('https://', HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=max_retries
+        ))
+        self.client = TwilioClient(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=http_client
+        )
+        self.from_ = f"whatsapp:{settings.TWILIO_WHATSAPP_NUMBER}"
+
+    def send(self, to_phone, body):
+        return self.client.messages.create(
+            from_=self.from_,
+            body=body,
+            to=f"whatsapp:{to_phone}"
+        ).sid
+
+
+class FakeTransport(BaseTransport):
+    """
+    In-process gateway. Each send sleeps ``latency`` seconds (plus up to
+    ``jitter``), fails with TransportError with probability ``error_rate``,
+    and otherwise is kept in ``sent`` (the last ``keep`` messages).
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, keep=10000, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.sent = collections.deque(maxlen=keep)
+        self.sent_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, to_phone, body):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            if failed:
+                self.error_count += 1
+                raise TransportError('Injected gateway error')
+            sid = f"FAKE{uuid.uuid4().hex}"
+            self.sent.append((sid, to_phone, body))
+            self.sent_count += 1
+        return sid
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The process-wide transport, built from settings on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = import_string(settings.WHATSAPP_TRANSPORT)(**settings.WHATSAPP_TRANSPORT_OPTIONS)
+    return _transport
+
+
+def set_transport(transport):
+    """Replace the process-wide transport (None rebuilds it from settings); returns the previous one."""
+    global _transport
+    with _transport_lock:
+        previous, _transport = _transport, transport
+    return previous
@@ -5,5 +5,8 @@ from . import views
 urlpatterns = [
     # Example: the webhook endpoint
     path('webhook/', views.WhatsAppWebhookAPIView.as_view(), name='whatsapp-webhook'),
+    path('rate-limits/', views.WhatsAppRateLimitAPIView.as_view(), name='whatsapp-rate-limits'),
+    path('broadcasts/', views.BroadcastListCreateAPIView.as_view(), name='whatsapp-broadcast-list-create'),
+    path('broadcasts/<int:pk>/', views.BroadcastRetrieveAPIView.as_view(), name='whatsapp-broadcast-detail'),
 ]
 
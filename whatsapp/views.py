@@ -2,17 +2,14 @@ from django.shortcuts import render
 
 # Create your views here.
 # whatsapp/views.py
-import json
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
-from django.utils import timezone
-from companies.models import EmployeeProfile, Company
-from parking.models import Customer, ParkingSlot, ParkingTransaction, NotificationLog
+from rest_framework import generics, status, permissions
 from django.conf import settings
-
-# If using Twilio’s helper library:
-from twilio.rest import Client as TwilioClient
+from core.permissions import IsCompanyAdmin, get_user_company
+from . import broadcasts, handlers, idempotency, inbox, ratelimit
+from .models import Broadcast
+from .serializers import BroadcastSerializer
 
 
 class WhatsAppWebhookAPIView(APIView):
@@ -21,95 +18,84 @@ class WhatsAppWebhookAPIView(APIView):
 
     def post(self, request, *args, **kwargs):
         """
-        Expected payload (example, Twilio):
-        {
-          "From": "whatsapp:+1234567890",
-          "Body": "Park my car - GJ01AB1234 - <slot_uuid>",
-          "MessageSid": "SMxxxxxxxxxxxx",
-          ...
-        }
+        Handle an incoming message (see whatsapp.handlers.handle_incoming), or
+        with WHATSAPP_WEBHOOK_MODE = 'inbox' only queue it for the inbox workers.
         """
         payload = request.data.copy()
         # 1. Verify signature/header if required by your provider.
         #    If invalid, return HTTP 403.
 
-        # 2. Parse sender phone & message:
-        raw_from = payload.get('From', '')
-        # Twilio’s format is "whatsapp:+1234567890", so strip “whatsapp:”
-        phone = raw_from.replace("whatsapp:", "")
-        body = payload.get('Body', '').strip()
-
-        # 3. Log incoming message
-        #    If we cannot parse a valid slot_id, respond with an error message
-        #    and log that in NotificationLog with direction='incoming'.
-        try:
-            # Basic parse: assume “Park my car – <plate> – <slot_uuid>”
-            parts = [p.strip() for p in body.split('-')]
-            if len(parts) < 2:
-                raise ValueError("Invalid format.")
-
-            command = parts[0].lower()  # e.g. "park my car"
-            plate_number = parts[1]     # e.g. "GJ01AB1234"
-            slot_uuid = parts[2]        # e.g. "550e8400-e29b-41d4-a716-446655440000"
+        # Provider retries of a message this process already handled
+        message_sid = payload.get('MessageSid')
+        if message_sid and idempotency.recent_message_ids.seen(message_sid):
+            return Response(status=status.HTTP_200_OK)
 
-            # Fetch or create Customer
-            customer, _ = Customer.objects.get_or_create(phone_number=phone)
+        # Over the sender's or the webhook's budget: acknowledge and drop it,
+        # before anything is written or a reply is queued
+        sender = payload.get('From', '').replace('whatsapp:', '')
+        if ratelimit.get_limiter().check(sender) is not None:
+            return Response(status=status.HTTP_200_OK)
 
-            # Fetch slot
+        if settings.WHATSAPP_WEBHOOK_MODE == 'inbox':
             try:
-                slot = ParkingSlot.objects.get(id=slot_uuid)
-            except ParkingSlot.DoesNotExist:
-                # Send error back to user
-                self.send_whatsapp_message(phone, "Invalid slot. Please scan a valid QR code.")
-                return Response(status=status.HTTP_200_OK)
-
-            if slot.is_occupied:
-                self.send_whatsapp_message(phone, "Sorry, that slot is currently occupied. Please try another slot.")
-                return Response(status=status.HTTP_200_OK)
-
-            # Create new transaction
-            tx = ParkingTransaction.objects.create(
-                customer=customer,
-                slot=slot,
-                plate_number=plate_number,
-                status=ParkingTransaction.Status.PENDING_PARK,
-                raw_whatsapp_payload=payload
-            )
-
-            # Log incoming
-            NotificationLog.objects.create(
-                transaction=tx,
-                direction=NotificationLog.Direction.INCOMING,
-                whatsapp_message_id=payload.get('MessageSid', None),
-                payload=payload
-            )
-
-            # Acknowledge to customer
-            ack_text = f"Received your request to park car {plate_number} in slot {slot.name}. Please wait for confirmation."
-            self.send_whatsapp_message(phone, ack_text)
-
+                inbox.accept(payload)
+            except Exception as e:
+                # Nothing was stored, so let the provider deliver it again
+                print(f"[Error queueing incoming WhatsApp] {e}")
+                return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE)
             return Response(status=status.HTTP_200_OK)
 
+        try:
+            handlers.handle_incoming(payload)
         except Exception as e:
             # Log exception, but still respond 200 so provider won’t retry aggressively
             print(f"[Error parsing incoming WhatsApp] {e}")
-            return Response(status=status.HTTP_200_OK)
-
-    def send_whatsapp_message(self, to_phone, message_text):
-        """
-        Uses Twilio (or the WhatsApp Cloud API) to send an outbound message.
-        Ensure you’ve set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, and TWILIO_WHATSAPP_NUMBER in settings.
-        """
-        try:
-            client = TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            msg = client.messages.create(
-                from_=f"whatsapp:{settings.TWILIO_WHATSAPP_NUMBER}",
-                body=message_text,
-                to=f"whatsapp:{to_phone}"
-            )
-            # Optionally, log outbound message
-            return msg.sid
-        except Exception as ex:
-            print(f"[Error sending WhatsApp] {ex}")
-            return None
-
+        return Response(status=status.HTTP_200_OK)
+
+
+class WhatsAppRateLimitAPIView(APIView):
+    """Counts of incoming messages the rate limiter let through and dropped (staff only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(ratelimit.get_limiter().counters())
+
+
+class BroadcastListCreateAPIView(generics.ListCreateAPIView):
+    """
+    GET  /api/whatsapp/broadcasts/     → the company's broadcasts, newest first, with progress
+    POST /api/whatsapp/broadcasts/     → message every customer with a car parked
+         Body: {"body": "Valet closing in 30 minutes, please request your car", "division": "Level 1"}
+         ("division" optional). Sent by run_broadcast_worker; returns 202.
+    """
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsCompanyAdmin]
+
+    def get_queryset(self):
+        user_company = get_user_company(self.request.user)
+        if user_company:
+            return Broadcast.objects.filter(company=user_company).order_by('-created_at')
+        return Broadcast.objects.none()
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        broadcast = broadcasts.create(
+            get_user_company(request.user),
+            serializer.validated_data['body'],
+            serializer.validated_data.get('division', ''),
+            created_by=request.user
+        )
+        return Response(self.get_serializer(broadcast).data, status=status.HTTP_202_ACCEPTED)
+
+
+class BroadcastRetrieveAPIView(generics.RetrieveAPIView):
+    """GET /api/whatsapp/broadcasts/<id>/ → one broadcast and its progress (company-scoped)"""
+    serializer_class = BroadcastSerializer
+    permission_classes = [IsCompanyAdmin]
+
+    def get_queryset(self):
+        user_company = get_user_company(self.request.user)
+        if user_company:
+            return Broadcast.objects.filter(company=user_company)
+        return Broadcast.objects.none()